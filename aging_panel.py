@@ -0,0 +1,34 @@
+import streamlit as st
+
+from inventory_aging import BUCKET_LABELS, aging_summary
+
+_MONEY = st.column_config.NumberColumn(format="₩ %.0f")
+_COUNT = st.column_config.NumberColumn(format="%d 개")
+
+
+def render_aging_report(report, n=50):
+    """재고 연령 구간별 수량 · FIFO 금액 (전 품목 로트 기준)"""
+    st.subheader("⏳ 재고 연령 분석 (FIFO 로트 기준)")
+    if report.empty:
+        st.info("잔량이 남은 입고 로트가 없습니다.")
+        return
+
+    summary = aging_summary(report)
+    total_value = summary['금액'].sum()
+    cols = st.columns(len(BUCKET_LABELS))
+    for col, (_, row) in zip(cols, summary.iterrows()):
+        share = row['금액'] / total_value * 100 if total_value else 0
+        col.metric(row['구간'], f"₩ {row['금액']:,.0f}", f"{share:.1f}%", delta_color="off")
+    st.bar_chart(summary.set_index('구간')[['금액']], horizontal=True)
+
+    c1, c2 = st.columns([1, 3])
+    sort_by = c1.radio("정렬", ['총금액', '평균연령'], horizontal=True, key="aging_sort")
+    c2.caption(f"품목 {len(report):,}종 중 {sort_by} 상위 {min(n, len(report))}개 (전체는 CSV로 다운로드)")
+    st.dataframe(report.nlargest(n, sort_by), use_container_width=True, hide_index=True, column_config={
+        **{f"{label} 수량": _COUNT for label in BUCKET_LABELS},
+        **{f"{label} 금액": _MONEY for label in BUCKET_LABELS},
+        '총수량': _COUNT, '총금액': _MONEY,
+        '평균연령': st.column_config.NumberColumn("평균 연령", format="%.0f 일"),
+    })
+    st.download_button("📥 재고 연령 분석 CSV", data=report.to_csv(index=False).encode('utf-8-sig'),
+                       file_name="inventory_aging.csv", mime="text/csv", key="aging_download")
@@ -0,0 +1,51 @@
+"""
+AI 통관서류 파이프라인 (Upstage Document Parse + Solar Pro 구조화 추출)
+
+langchain_upstage는 import만 2초가량 걸리므로 앱 시작 시 불러오지 않고,
+AI PDF 화면에서 분석을 실행할 때 steamlit_main.load_ai_pipeline()으로 처음 로드합니다.
+(이 모듈을 앱 최상단에서 import하지 마세요.)
+"""
+import os
+from typing import List
+
+from langchain_upstage import UpstageDocumentParseLoader, ChatUpstage
+from pydantic import BaseModel, Field
+
+
+# ==========================================
+# [1. AI 데이터 구조 스키마 (Pydantic)]
+# ==========================================
+class ImportItem(BaseModel):
+    품목명: str = Field(description="수입된 물품의 정확한 이름")
+    수량: int = Field(description="수입된 물품의 총 수량 (숫자만)")
+    순수단가: float = Field(description="물품 1개당 순수 단가 (원화 환산 기준, 숫자만)")
+
+
+class ImportDocument(BaseModel):
+    수입일자: str = Field(description="YYYY-MM-DD 형식의 수입/통관 일자")
+    거래처: str = Field(description="수출자, 제조사 또는 거래처 이름")
+    총통관물류비: int = Field(description="관세, 부가세, 운송비, 하역비 등 발생한 모든 제비용의 합계 (원화, 숫자만)")
+    품목목록: List[ImportItem] = Field(description="수입된 품목들의 배열")
+
+
+# ==========================================
+# [2. Upstage API 호출]
+# ==========================================
+def _upstage_options(path=""):
+    """UPSTAGE_BASE_URL이 지정되면 해당 엔드포인트로 요청 (사내 프록시 · 로컬 스텁 서버)"""
+    base_url = os.environ.get("UPSTAGE_BASE_URL")
+    return {'base_url': f"{base_url.rstrip('/')}{path}"} if base_url else {}
+
+
+def upstage_parse(file_path):
+    """Upstage Document Parse: 문서 레이아웃 → 텍스트"""
+    loader = UpstageDocumentParseLoader(file_path, output_format="text", **_upstage_options("/document-digitization"))
+    return "\n".join([doc.page_content for doc in loader.load()])
+
+
+def upstage_extract(parsed_text):
+    """Solar Pro LLM: 파싱 텍스트 → ImportDocument 구조화(JSON)"""
+    llm = ChatUpstage(model="solar-pro", **_upstage_options())
+    structured_llm = llm.with_structured_output(ImportDocument)
+    prompt = f"다음 파싱된 통관 문서 내용을 분석하여 스키마 형식에 맞게 데이터를 추출하세요.\n내용:\n{parsed_text}"
+    return structured_llm.invoke(prompt)
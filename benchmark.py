@@ -0,0 +1,855 @@
+"""
+원장(Ledger) 파이프라인 성능 벤치마크
+
+시드 고정 가상 원장을 여러 규모(1만/10만/100만/1000만 행)로 생성한 뒤
+적재 → 날짜 변환 → 해시 → 중복 제거 → FIFO 원가 계산 → 지표 → 내보내기
+단계를 각각 측정하여 처리량(행/초)과 최대 메모리를 JSON으로 저장합니다.
+
+사용 예)
+    python benchmark.py --rows 10000 100000
+    python benchmark.py --rows 1000000 --skip st_fifo excel_load
+    python benchmark.py compare bench_results/old.json bench_results/new.json
+    python benchmark.py startup --repeat 5          # 앱별 로그인 화면 첫 렌더링 시간
+    python benchmark.py compaction --rows 200000 --split 5   # 입고 로트 병합 전/후 큐 깊이 · 처리량
+    python benchmark.py concurrency --sessions 1 2 4 8 16    # 공유 원장 동시 반영 (전역 잠금 vs 품목 단위)
+    python benchmark.py service --clients 1 4 16             # 적재 서비스 HTTP 부하 (묶음별 반영 vs group commit)
+    python benchmark.py landed --docs 50 --lines 20          # 수입 문서 원가 배분 (품목별 반영 vs 묶음 1회 반영)
+    python benchmark.py pdf --docs 8 --workers 4             # AI PDF 일괄 처리 검증 (스텁 서버 · 캐시 · 오류 행 · 순서)
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ledger_generator import generate_ledger
+from ledger_schema import compact_frame, memory_report
+
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000, 10_000_000]
+RESULT_DIR = 'bench_results'
+
+# 엑셀은 시트당 1,048,576행 제한이 있고, 행 단위 Streamlit 경로는 O(n²)이므로 상한을 둡니다.
+EXCEL_MAX_ROWS = 100_000
+ST_FIFO_MAX_ROWS = 2_000
+
+# test.py는 pandas/streamlit만 쓰는 단순 앱으로, 시작 시간 비교 기준선입니다.
+STARTUP_APPS = ['steamlit_main.py', 'new_streamlit_main.py', 'streamlit_main_legacy.py', 'test.py']
+
+
+# ==========================================
+# [1. 시드 고정 가상 원장 생성]
+# ==========================================
+def make_ledger(n_rows, n_items=100, seed=42):
+    """steamlit_main.py 업로드 양식 + 단가(최종매입원가) 컬럼의 가상 원장 (재고부족 없음)"""
+    return generate_ledger(n_rows, n_items=n_items, n_customers=max(n_items // 5, 1),
+                           no_stockout=True, schema='all', seed=seed)
+
+
+# ==========================================
+# [2. 단계별 측정 유틸리티]
+# ==========================================
+class StageTimer:
+    """단계별 수행시간, 처리행수, 최대 메모리(tracemalloc) 수집기"""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.results = []
+
+    def run(self, scale, stage, rows, func, *args, **kwargs):
+        gc.collect()
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            value = func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else 0
+            if self.trace_memory:
+                tracemalloc.stop()
+
+        self.results.append({
+            'scale': scale, 'stage': stage, 'rows': int(rows), 'seconds': round(elapsed, 6),
+            'rows_per_s': round(rows / elapsed, 1) if elapsed > 0 else None,
+            'peak_mb': round(peak / 1024 ** 2, 2) if self.trace_memory else None,
+        })
+        print(f"  {stage:<16} {rows:>10,}행 {elapsed:>9.3f}s "
+              f"{self.results[-1]['rows_per_s'] or 0:>14,.0f}행/s"
+              + (f" {self.results[-1]['peak_mb']:>9,.1f}MB" if self.trace_memory else ""))
+        return value
+
+    def skip(self, scale, stage, reason):
+        self.results.append({'scale': scale, 'stage': stage, 'skipped': reason})
+        print(f"  {stage:<16} (생략: {reason})")
+
+
+# ==========================================
+# [3. 측정 대상 단계]
+# ==========================================
+def preload_app_modules():
+    """앱 모듈 import 비용이 첫 단계 측정에 섞이지 않도록 미리 로드"""
+    import streamlit.logger
+    import main  # noqa: F401
+    import steamlit_main  # noqa: F401
+
+    # bare mode(streamlit run 없이 실행)에서 매 호출마다 찍히는 경고 로그 억제
+    streamlit.logger.set_log_level('error')
+
+
+def _row_hash(df):
+    """앱과 동일한 행 단위 해시 (steamlit_main.generate_row_hash)"""
+    from steamlit_main import generate_row_hash
+    return df.apply(generate_row_hash, axis=1)
+
+
+def _dedup(df, hashes):
+    """기존 원장 절반 + 업로드 전체를 가정한 해시 중복 제거 (앱의 isin 경로)"""
+    existing_hashes = set(hashes.iloc[: len(hashes) // 2].tolist())
+    return df[~hashes.isin(existing_hashes)]
+
+
+def _fifo_main(df):
+    """main.py FIFOCostCalculator로 날짜순 입출고 처리"""
+    from main import FIFOCostCalculator
+    calc = FIFOCostCalculator()
+    for date, item, action, qty, price in zip(df['날짜'], df['품목명'], df['구분'], df['수량'], df['단가']):
+        if action == '입고':
+            calc.add_stock(item, qty, price, date)
+        else:
+            calc.calculate_out_cost(item, qty, date)
+    return calc
+
+
+def _fifo_streamlit(df):
+    """steamlit_main.process_secure_transaction 행 단위 경로 (세션 상태 포함)"""
+    import streamlit as st
+    import steamlit_main
+
+    st.session_state.clear()
+    steamlit_main.initialize_state()
+    for row in df.itertuples(index=False):
+        steamlit_main.process_secure_transaction(
+            date=row.날짜, item=row.품목명, action=row.구분, sub_type=row.세부구분, qty=row.수량,
+            customer=row.고객사, base_price=row.순수단가, customs_logistics_fee=row.통관물류비,
+            sale_price=row.판매단가
+        )
+    return st.session_state.history
+
+
+def _sales_metrics(df, calc):
+    """대시보드의 품목별 1년/3개월 판매지표 및 재고 요약을 전 품목에 대해 계산"""
+    now = df['날짜'].max()
+    rows = []
+    for item in df['품목명'].unique():
+        sales = df[(df['품목명'] == item) & (df['구분'] == '출고')]
+        avg_12m = sales[sales['날짜'] >= now - pd.Timedelta(days=365)]['수량'].sum() / 12
+        avg_3m = sales[sales['날짜'] >= now - pd.Timedelta(days=90)]['수량'].sum() / 3
+        rows.append({'품목명': item, '현재고': calc.get_current_stock_level(item),
+                     '1년_월평균판매': avg_12m, '3개월_월평균판매': avg_3m})
+    return pd.DataFrame(rows)
+
+
+def bench_scale(timer, n_rows, n_items, seed, workdir, skip=()):
+    print(f"\n▶ {n_rows:,}행 (품목 {n_items:,}개, seed={seed})")
+    df = timer.run(n_rows, 'generate', n_rows, make_ledger, n_rows, n_items, seed)
+
+    parquet_path = os.path.join(workdir, f'ledger_{n_rows}.parquet')
+    df.to_parquet(parquet_path, index=False)
+    if 'parquet_load' not in skip:
+        timer.run(n_rows, 'parquet_load', n_rows, pd.read_parquet, parquet_path)
+
+    if 'excel_load' in skip:
+        pass
+    elif n_rows > EXCEL_MAX_ROWS:
+        timer.skip(n_rows, 'excel_load', f'{EXCEL_MAX_ROWS:,}행 초과')
+    else:
+        excel_path = os.path.join(workdir, f'ledger_{n_rows}.xlsx')
+        df.to_excel(excel_path, index=False)
+        timer.run(n_rows, 'excel_load', n_rows, pd.read_excel, excel_path)
+
+    if 'compact_dtypes' not in skip:
+        compact = timer.run(n_rows, 'compact_dtypes', n_rows, compact_frame, df)
+        total = memory_report(df, compact).loc['합계']
+        timer.results[-1].update({'before_mb': round(total['변환전(MB)'], 2), 'after_mb': round(total['변환후(MB)'], 2)})
+        print(f"  {'':<16} 원장 메모리 {total['변환전(MB)']:,.1f}MB → {total['변환후(MB)']:,.1f}MB "
+              f"({total['절감률']:.0%} 절감)")
+        del compact
+
+    if 'date_parse' not in skip:
+        date_strings = df['날짜'].astype(str)
+        timer.run(n_rows, 'date_parse', n_rows, pd.to_datetime, date_strings)
+        del date_strings
+
+    hashes = None
+    if 'row_hash' not in skip:
+        hashes = timer.run(n_rows, 'row_hash', n_rows, _row_hash, df)
+    if 'dedup' not in skip and hashes is not None:
+        timer.run(n_rows, 'dedup', n_rows, _dedup, df, hashes)
+
+    calc = None
+    if 'fifo_main' not in skip:
+        calc = timer.run(n_rows, 'fifo_main', n_rows, _fifo_main, df)
+
+    if 'st_fifo' not in skip:
+        st_rows = min(n_rows, ST_FIFO_MAX_ROWS)
+        timer.run(n_rows, 'st_fifo', st_rows, _fifo_streamlit, df.iloc[:st_rows])
+
+    if 'metrics' not in skip and calc is not None:
+        timer.run(n_rows, 'metrics', n_rows, _sales_metrics, df, calc)
+
+    if 'export' not in skip and calc is not None:
+        sales = pd.DataFrame(calc.sales_records)
+        timer.run(n_rows, 'export_parquet', len(sales), sales.to_parquet,
+                  os.path.join(workdir, 'cogs.parquet'), index=False)
+        if len(sales) <= EXCEL_MAX_ROWS:
+            timer.run(n_rows, 'export_excel', len(sales), sales.to_excel,
+                      os.path.join(workdir, 'cogs.xlsx'), index=False)
+        else:
+            timer.skip(n_rows, 'export_excel', f'{EXCEL_MAX_ROWS:,}행 초과')
+
+
+# ==========================================
+# [4. 앱 시작 시간 (Time-to-first-render)]
+# ==========================================
+# 새 프로세스에서 AppTest로 스크립트를 처음 실행(콜드 스타트: 모듈 import 포함)한 시간과 재실행(rerun) 시간 측정
+_STARTUP_PROBE = """
+import json, sys, time
+import streamlit.logger
+streamlit.logger.set_log_level('error')
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file(sys.argv[1], default_timeout=300)
+start = time.perf_counter(); at.run(); first = time.perf_counter() - start
+start = time.perf_counter(); at.run(); rerun = time.perf_counter() - start
+heavy = sorted(m for m in ('langchain_upstage', 'pydantic', 'openai') if m in sys.modules)
+print(json.dumps({'first': first, 'rerun': rerun, 'error': bool(at.exception), 'heavy': heavy}))
+"""
+
+
+def bench_startup(apps, repeat=3):
+    """앱별 콜드 스타트 첫 렌더링/재실행 시간 (repeat회 새 프로세스 실행의 중앙값)"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    print(f"\n▶ 앱 시작 시간 (새 프로세스 {repeat}회 중앙값)")
+    for app in apps:
+        runs = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, '-c', _STARTUP_PROBE, app], cwd=base_dir,
+                                 capture_output=True, text=True, check=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        first = float(np.median([r['first'] for r in runs]))
+        rerun = float(np.median([r['rerun'] for r in runs]))
+        for stage, seconds in (('startup', first), ('rerun', rerun)):
+            results.append({'scale': 0, 'stage': f"{stage}:{app}", 'rows': 1, 'seconds': round(seconds, 4),
+                            'error': runs[-1]['error'], 'heavy_modules': runs[-1]['heavy']})
+        print(f"  {app:<28} 첫 렌더링 {first:>7.3f}s  재실행 {rerun:>7.3f}s"
+              + (f"  (로드됨: {', '.join(runs[-1]['heavy'])})" if runs[-1]['heavy'] else "")
+              + ("  ⚠️예외" if runs[-1]['error'] else ""))
+    return results
+
+
+# ==========================================
+# [5. 입고 로트 병합 (Lot Compaction)]
+# ==========================================
+def _split_receipts(df, parts):
+    """ERP 추출본처럼 입고 1건을 같은 시각 · 같은 단가의 여러 줄로 분할 (수량 합계 동일)"""
+    repeat = np.where(df['구분'] == '입고', parts, 1)
+    out = df.loc[df.index.repeat(repeat)].reset_index(drop=True)
+    line = np.arange(len(out)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+    qty = out['수량'].to_numpy()
+    out['수량'] = np.where(out['구분'] == '입고', qty // parts + (line < qty % parts), qty)
+    return out[out['수량'] > 0].reset_index(drop=True)
+
+
+def _compaction_batch(n_rows, n_items, parts, seed):
+    """최종매입원가(단가)를 순수단가로 쓰는 거래 묶음 (분할 줄끼리 단가가 정확히 같도록 통관물류비 0)"""
+    import ingest
+    df = make_ledger(n_rows, n_items, seed)
+    df['순수단가'] = np.where(df['구분'] == '입고', df['단가'], 0)
+    df['통관물류비'] = 0
+    df = _split_receipts(df, parts)
+    df['hash'] = df.index.astype(str)
+    return ingest.normalize_columns(df).sort_values('날짜', kind='stable').reset_index(drop=True)
+
+
+def _fifo_with_depth(batch, compaction):
+    """ledger_engine.apply_transaction FIFO 루프 (입고 직후 품목 큐 깊이 기록)"""
+    import ledger_engine
+    from consumption_ledger import ConsumptionLedger
+
+    queues, ledger = {}, ConsumptionLedger()
+    cogs, depth_sum, depth_max, receipts = 0.0, 0, 0, 0
+    rows = zip(batch['날짜'], batch['품목명'], batch['구분'], batch['세부구분'], batch['수량'], batch['고객사'],
+               batch['순수단가'], batch['통관물류비'], batch['판매단가'], batch['hash'])
+    for date, item, action, sub_type, qty, customer, base_price, fee, sale_price, row_hash in rows:
+        record, _, _ = ledger_engine.apply_transaction(queues, ledger, date, item, action, sub_type, qty, customer,
+                                                       base_price, fee, sale_price, row_hash, compaction)
+        if action == '입고':
+            depth = len(queues[item])
+            depth_sum += depth
+            depth_max = max(depth_max, depth)
+            receipts += 1
+        else:
+            cogs += record['매출원가']
+    inventory = sum(b['qty'] * b['price'] for q in queues.values() for b in q)
+    return {'lots': ledger.mark()[0], 'consumption_rows': len(ledger), 'max_queue_depth': depth_max,
+            'mean_queue_depth': depth_sum / max(receipts, 1), 'cogs': cogs, 'inventory': inventory}
+
+
+def bench_compaction(n_rows, n_items=100, parts=5, seed=42, modes=('off', 'price')):
+    """병합 방식별 FIFO 처리량 · 생성 로트 수 · 큐 깊이 · 매출원가 합계 비교"""
+    batch = _compaction_batch(n_rows, n_items, parts, seed)
+    purchases = float((batch['수량'] * batch['순수단가'])[batch['구분'] == '입고'].sum())
+    print(f"\n▶ 입고 로트 병합: {len(batch):,}행 (입고 1건 → {parts}줄 분할, 품목 {n_items:,}개)")
+    print(f"  {'방식':<6} {'처리시간':>8} {'처리량(행/s)':>12} {'로트수':>8} {'소진행수':>8} {'최대깊이':>8} {'평균깊이':>8} "
+          f"{'매출원가 합계':>18} {'off 대비':>12} {'원가+재고-매입':>14}")
+    results, base_cogs = [], None
+    for mode in modes:
+        gc.collect()
+        start = time.perf_counter()
+        stats = _fifo_with_depth(batch, mode)
+        elapsed = time.perf_counter() - start
+        base_cogs = stats['cogs'] if base_cogs is None else base_cogs
+        results.append({
+            'scale': len(batch), 'stage': f"compaction:{mode}", 'rows': len(batch), 'seconds': round(elapsed, 6),
+            'rows_per_s': round(len(batch) / elapsed, 1), **{k: stats[k] for k in
+                                                            ('lots', 'consumption_rows', 'max_queue_depth')},
+            'mean_queue_depth': round(stats['mean_queue_depth'], 2), 'cogs': round(stats['cogs'], 2),
+            'cogs_diff_vs_off': stats['cogs'] - base_cogs,
+            'value_balance': stats['cogs'] + stats['inventory'] - purchases,
+        })
+        r = results[-1]
+        print(f"  {mode:<6} {elapsed:>7.3f}s {r['rows_per_s']:>12,.0f} {r['lots']:>8,} {r['consumption_rows']:>8,} "
+              f"{r['max_queue_depth']:>8,} {r['mean_queue_depth']:>8.1f} {stats['cogs']:>18,.2f} "
+              f"{r['cogs_diff_vs_off']:>12,.4f} {r['value_balance']:>14,.4f}")
+    return results
+
+
+# ==========================================
+# [6. 공유 원장 동시 반영 스트레스]
+# ==========================================
+CONCURRENCY_DATE = pd.Timestamp('2025-01-01 09:00')
+
+
+def _opening_batch(items, seed):
+    """품목별 기초 재고 입고 (세션 출고가 재고 부족에 걸리지 않을 만큼)"""
+    import ingest
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'날짜': CONCURRENCY_DATE - pd.Timedelta(days=1), '고객사': '본사', '품목명': items, '구분': '입고',
+                       '세부구분': '매입', '수량': 100_000, '순수단가': rng.integers(1_000, 50_000, len(items)),
+                       '통관물류비': 0, '판매단가': 0, 'hash': [f"open-{item}" for item in items]})
+    return ingest.normalize_columns(df)
+
+
+def _session_batches(n_tx, items, seed, session):
+    """세션 1개가 보낼 1행 거래 묶음 목록 (수동 입고 40% / 출고 60%)"""
+    import ingest
+    rng = np.random.default_rng([seed, session])
+    action = np.where(rng.random(n_tx) < 0.4, '입고', '출고')
+    df = ingest.normalize_columns(pd.DataFrame({
+        '날짜': CONCURRENCY_DATE, '고객사': f"고객사_{session:02d}", '품목명': rng.choice(items, n_tx), '구분': action,
+        '세부구분': np.where(action == '입고', '수동수입', '매출'), '수량': rng.integers(1, 50, n_tx),
+        '순수단가': np.where(action == '입고', rng.integers(1_000, 50_000, n_tx), 0), '통관물류비': 0,
+        '판매단가': rng.integers(10_000, 90_000, n_tx), 'hash': [f"s{session}-{i}" for i in range(n_tx)]}))
+    return [df.iloc[i:i + 1] for i in range(n_tx)]
+
+
+class _RemoteStore:
+    """원격 저장소(NAS · 오브젝트 스토리지) 왕복 지연을 흉내 낸 ledger_store 래퍼 (io_ms 대기 후 기록)"""
+
+    def __init__(self, store, io_ms):
+        self.store, self.io_ms = store, io_ms
+
+    def append(self, df):
+        time.sleep(self.io_ms / 1000)
+        self.store.append(df)
+
+    def compact(self):
+        time.sleep(self.io_ms / 1000)
+        return self.store.compact()
+
+
+def _run_sessions(post, sessions):
+    """세션마다 스레드 1개로 묶음을 차례로 반영. 반환: (전체 시간, 묶음별 지연시간 목록)"""
+    import threading
+    latencies = []
+
+    def worker(batches):
+        for batch in batches:
+            start = time.perf_counter()
+            post(batch)
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(batches,)) for batches in sessions]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def _verify_serial(opening, journal, state):
+    """커밋 순서대로 한 세션에서 다시 반영한 결과와 큐 · 소진 원장 · 원장 테이블이 같은지 (잃어버린 갱신 없음)"""
+    import ledger_engine
+    import shared_ledger
+    replay = shared_ledger.new_state()
+    for batch in [opening] + journal:
+        ledger_engine.post_transactions(replay, batch)
+    qty = lambda s: {item: sum(b['qty'] for b in q) for item, q in s['inventory_queues'].items()}
+    return (qty(replay) == qty(state)
+            and replay['consumption'].frame().equals(state['consumption'].frame())
+            and replay['consumption'].lots_frame().equals(state['consumption'].lots_frame())
+            and replay['history']['hash'].tolist() == state['history']['hash'].tolist()
+            and np.allclose(replay['history']['매출원가'], state['history']['매출원가']))
+
+
+def bench_concurrency(session_counts=(1, 2, 4, 8, 16), n_tx=100, n_items=200, seed=42, upload_rows=100_000, io_ms=20):
+    """
+    세션 수별 처리량: 전역 잠금(반영 전체 직렬화) vs SharedLedger(품목 단위 낙관적 버전).
+    반영마다 월 파티션 Parquet 저장소(ledger_store) 기록(+ io_ms 왕복 지연)을 포함합니다.
+    ※ CPU 작업은 GIL 때문에 겹치지 않으므로, 세션 수에 따른 처리량 증가는 I/O 대기가 겹치는 만큼입니다.
+    마지막으로 대량 업로드(품목 절반) 진행 중 나머지 품목 수동 입력이 얼마나 처리되는지 비교합니다.
+    """
+    import threading
+
+    import ledger_engine
+    import ledger_store
+    import shared_ledger
+
+    items = [f"품목_{i:04d}" for i in range(n_items)]
+    opening = _opening_batch(items, seed)
+    results = []
+    print(f"\n▶ 공유 원장 동시 반영: 세션당 {n_tx}건(1행), 품목 {n_items:,}개, 반영마다 Parquet 기록 (+{io_ms}ms 왕복)")
+    print(f"  {'세션':>4} {'방식':<7} {'처리시간':>8} {'처리량(건/s)':>12} {'p50(ms)':>8} {'p95(ms)':>8} "
+          f"{'충돌':>5} {'직렬재생 일치':>12}")
+
+    def make_poster(mode, state, store):
+        if mode == 'global':
+            lock, journal = threading.Lock(), []
+
+            def post(batch):
+                with lock:
+                    ledger_engine.post_transactions(state, batch, store=store)
+                    journal.append(batch)
+            return post, journal, lambda: state, lambda: 0
+        shared = shared_ledger.SharedLedger(state, journal=True)
+        return (lambda batch: shared.post(batch, store=store)), shared.journal, lambda: shared.state, \
+            lambda: shared.stats['conflicts']
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_sessions in session_counts:
+            sessions = [_session_batches(n_tx, items, seed, s) for s in range(n_sessions)]
+            for mode in ('global', 'item'):
+                state = shared_ledger.new_state()
+                ledger_engine.post_transactions(state, opening)
+                store = _RemoteStore(ledger_store.LedgerStore(os.path.join(workdir, f"{mode}-{n_sessions}")), io_ms)
+                post, journal, final_state, conflicts = make_poster(mode, state, store)
+                elapsed, latencies = _run_sessions(post, sessions)
+                consistent = _verify_serial(opening, journal, final_state())
+                total = n_sessions * n_tx
+                p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+                results.append({'scale': total, 'stage': f"concurrency:{mode}:{n_sessions}", 'rows': total,
+                                'seconds': round(elapsed, 6), 'rows_per_s': round(total / elapsed, 1),
+                                'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2), 'conflicts': conflicts(),
+                                'serializable': consistent})
+                print(f"  {n_sessions:>4} {mode:<7} {elapsed:>7.2f}s {total / elapsed:>12,.0f} {p50:>8.1f} {p95:>8.1f} "
+                      f"{conflicts():>5} {str(consistent):>12}")
+
+        # 대량 업로드(앞쪽 절반 품목) 진행 중 나머지 품목 수동 입력이 몇 건 처리되는지
+        upload_items, clerk_items = items[:n_items // 2], items[n_items // 2:]
+        upload = pd.concat(_session_batches(upload_rows, upload_items, seed, 99), ignore_index=True)
+        print(f"\n  대량 업로드 {upload_rows:,}행 (품목 {len(upload_items)}개) 중 수동 입력 4세션 (다른 품목 {len(clerk_items)}개)")
+        for mode in ('global', 'item'):
+            state = shared_ledger.new_state()
+            ledger_engine.post_transactions(state, opening)
+            store = _RemoteStore(ledger_store.LedgerStore(os.path.join(workdir, f"{mode}-upload")), io_ms)
+            post, journal, final_state, _ = make_poster(mode, state, store)
+            done = []
+
+            def upload_worker():
+                start = time.perf_counter()
+                post(upload)
+                done.append(time.perf_counter() - start)
+
+            uploader = threading.Thread(target=upload_worker)
+            uploader.start()
+            time.sleep(0.05)
+            clerks = [_session_batches(n_tx, clerk_items, seed, s) for s in range(4)]
+            finished = []
+
+            def clerk_post(batch):
+                start = time.perf_counter()
+                post(batch)
+                finished.append((uploader.is_alive(), time.perf_counter() - start))
+
+            _run_sessions(clerk_post, clerks)
+            uploader.join()
+            consistent = _verify_serial(opening, journal, final_state())
+            during = [latency for alive, latency in finished if alive]
+            first = finished[0][1] * 1000
+            results.append({'scale': upload_rows, 'stage': f"concurrency_upload:{mode}", 'rows': len(finished),
+                            'seconds': round(done[0], 6), 'rows_per_s': round(upload_rows / done[0], 1),
+                            'clerk_posts_during_upload': len(during), 'first_clerk_ms': round(first, 2),
+                            'serializable': consistent})
+            print(f"  {mode:<7} 업로드 {done[0]:.2f}s 동안 수동 입력 {len(during):,}건 완료 · 첫 입력 대기 {first:,.0f}ms "
+                  f"· 직렬재생 일치 {consistent}")
+    return results
+
+
+# ==========================================
+# [7. 적재 서비스 부하 테스트 (ledger_service)]
+# ==========================================
+def bench_service(client_counts=(1, 4, 16), n_batches=20, batch_rows=50, n_items=200, seed=42, io_ms=20):
+    """
+    로컬 적재 서비스(HTTP)에 클라이언트 수별로 동시에 묶음을 보내(반영 완료까지 대기) 지연시간 · 처리량 측정.
+    묶음마다 따로 반영(group_rows=1) vs 쌓인 묶음을 모아 1회 반영(group commit)을 비교하고,
+    반영 순서대로 한 세션에서 다시 반영한 결과와 같은지 검증합니다. 반영마다 저장소 기록(+ io_ms 왕복 지연) 포함
+    """
+    import ledger_engine
+    import ledger_service
+    import ledger_store
+    import shared_ledger
+
+    items = [f"품목_{i:04d}" for i in range(n_items)]
+    opening = _opening_batch(items, seed)
+    results = []
+    print(f"\n▶ 적재 서비스 부하: 클라이언트당 {n_batches}묶음 × {batch_rows}행, 품목 {n_items:,}개, "
+          f"반영마다 Parquet 기록 (+{io_ms}ms 왕복)")
+    print(f"  {'클라이언트':>6} {'방식':<6} {'처리시간':>8} {'처리량(행/s)':>12} {'p50(ms)':>8} {'p95(ms)':>8} "
+          f"{'반영 횟수':>8} {'직렬재생 일치':>12}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_clients in client_counts:
+            sessions = []
+            for c in range(n_clients):
+                rows = pd.concat(_session_batches(n_batches * batch_rows, items, seed, c), ignore_index=True)
+                sessions.append([rows.iloc[i:i + batch_rows] for i in range(0, len(rows), batch_rows)])
+            for mode, group_rows in (('single', 1), ('group', ledger_service.GROUP_ROWS)):
+                state = shared_ledger.new_state()
+                ledger_engine.post_transactions(state, opening)
+                store = _RemoteStore(ledger_store.LedgerStore(os.path.join(workdir, f"{mode}-{n_clients}")), io_ms)
+                service = ledger_service.LedgerService(state, store=store, group_rows=group_rows, journal=True)
+                with ledger_service.LedgerServer(service, port=0) as server:
+                    elapsed, latencies = _run_sessions(lambda batch: ledger_service.submit_remote(server.url, batch),
+                                                       sessions)
+                consistent = _verify_serial(opening, service.journal, service.state)
+                total = n_clients * n_batches * batch_rows
+                p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+                commits = service.stats['commits']
+                results.append({'scale': total, 'stage': f"service:{mode}:{n_clients}", 'rows': total,
+                                'seconds': round(elapsed, 6), 'rows_per_s': round(total / elapsed, 1),
+                                'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2), 'commits': commits,
+                                'serializable': consistent})
+                print(f"  {n_clients:>6} {mode:<6} {elapsed:>7.2f}s {total / elapsed:>12,.0f} {p50:>8.1f} {p95:>8.1f} "
+                      f"{commits:>8} {str(consistent):>12}")
+    return results
+
+
+# ==========================================
+# [7-1. 수입 원가 배분 (landed_cost)]
+# ==========================================
+def _import_docs(n_docs, n_lines, items, seed):
+    """AI 추출 결과 형태(수입일자 · 거래처 · 총통관물류비 · 품목목록)의 가상 수입 문서 묶음"""
+    from types import SimpleNamespace
+    rng = np.random.default_rng(seed)
+    docs = []
+    for d in range(n_docs):
+        lines = [SimpleNamespace(품목명=str(item), 수량=int(qty), 순수단가=float(price)) for item, qty, price in
+                 zip(rng.choice(items, n_lines), rng.integers(1, 500, n_lines), rng.integers(1_000, 50_000, n_lines))]
+        docs.append((f"doc_{d:04d}.pdf", SimpleNamespace(
+            수입일자=str((CONCURRENCY_DATE + pd.Timedelta(days=int(d))).date()), 거래처=f"거래처_{d % 7}",
+            총통관물류비=int(rng.integers(10_000, 5_000_000)), 품목목록=lines)))
+    return docs
+
+
+def _post_docs_per_item(state, docs):
+    """기존 방식: 문서별 수량 비율 파이썬 루프 + 품목마다 1건씩 반영 (건마다 history 재생성)"""
+    import ingest
+    import ledger_engine
+    for _, data in docs:
+        total_qty = sum([item.수량 for item in data.품목목록])
+        for item in data.품목목록:
+            ratio = item.수량 / total_qty if total_qty > 0 else 0
+            date = ingest.normalize_date(data.수입일자)
+            ledger_engine.post_transactions(state, pd.DataFrame([{
+                '날짜': date, '고객사': data.거래처, '품목명': item.품목명, '구분': '입고', '세부구분': '수입(AI자동화)',
+                '수량': item.수량, '순수단가': item.순수단가, '통관물류비': data.총통관물류비 * ratio, '판매단가': 0,
+                'hash': f"{date}{data.거래처}{item.품목명}{item.수량}"}]))
+
+
+def bench_landed_cost(n_docs=50, n_lines=20, n_items=20_000, seed=42):
+    """
+    수입 문서 n_docs건(문서당 n_lines줄)을 기존 방식(품목별 반영)과 landed_cost(벡터 배분 + 묶음 1회 반영)로
+    기초 원장(품목 n_items개) 위에 반영해 시간 · 문서별 배분 합계 차액(원)을 비교
+    """
+    import landed_cost
+    import ledger_engine
+    import shared_ledger
+
+    items = [f"품목_{i:05d}" for i in range(n_items)]
+    opening = _opening_batch(items, seed)
+    docs = _import_docs(n_docs, n_lines, items, seed)
+    fees = np.array([data.총통관물류비 for _, data in docs], dtype=float)
+    results = []
+    print(f"\n▶ 수입 원가 배분: 문서 {n_docs}건 × {n_lines}줄, 기초 원장 {n_items:,}행")
+    for mode in ('per_item', 'bulk'):
+        state = shared_ledger.new_state()
+        ledger_engine.post_transactions(state, opening)
+        start = time.perf_counter()
+        if mode == 'per_item':
+            _post_docs_per_item(state, docs)
+        else:
+            _, _, batch = landed_cost.import_batch(docs, 'qty')
+            ledger_engine.post_transactions(state, batch)
+        elapsed = time.perf_counter() - start
+        history = state['history']
+        gap = float(abs(fees.sum() - history.loc[history['세부구분'] == '수입(AI자동화)', '통관물류비'].sum()))
+        rows = n_docs * n_lines
+        results.append({'scale': rows, 'stage': f"landed_cost:{mode}", 'rows': rows, 'seconds': round(elapsed, 6),
+                        'rows_per_s': round(rows / elapsed, 1), 'fee_gap_won': gap})
+        print(f"  {mode:<9} {elapsed:>8.3f}s  {rows / elapsed:>10,.0f}행/s  배분 합계 차액 {gap:.6f}원")
+    return results
+
+
+# ==========================================
+# [7-2. AI PDF 일괄 처리 검증 (upstage_stub)]
+# ==========================================
+def _stub_documents(n_docs):
+    """스텁 서버가 읽는 줄 형식의 가상 통관서류 (마지막 문서는 첫 문서와 내용이 같은 중복 파일)"""
+    docs = [(f"doc_{d:03d}.txt", (f"수입일자: 2025-03-{d % 28 + 1:02d}\n거래처: 스텁무역_{d}\n총통관물류비: {(d + 1) * 10_000}\n"
+                                  f"품목: 수입물품_{d % 5:02d} | {d + 1} | 1000\n품목: 수입물품_99 | 3 | 500\n").encode())
+            for d in range(n_docs)]
+    return docs + [("doc_dup.txt", docs[0][1])]
+
+
+def bench_pdf_batch(n_docs=8, workers=4, latency=0.2):
+    """
+    로컬 Upstage 스텁 서버로 pdf_batch.process_documents를 돌려 순차(워커 1) · 병렬 · 캐시 재실행 시간을 재고,
+    결과 순서 · 오류 행 · 배치 내 중복 1회 호출 · 캐시 적중(API 재호출 없음)을 검증합니다.
+    반환: (결과 목록, 실패한 검증 목록)
+    """
+    import ai_pipeline
+    import pdf_batch
+    from upstage_stub import StubServer
+
+    docs = _stub_documents(n_docs) + [("broken.bad", b"damaged")]
+    names = [name for name, _ in docs]
+
+    def parse(path):
+        # 손상 파일 흉내: 파싱 단계 예외 → 해당 문서만 '오류' 행
+        if path.endswith('.bad'):
+            raise ValueError("손상된 문서")
+        return ai_pipeline.upstage_parse(path)
+
+    results, failures = [], []
+
+    def check(ok, message):
+        print(f"  {'✅' if ok else '❌'} {message}")
+        if not ok:
+            failures.append(message)
+
+    print(f"\n▶ AI PDF 일괄 처리: 문서 {len(docs)}건 (중복 1 · 손상 1), 스텁 지연 {latency}s, 워커 {workers}")
+    saved_env = {key: os.environ.get(key) for key in ('UPSTAGE_BASE_URL', 'UPSTAGE_API_KEY')}
+    with StubServer(latency=latency) as server, tempfile.TemporaryDirectory() as cache_dir:
+        os.environ.update({'UPSTAGE_BASE_URL': server.base_url, 'UPSTAGE_API_KEY': 'stub'})
+        try:
+            cache = pdf_batch.ExtractionCache(cache_dir)
+            runs = {}
+            for mode, n_workers, run_cache in (('sequential', 1, None), ('parallel', workers, cache),
+                                               ('cached', workers, cache)):
+                before = server.calls.get('/v1/document-digitization', 0)
+                start = time.perf_counter()
+                runs[mode] = pdf_batch.process_documents(docs, parse, ai_pipeline.upstage_extract,
+                                                         max_workers=n_workers, cache=run_cache)
+                elapsed = time.perf_counter() - start
+                parse_calls = server.calls.get('/v1/document-digitization', 0) - before
+                results.append({'scale': len(docs), 'stage': f"pdf_batch:{mode}", 'rows': len(docs),
+                                'seconds': round(elapsed, 6), 'rows_per_s': round(len(docs) / elapsed, 1),
+                                'api_calls': parse_calls})
+                print(f"  {mode:<10} {elapsed:>8.3f}s  API 호출 {parse_calls}회")
+        finally:
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    unique = n_docs  # 중복 파일은 배치 안에서 1번만, 손상 파일은 API 호출 전에 실패
+    for mode, rows in runs.items():
+        check([row['파일명'] for row in rows] == names, f"{mode}: 결과가 입력 순서대로 반환")
+        check(rows[-1]['상태'] == '오류' and "손상된 문서" in rows[-1]['오류내용'] and rows[-1]['data'] is None,
+              f"{mode}: 손상 문서는 오류 행(오류내용 포함)")
+        check(all(row['data']['거래처'] == f"스텁무역_{d}" for d, row in enumerate(rows[:n_docs])),
+              f"{mode}: 문서별 추출 결과가 제 문서와 일치")
+        check(rows[n_docs]['data'] == rows[0]['data'] and rows[n_docs]['hash'] == rows[0]['hash'],
+              f"{mode}: 중복 파일은 같은 결과 공유")
+    calls = {row['stage'].split(':')[1]: row['api_calls'] for row in results}
+    check(calls['sequential'] == unique and calls['parallel'] == unique,
+          f"중복 파일은 배치당 1회만 호출 (순차 {calls['sequential']} · 병렬 {calls['parallel']} / 기대 {unique})")
+    check({row['상태'] for row in runs['parallel'][:-1]} == {'완료'}, "parallel: 첫 실행은 모두 API 추출(완료)")
+    check({row['상태'] for row in runs['cached'][:-1]} == {'캐시'} and calls['cached'] == 0,
+          f"cached: 재실행은 모두 캐시 적중 · API 호출 0회 (호출 {calls['cached']})")
+    return results, failures
+
+
+# ==========================================
+# [8. 결과 저장 및 비교]
+# ==========================================
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save_results(results, args, out_path=None):
+    commit = _git_commit()
+    payload = {
+        'meta': {
+            'commit': commit, 'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'platform': platform.platform(), 'seed': args.seed, 'items': args.items,
+            'tracemalloc': not args.no_memory,
+        },
+        'results': results,
+    }
+    if out_path is None:
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        out_path = os.path.join(RESULT_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{commit}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 벤치마크 결과가 '{out_path}'로 저장되었습니다.")
+    return out_path
+
+
+def compare_results(base_path, new_path, threshold=0.10):
+    """두 결과 파일의 (규모, 단계)별 수행시간 비교. 임계치 이상 느려지면 회귀로 표시"""
+    def load(path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data['meta'], {(r['scale'], r['stage']): r for r in data['results'] if 'seconds' in r}
+
+    base_meta, base = load(base_path)
+    new_meta, new = load(new_path)
+    print(f"기준: {base_meta['commit']}  →  비교: {new_meta['commit']}")
+    print(f"{'규모':>12} | {'단계':<28} | {'기준(s)':>10} | {'비교(s)':>10} | {'변화':>8}")
+    print("-" * 82)
+
+    regressions = 0
+    for key in sorted(base.keys() & new.keys()):
+        before, after = base[key]['seconds'], new[key]['seconds']
+        change = (after - before) / before if before > 0 else 0.0
+        flag = " ⚠️회귀" if change > threshold else ""
+        regressions += bool(flag)
+        print(f"{key[0]:>12,} | {key[1]:<28} | {before:>10.3f} | {after:>10.3f} | {change:>+7.1%}{flag}")
+    return regressions
+
+
+# ==========================================
+# [8. 실행부]
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="원장 파이프라인 단계별 성능 벤치마크")
+    sub = parser.add_subparsers(dest='command')
+
+    cmp_parser = sub.add_parser('compare', help="두 결과 JSON 비교")
+    cmp_parser.add_argument('base')
+    cmp_parser.add_argument('new')
+    cmp_parser.add_argument('--threshold', type=float, default=0.10)
+
+    startup_parser = sub.add_parser('startup', help="앱별 콜드 스타트 첫 렌더링 시간 측정")
+    startup_parser.add_argument('--apps', nargs='+', default=STARTUP_APPS)
+    startup_parser.add_argument('--repeat', type=int, default=3)
+    startup_parser.add_argument('--out', default=None, help="결과 JSON 경로")
+
+    compaction_parser = sub.add_parser('compaction', help="입고 로트 병합 방식별 큐 깊이 · 처리량 비교")
+    compaction_parser.add_argument('--rows', type=int, default=200_000)
+    compaction_parser.add_argument('--items', type=int, default=100)
+    compaction_parser.add_argument('--split', type=int, default=5, help="입고 1건을 나눌 줄 수")
+    compaction_parser.add_argument('--seed', type=int, default=42)
+    compaction_parser.add_argument('--out', default=None, help="결과 JSON 경로")
+
+    concurrency_parser = sub.add_parser('concurrency', help="공유 원장 동시 반영 처리량 · 직렬 재생 검증")
+    concurrency_parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    concurrency_parser.add_argument('--tx', type=int, default=100, help="세션당 거래 수")
+    concurrency_parser.add_argument('--items', type=int, default=200)
+    concurrency_parser.add_argument('--upload', type=int, default=100_000, help="대량 업로드 행 수")
+    concurrency_parser.add_argument('--io-ms', type=float, default=20, help="저장소 기록 1회 왕복 지연(ms)")
+    concurrency_parser.add_argument('--seed', type=int, default=42)
+    concurrency_parser.add_argument('--out', default=None, help="결과 JSON 경로")
+
+    service_parser = sub.add_parser('service', help="적재 서비스 HTTP 부하 테스트 (묶음별 반영 vs group commit)")
+    service_parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16])
+    service_parser.add_argument('--batches', type=int, default=20, help="클라이언트당 묶음 수")
+    service_parser.add_argument('--batch-rows', type=int, default=50, help="묶음당 행 수")
+    service_parser.add_argument('--items', type=int, default=200)
+    service_parser.add_argument('--io-ms', type=float, default=20, help="저장소 기록 1회 왕복 지연(ms)")
+    service_parser.add_argument('--seed', type=int, default=42)
+    service_parser.add_argument('--out', default=None, help="결과 JSON 경로")
+
+    landed_parser = sub.add_parser('landed', help="수입 문서 원가 배분 (품목별 반영 vs 벡터 배분 + 묶음 1회 반영)")
+    landed_parser.add_argument('--docs', type=int, default=50)
+    landed_parser.add_argument('--lines', type=int, default=20, help="문서당 품목 줄 수")
+    landed_parser.add_argument('--items', type=int, default=20_000, help="기초 원장 품목(행) 수")
+    landed_parser.add_argument('--seed', type=int, default=42)
+    landed_parser.add_argument('--out', default=None, help="결과 JSON 경로")
+
+    pdf_parser = sub.add_parser('pdf', help="AI PDF 일괄 처리 검증 (스텁 서버 · 캐시 적중 · 오류 행 · 결과 순서)")
+    pdf_parser.add_argument('--docs', type=int, default=8)
+    pdf_parser.add_argument('--workers', type=int, default=4)
+    pdf_parser.add_argument('--latency', type=float, default=0.2, help="스텁 요청당 지연(초)")
+    pdf_parser.add_argument('--out', default=None, help="결과 JSON 경로")
+
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_SCALES)
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip', nargs='*', default=[], help="생략할 단계 이름")
+    parser.add_argument('--no-memory', action='store_true', help="tracemalloc 메모리 측정 끄기")
+    parser.add_argument('--out', default=None, help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        return 1 if compare_results(args.base, args.new, args.threshold) else 0
+    if args.command == 'startup':
+        save_results(bench_startup(args.apps, args.repeat), args, args.out)
+        return 0
+    if args.command == 'compaction':
+        save_results(bench_compaction(args.rows, args.items, args.split, args.seed), args, args.out)
+        return 0
+    if args.command == 'concurrency':
+        results = bench_concurrency(args.sessions, args.tx, args.items, args.seed, args.upload, args.io_ms)
+        save_results(results, args, args.out)
+        return 0
+    if args.command == 'service':
+        results = bench_service(args.clients, args.batches, args.batch_rows, args.items, args.seed, args.io_ms)
+        save_results(results, args, args.out)
+        return 0
+    if args.command == 'landed':
+        save_results(bench_landed_cost(args.docs, args.lines, args.items, args.seed), args, args.out)
+        return 0
+    if args.command == 'pdf':
+        results, failures = bench_pdf_batch(args.docs, args.workers, args.latency)
+        save_results(results, args, args.out)
+        return 1 if failures else 0
+
+    preload_app_modules()
+    timer = StageTimer(trace_memory=not args.no_memory)
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in args.rows:
+            bench_scale(timer, n_rows, args.items, args.seed, workdir, skip=set(args.skip))
+    save_results(timer.results, args, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
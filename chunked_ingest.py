@@ -0,0 +1,212 @@
+"""
+대용량 엑셀 적재 분할 반영 · 중단 후 재개 (Chunked, resumable ingest)
+
+100만 행 업로드를 post_transactions 한 번으로 반영하면 진행 상황을 볼 수 없고, 도중에 화면이 다시 실행되거나
+연결이 끊기면 그때까지 한 작업을 처음부터 다시 해야 합니다.
+post_in_chunks()는 날짜순 거래 묶음을 CHUNK_ROWS행씩 나눠 반영하고, 덩어리가 커밋될 때마다
+체크포인트(반영을 마친 행 위치)를 디스크에 원자적으로 기록합니다.
+
+- 덩어리 하나가 post_transactions(공유 원장이면 SharedLedger.post)의 원자 반영 단위입니다.
+  실패 · 중단 시 원장은 덩어리 경계에서 멈춰 있고, FIFO는 날짜순으로 이어서 처리하므로
+  나눠서 반영해도 한 번에 반영한 결과와 같습니다.
+- 체크포인트 = 업로드 ID(파일명 · 내용 해시) 디렉터리의
+  batch.parquet(중복 제거 · 정렬까지 끝난 거래 묶음) + checkpoint.json(반영 위치).
+  중복 제거(원장 해시 대조)는 적재 시작 때 한 번만 하고, 재개할 때는 저장된 묶음을 기록된 위치부터 이어갑니다.
+  (파일 안의 동일 행처럼 이미 반영한 행과 해시가 같은 행도 처음 판단 그대로 반영)
+- 재개 전 검증: 반영했다고 기록된 행이 모두 현재 원장에 있어야 이어서 반영합니다.
+  원장에 없으면(세션별 원장 모드에서 세션이 바뀐 경우 등) 이어서 반영하지 않고 checkpoint.stale에 기록을 남기며,
+  체크포인트는 지우지 않습니다. 호출 쪽이 사용자에게 알리고 감사로그에 남긴 뒤 clear()합니다.
+  세션별 원장은 세션과 함께 사라지므로 재개는 같은 세션 안에서만 됩니다 (공유 원장 · 적재 서비스는 프로세스 단위).
+  커밋 직후 체크포인트를 쓰기 전에 끊긴 경우는 다음 덩어리가 이미 원장에 있으므로 그만큼 건너뜁니다.
+- 진행률: 덩어리마다 progress(Progress) 호출 → 반영 행 수 · 처리 속도 · 남은 시간
+- 중단: cancel()이 True면 덩어리 경계에서 멈추고 체크포인트를 남깁니다.
+  (Streamlit에서는 중단 버튼의 재실행 요청이 진행률 표시 갱신 시점에 스크립트를 멈추므로 역시 덩어리 경계)
+
+- 체크포인트 위치: 환경변수 SKU_INGEST_CHECKPOINT (기본 .ingest_checkpoint)
+- 덩어리 크기: 환경변수 SKU_INGEST_CHUNK_ROWS (기본 20,000행). 묶음이 덩어리 1개 이하면 체크포인트를 쓰지 않음
+
+사용 예)
+    checkpoint = IngestCheckpoint.for_files(files)
+    batch, start = checkpoint.resume(state['history']['hash'])
+    if batch is None:
+        batch, start = <새 거래 묶음>, 0
+        checkpoint.stage(batch)
+    finished = post_in_chunks(post, batch, start, checkpoint=checkpoint, progress=print)
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+CHUNK_ROWS = int(os.environ.get('SKU_INGEST_CHUNK_ROWS', '20000'))
+DEFAULT_ROOT = os.environ.get('SKU_INGEST_CHECKPOINT', '.ingest_checkpoint')
+
+
+def upload_id(files):
+    """[(파일명, bytes), ...] → 업로드 ID (같은 파일을 다시 올리면 같은 ID)"""
+    digest = hashlib.sha256()
+    for name, content in files:
+        digest.update(name.encode())
+        digest.update(hashlib.sha256(content).digest())
+    return digest.hexdigest()[:32]
+
+
+# ==========================================
+# [1. 진행률]
+# ==========================================
+class Progress:
+    """반영 진행 상황 (done/total은 묶음 전체 기준, 속도는 이번 실행에서 반영한 행 기준)"""
+
+    def __init__(self, done, total, start, elapsed):
+        self.done = done
+        self.total = total
+        self.start = start
+        self.elapsed = elapsed
+
+    @property
+    def fraction(self):
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def rate(self):
+        """초당 반영 행 수"""
+        return (self.done - self.start) / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """남은 시간(초). 아직 속도를 모르면 None"""
+        return (self.total - self.done) / self.rate if self.rate > 0 else None
+
+    def text(self):
+        eta = "계산 중" if self.eta is None else f"약 {_format_seconds(self.eta)}"
+        return (f"{self.done:,} / {self.total:,}행 ({self.fraction:.0%}) · {self.rate:,.0f}행/초 · "
+                f"경과 {_format_seconds(self.elapsed)} · 남은 시간 {eta}")
+
+    def __str__(self):
+        return self.text()
+
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}분 {seconds:02d}초" if minutes else f"{seconds}초"
+
+
+# ==========================================
+# [2. 체크포인트 (디스크)]
+# ==========================================
+class IngestCheckpoint:
+    """업로드 1건의 체크포인트 (batch.parquet + checkpoint.json)"""
+
+    def __init__(self, upload, root=DEFAULT_ROOT):
+        self.upload = upload
+        self.directory = os.path.join(root, upload)
+        self.batch_path = os.path.join(self.directory, 'batch.parquet')
+        self.state_path = os.path.join(self.directory, 'checkpoint.json')
+        # resume()이 이어서 반영하지 못한 체크포인트 기록 (반영 행이 현재 원장에 없음)
+        self.stale = None
+
+    @classmethod
+    def for_files(cls, files, root=DEFAULT_ROOT):
+        return cls(upload_id(files), root)
+
+    def state(self):
+        """{'total', 'offset', 'started', 'updated'} (없거나 쓰다 만 체크포인트면 None)"""
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def stage(self, batch):
+        """적재 시작: 중복 제거가 끝난 묶음을 저장하고 위치 0 기록"""
+        os.makedirs(self.directory, exist_ok=True)
+        staging = f"{self.batch_path}.tmp"
+        batch.to_parquet(staging, index=False)
+        os.replace(staging, self.batch_path)
+        now = time.time()
+        self._write({'total': len(batch), 'offset': 0, 'started': now, 'updated': now})
+
+    def save(self, offset):
+        """덩어리 커밋 후 반영 위치 기록 (임시 파일 → os.replace로 원자적 교체)"""
+        state = self.state() or {'started': time.time()}
+        state.update({'offset': int(offset), 'updated': time.time()})
+        self._write(state)
+
+    def _write(self, state):
+        staging = f"{self.state_path}.tmp"
+        with open(staging, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(staging, self.state_path)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def resume(self, history_hashes, chunk_rows=CHUNK_ROWS):
+        """
+        이어서 반영할 (저장된 묶음, 재개 위치). 체크포인트가 없거나 이미 끝났으면 (None, 0).
+        기록된 위치까지의 행이 현재 원장(history_hashes)에 없으면 체크포인트는 그대로 두고
+        self.stale에 기록({'total', 'offset', ...})을 남긴 뒤 (None, 0)
+        """
+        self.stale = None
+        state = self.state()
+        if state is None or not os.path.exists(self.batch_path):
+            return None, 0
+        batch = pd.read_parquet(self.batch_path)
+        offset = committed_offset(batch, state['offset'], history_hashes, chunk_rows)
+        if offset is None:
+            self.stale = state
+            return None, 0
+        if offset >= len(batch):
+            self.clear()
+            return None, 0
+        if offset != state['offset']:
+            self.save(offset)
+        return batch, offset
+
+
+def committed_offset(batch, offset, history_hashes, chunk_rows=CHUNK_ROWS):
+    """
+    원장과 맞춰 본 실제 반영 위치. 기록된 위치까지의 행이 원장에 없으면 None.
+    기록 이후 덩어리가 통째로 원장에 있으면(커밋 후 기록 전 중단) 그 덩어리까지 반영된 것으로 봄
+    """
+    present = batch['hash'].isin(history_hashes).to_numpy()
+    if not present[:offset].all():
+        return None
+    while offset < len(batch) and present[offset:offset + chunk_rows].all():
+        offset = min(offset + chunk_rows, len(batch))
+    return offset
+
+
+# ==========================================
+# [3. 분할 반영]
+# ==========================================
+def post_in_chunks(post, batch, start=0, chunk_rows=CHUNK_ROWS, checkpoint=None, progress=None, cancel=None):
+    """
+    batch[start:]를 chunk_rows행씩 post(덩어리)로 반영.
+    checkpoint: 덩어리마다 반영 위치를 기록할 IngestCheckpoint (끝까지 반영하면 삭제)
+    progress: 덩어리마다 Progress를 받는 함수, cancel: True를 돌려주면 다음 덩어리 전에 멈춤
+    반환: 끝까지 반영했으면 True, 중단했으면 False.
+    post가 예외를 던지면 해당 덩어리는 post 쪽에서 롤백되고 체크포인트는 직전 덩어리 위치로 남은 채 예외 전달
+    """
+    total, offset = len(batch), start
+    started = time.perf_counter()
+    if progress is not None:
+        progress(Progress(offset, total, start, 0.0))
+    while offset < total:
+        if cancel is not None and cancel():
+            return False
+        end = min(offset + chunk_rows, total)
+        post(batch.iloc[offset:end])
+        offset = end
+        if checkpoint is not None:
+            checkpoint.save(offset)
+        if progress is not None:
+            progress(Progress(offset, total, start, time.perf_counter() - started))
+    if checkpoint is not None:
+        checkpoint.clear()
+    return True
@@ -0,0 +1,267 @@
+"""
+FIFO 소진 원장 (입고분(로트) → 출고 Consumption Ledger)
+
+출고 시 어떤 입고분이 몇 개, 얼마에 소진되었는지를 비고 문자열로 만들지 않고
+(출고 ID, 로트 ID, 수량, 단가) 컬럼형 배열에 그대로 기록합니다.
+
+- 기록: FIFO 루프에서는 array.append만 수행 (문자열 포맷 없음)
+- 비고: 필요할 때만 render_note()/render_notes()로 지연 생성
+- 추적: "로트 X를 소진한 출고" / "출고 Y에 사용된 로트"를 인덱스(이진 탐색)로 조회
+- 조회: 배열은 슬라이스 사본으로 읽음. 공유 원장(shared_ledger)은 다른 세션이 커밋 중에 배열에 추가 · 잘라내므로
+  원본 배열의 버퍼를 내보내고 있으면(np.frombuffer 뷰 · np.array 복사 도중) 그쪽 append / del이 BufferError로 실패함.
+  array 슬라이스는 GIL을 쥔 채 복사되어 버퍼를 내보내지 않음
+
+    ledger = ConsumptionLedger()
+    lot = ledger.add_lot('사과', date, qty=100, unit_cost=1000)
+    sale = ledger.open_sale('사과', date, qty=30, ref=row_hash)
+    ledger.consume(sale, lot, 30, 1000)
+    ledger.lots_for_sale(sale); ledger.sales_for_lot(lot)
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+
+# 기존 앱들의 비고 문자열 형식
+LEGACY_NOTE = "{date:%Y-%m-%d}분 {qty}개(@{price:,}원)"
+CALCULATOR_NOTE = "{qty}개(단가:{price:,.0f})"
+
+
+def _as_ns(date):
+    if isinstance(date, pd.Timestamp):
+        return date.value
+    return pd.Timestamp(date).value if date is not None else pd.NaT.value
+
+
+def column_copy(values, dtype, n=None):
+    """array 컬럼의 앞 n개(None이면 전체) numpy 사본. 원본이 아니라 슬라이스 사본의 버퍼를 봄"""
+    return np.frombuffer(values[:n], dtype=dtype)
+
+
+def _as_number(value):
+    """정수값이면 int로 (비고/표에서 5.0 대신 5로 표시)"""
+    return int(value) if float(value).is_integer() else value
+
+
+class ConsumptionLedger:
+    """입고분(로트) · 출고 · 소진 내역 컬럼형 저장소 (세션/계산기별 1개)"""
+
+    def __init__(self):
+        # 로트: lot_id = 배열 위치
+        self.lot_item = []
+        self.lot_date = array('q')
+        self.lot_qty = array('d')
+        self.lot_cost = array('d')
+        # 출고: sale_id = 배열 위치, ref = 원장 행 해시 등 외부 키
+        self.sale_item = []
+        self.sale_date = array('q')
+        self.sale_qty = array('d')
+        self.sale_ref = []
+        self._sales_by_ref = {}
+        # 소진 내역: sale_id 오름차순으로만 추가되므로 sale_id 조회는 이진 탐색
+        self.sale_id = array('q')
+        self.lot_id = array('q')
+        self.qty = array('d')
+        self.unit_cost = array('d')
+        self._lot_order = None
+        # 로트 병합(extend_lot) 변경 전 값 (롤백용)
+        self._lot_edits = []
+
+    def __len__(self):
+        return len(self.sale_id)
+
+    def copy(self):
+        """독립 사본 (프로세스 공용 원장을 세션별로 나눠 쓸 때, 배열 단위 복사)"""
+        other = ConsumptionLedger()
+        for name in ('lot_date', 'lot_qty', 'lot_cost', 'sale_date', 'sale_qty', 'sale_id', 'lot_id', 'qty', 'unit_cost'):
+            setattr(other, name, array(getattr(self, name).typecode, getattr(self, name)))
+        for name in ('lot_item', 'sale_item', 'sale_ref', '_lot_edits'):
+            setattr(other, name, list(getattr(self, name)))
+        other._sales_by_ref = {ref: list(sales) for ref, sales in self._sales_by_ref.items()}
+        return other
+
+    # ==========================================
+    # [1. 기록 (FIFO 루프에서 호출)]
+    # ==========================================
+    def add_lot(self, item, date, qty, unit_cost):
+        self.lot_item.append(item)
+        self.lot_date.append(_as_ns(date))
+        self.lot_qty.append(qty)
+        self.lot_cost.append(unit_cost)
+        return len(self.lot_qty) - 1
+
+    def extend_lot(self, lot, qty, unit_cost):
+        """같은 날 · 같은 원가 입고분을 아직 소진되지 않은 기존 로트에 병합 (수량 추가)"""
+        self._lot_edits.append((lot, self.lot_qty[lot], self.lot_cost[lot]))
+        self.lot_qty[lot] += qty
+        self.lot_cost[lot] = unit_cost
+
+    def open_sale(self, item, date, qty, ref=None):
+        sale = len(self.sale_qty)
+        self.sale_item.append(item)
+        self.sale_date.append(_as_ns(date))
+        self.sale_qty.append(qty)
+        self.sale_ref.append(ref)
+        if ref is not None:
+            self._sales_by_ref.setdefault(ref, []).append(sale)
+        return sale
+
+    def consume(self, sale, lot, qty, unit_cost):
+        self.sale_id.append(sale)
+        self.lot_id.append(lot)
+        self.qty.append(qty)
+        self.unit_cost.append(unit_cost)
+
+    # ==========================================
+    # [1-1. 롤백 (일괄 반영 실패 시)]
+    # ==========================================
+    def mark(self):
+        """현재 기록 위치 (truncate()로 이 시점까지 되돌림)"""
+        return len(self.lot_qty), len(self.sale_qty), len(self.sale_id), len(self._lot_edits)
+
+    def truncate(self, mark):
+        """mark() 이후 추가된 로트 · 출고 · 소진 행 제거와 로트 병합 취소 (변경 건수에 비례하는 시간)"""
+        lots, sales, rows, edits = mark
+        for lot, qty, cost in reversed(self._lot_edits[edits:]):
+            self.lot_qty[lot], self.lot_cost[lot] = qty, cost
+        del self._lot_edits[edits:]
+        for ref in reversed(self.sale_ref[sales:]):
+            if ref is not None:
+                refs = self._sales_by_ref[ref]
+                refs.pop()
+                if not refs:
+                    del self._sales_by_ref[ref]
+        for column in (self.lot_item, self.lot_date, self.lot_qty, self.lot_cost):
+            del column[lots:]
+        for column in (self.sale_item, self.sale_date, self.sale_qty, self.sale_ref):
+            del column[sales:]
+        for column in (self.sale_id, self.lot_id, self.qty, self.unit_cost):
+            del column[rows:]
+        self._lot_order = None
+
+    # ==========================================
+    # [2. 추적 조회]
+    # ==========================================
+    def _rows_for_sale(self, sale):
+        return bisect_left(self.sale_id, sale), bisect_right(self.sale_id, sale)
+
+    def _rows_for_lot(self, lot):
+        """로트별 소진 행 위치 (시간순). lot_id 정렬 인덱스는 추가 기록이 있을 때만 다시 만듦"""
+        lot_ids = column_copy(self.lot_id, np.int64)
+        order = self._lot_order
+        if order is None or len(order) != len(lot_ids):
+            order = self._lot_order = np.argsort(lot_ids, kind='stable')
+        lo, hi = np.searchsorted(lot_ids[order], [lot, lot + 1])
+        return order[lo:hi]
+
+    def sales_for_ref(self, ref):
+        """원장 행 키(hash 등)로 출고 ID 목록 조회"""
+        return list(self._sales_by_ref.get(ref, ()))
+
+    def lots_for_sale(self, sale):
+        """출고 Y에 사용된 로트 목록"""
+        lo, hi = self._rows_for_sale(sale)
+        lots = list(self.lot_id[lo:hi])
+        qty = np.array(self.qty[lo:hi])
+        cost = np.array(self.unit_cost[lo:hi])
+        return pd.DataFrame({
+            '로트ID': lots, '입고일': pd.to_datetime([self.lot_date[lot] for lot in lots]),
+            '차감수량': qty, '적용원가': cost, '합계': qty * cost,
+        })
+
+    def sales_for_lot(self, lot):
+        """로트 X를 소진한 출고 목록"""
+        rows = self._rows_for_lot(lot)
+        sales = [self.sale_id[i] for i in rows]
+        qty = np.array([self.qty[i] for i in rows], dtype=float)
+        return pd.DataFrame({
+            '출고ID': sales, '출고일': pd.to_datetime([self.sale_date[s] for s in sales]),
+            '참조': [self.sale_ref[s] for s in sales], '차감수량': qty,
+            '적용원가': np.array([self.unit_cost[i] for i in rows], dtype=float),
+        })
+
+    def lot_remaining(self, lot, upto_row=None):
+        """로트 잔량 (upto_row가 있으면 해당 소진 행까지 반영한 시점의 잔량)"""
+        rows = self._rows_for_lot(lot)
+        if upto_row is not None:
+            rows = rows[rows <= upto_row]
+        return self.lot_qty[lot] - sum(self.qty[i] for i in rows)
+
+    def lots_frame(self, item=None):
+        """로트별 입고수량 · 소진수량 · 잔량 (item 지정 시 해당 품목만)"""
+        n_lots, n_rows = len(self.lot_qty), min(len(self.lot_id), len(self.qty))
+        lots = np.arange(n_lots)
+        if item is not None:
+            lots = np.array([i for i, name in enumerate(self.lot_item[:n_lots]) if name == item], dtype=np.int64)
+        lot_qty = column_copy(self.lot_qty, np.float64, n_lots)[lots]
+        consumed = np.bincount(column_copy(self.lot_id, np.int64, n_rows), weights=column_copy(self.qty, np.float64, n_rows),
+                               minlength=n_lots)[lots]
+        return pd.DataFrame({
+            '로트ID': lots, '품목명': [self.lot_item[i] for i in lots],
+            '입고일': pd.to_datetime(column_copy(self.lot_date, np.int64, n_lots)[lots]),
+            '단가': column_copy(self.lot_cost, np.float64, n_lots)[lots],
+            '입고수량': lot_qty, '소진수량': consumed, '잔량': lot_qty - consumed,
+        })
+
+    def sales_frame(self, item=None):
+        """출고 목록 (item 지정 시 해당 품목만)"""
+        n_sales = len(self.sale_qty)
+        sales = np.arange(n_sales)
+        if item is not None:
+            sales = np.array([i for i, name in enumerate(self.sale_item[:n_sales]) if name == item], dtype=np.int64)
+        return pd.DataFrame({
+            '출고ID': sales, '품목명': [self.sale_item[i] for i in sales],
+            '출고일': pd.to_datetime(column_copy(self.sale_date, np.int64, n_sales)[sales]),
+            '출고수량': column_copy(self.sale_qty, np.float64, n_sales)[sales], '참조': [self.sale_ref[i] for i in sales],
+        })
+
+    # ==========================================
+    # [3. 화면 표시용 (지연 생성)]
+    # ==========================================
+    def breakdown(self, sale):
+        """출고 1건의 FIFO 차감 상세 (기존 latest_fifo_detail 형식)"""
+        lo, hi = self._rows_for_sale(sale)
+        return pd.DataFrame([{
+            '입고일': pd.Timestamp(self.lot_date[self.lot_id[i]]).strftime('%Y-%m-%d'),
+            '차감수량': _as_number(self.qty[i]), '적용원가': self.unit_cost[i],
+            '합계': self.qty[i] * self.unit_cost[i],
+        } for i in range(lo, hi)])
+
+    def lot_status(self, sale):
+        """출고 1건 직후 관련 로트 잔량 (기존 latest_batch_status 형식)"""
+        lo, hi = self._rows_for_sale(sale)
+        return pd.DataFrame([{
+            '입고일': pd.Timestamp(self.lot_date[self.lot_id[i]]).strftime('%Y-%m-%d'),
+            '잔량': _as_number(self.lot_remaining(self.lot_id[i], upto_row=i)),
+        } for i in range(lo, hi)])
+
+    def render_note(self, sale, template=LEGACY_NOTE, sep=", "):
+        lo, hi = self._rows_for_sale(sale)
+        return sep.join(template.format(date=pd.Timestamp(self.lot_date[self.lot_id[i]]), qty=_as_number(self.qty[i]),
+                                        price=_as_number(self.unit_cost[i]))
+                        for i in range(lo, hi))
+
+    def render_notes(self, sales, template=LEGACY_NOTE, sep=", "):
+        """여러 출고의 비고 문자열 (출고 ID가 None이면 빈 문자열)"""
+        return [self.render_note(s, template, sep) if s is not None else '' for s in sales]
+
+    def render_notes_for_refs(self, refs, template=LEGACY_NOTE, sep=", "):
+        """원장 행 키(hash) 목록의 비고 문자열 (같은 키의 출고가 여러 번이면 마지막 출고 기준)"""
+        return self.render_notes([sales[-1] if (sales := self._sales_by_ref.get(ref)) else None for ref in refs],
+                                 template, sep)
+
+    def frame(self):
+        """전체 소진 내역 (분석/내보내기용)"""
+        n_rows = min(len(self.sale_id), len(self.lot_id), len(self.qty), len(self.unit_cost))
+        sale_id = column_copy(self.sale_id, np.int64, n_rows)
+        lot_id = column_copy(self.lot_id, np.int64, n_rows)
+        qty = column_copy(self.qty, np.float64, n_rows)
+        cost = column_copy(self.unit_cost, np.float64, n_rows)
+        return pd.DataFrame({
+            '출고ID': sale_id, '로트ID': lot_id,
+            '품목명': [self.lot_item[i] for i in lot_id],
+            '출고일': pd.to_datetime(column_copy(self.sale_date, np.int64)[sale_id]),
+            '입고일': pd.to_datetime(column_copy(self.lot_date, np.int64)[lot_id]),
+            '차감수량': qty, '적용원가': cost, '합계': qty * cost,
+        })
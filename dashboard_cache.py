@@ -0,0 +1,149 @@
+"""
+대시보드 패널용 캐시 계산 (st.cache_data)
+
+대시보드의 각 패널은 st.fragment로 분리되어 자기 위젯이 바뀔 때 그 패널만 다시 실행됩니다.
+패널이 다시 실행될 때마다 원장 전체를 정렬 · 집계하지 않도록, 계산 결과를 원장 토큰으로 캐시합니다.
+
+- 원장 토큰 = (세션별 원장 ID, 원장 버전). 버전은 ledger_engine.bump_version()이 원장 반영 시 올립니다.
+- 원장 DataFrame · 큐 인자는 '_' 접두어로 캐시 해시 대상에서 제외합니다 (토큰이 내용 변경을 대표).
+- SKU_LEDGER_STORE(월 파티션 Parquet 저장소)가 설정된 공유 원장 · 적재 서비스 모드에서는 판매량 지표를 최근 1년 파티션만 읽어 계산합니다.
+- 뷰어 세션은 게시된 스냅샷(ledger_snapshot)을 프로세스당 1벌만 열어 공유합니다 (st.cache_resource).
+- 수익성 순위는 세션의 증분 큐브(profitability.ProfitCube)를 쓰고, 큐브가 없는 뷰어 세션은 원장에서 1회 구축해 공유합니다.
+  발주 우선순위 힙(reorder_heap.ReorderHeap)도 같은 방식입니다.
+- 재고 연령 분석은 원장 토큰 · 기준일로 캐시하고, 뷰어 세션은 스냅샷에 게시된 잔량 로트 표를 씁니다.
+"""
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+import inventory_aging
+import ledger_snapshot
+import ledger_store
+from profitability import ProfitCube
+from reorder_heap import ReorderHeap
+
+SALES_COLUMNS = ['날짜', '품목명', '구분', '수량']
+
+
+def ledger_token(state):
+    """캐시 키로 쓰는 (원장 ID, 버전). 원장 ID는 세션마다 달라 다른 사용자의 캐시와 섞이지 않음"""
+    if 'ledger_id' not in state:
+        state['ledger_id'] = uuid.uuid4().hex
+    return state['ledger_id'], state.get('ledger_version', 0)
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def shared_snapshot(root, version):
+    """뷰어 세션이 함께 쓰는 스냅샷 {이름: DataFrame} (세션마다 복사하지 않으므로 읽기 전용)"""
+    return ledger_snapshot.load(root, version)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def item_list(token, _history):
+    """원장에 등장한 품목명 (정렬)"""
+    return sorted(_history['품목명'].dropna().unique())
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def crm_latest_first(token, _crm_history):
+    """CRM 이력 최신순"""
+    return _crm_history.sort_values(by='날짜', ascending=False)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def inventory_summary(token, _queues):
+    """품목별 현재고 · 자산금액 (최종매입원가 기준)"""
+    return ledger_snapshot.stock_table(_queues)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def built_profit_cube(token, _history, sub_types):
+    """원장에서 구축한 수익성 큐브 (증분 큐브가 없는 세션용, 같은 토큰이면 세션끼리 공유하므로 읽기 전용)"""
+    return ProfitCube.from_history(_history, sub_types)
+
+
+def profit_cube(state, sub_types):
+    cube = state.get('profit_cube')
+    if cube is not None:
+        return cube
+    return built_profit_cube(ledger_token(state), state['history'], tuple(sub_types))
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def profit_ranking(token, _cube, dimension, n, start, end):
+    """고객사/품목명별 매출이익 (상위 n, 하위 n)"""
+    return _cube.ranking(dimension, n, start, end)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def built_reorder_heap(token, _history, _stock):
+    """스냅샷 원장 · 현재고 표에서 구축한 발주 힙 (뷰어 세션끼리 공유)"""
+    return ReorderHeap.from_state(_history, stock=_stock, now=pd.Timestamp.now())
+
+
+def reorder_heap(state):
+    """세션의 발주 힙 (판매량 창을 현재 시각으로 옮긴 뒤 반환)"""
+    heap = state.get('reorder_heap')
+    if heap is None:
+        heap = built_reorder_heap(ledger_token(state), state['history'], state.get('snapshot_stock'))
+    heap.advance(pd.Timestamp.now())
+    return heap
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def aging_table(token, _consumption, _lots, today):
+    """품목별 재고 연령 구간 표 (잔량 로트 표가 없으면 소진 원장에서 구함)"""
+    lots = _lots if _lots is not None else inventory_aging.remaining_lots(_consumption)
+    return inventory_aging.aging_report(lots, today)
+
+
+def aging_report(state):
+    """오늘 기준 재고 연령 분석 (원장이 바뀌거나 날짜가 바뀔 때만 다시 계산)"""
+    return aging_table(ledger_token(state), state.get('consumption'), state.get('snapshot_lots'),
+                       pd.Timestamp.now().normalize())
+
+
+def _monthly_averages(sales, now):
+    in_12m = sales['날짜'] >= now - pd.Timedelta(days=365)
+    in_3m = sales['날짜'] >= now - pd.Timedelta(days=90)
+    grouped = pd.DataFrame({
+        '품목명': sales['품목명'],
+        '1년': sales['수량'].where(in_12m, 0), '3개월': sales['수량'].where(in_3m, 0),
+    }).groupby('품목명', observed=True).sum()
+    return pd.DataFrame({'avg_12m': grouped['1년'] / 12, 'avg_3m': grouped['3개월'] / 3})
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def sales_metrics(token, _history, now):
+    """전 품목 1년 / 최근 3개월 월평균 판매량 (now 기준, 품목명 인덱스)"""
+    return _monthly_averages(_history[_history['구분'] == '출고'], now)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def stored_sales_metrics(token, _store, now):
+    """sales_metrics와 같은 결과를 Parquet 저장소에서 계산 (최근 1년 월 파티션 · 4개 컬럼만 읽음)"""
+    sales = _store.read(start=now - pd.Timedelta(days=365), columns=SALES_COLUMNS, sale_only=True)
+    return _monthly_averages(sales, now)
+
+
+def item_metrics(state, item):
+    """품목 1개의 (현재고, 1년 월평균, 3개월 월평균). 전 품목 집계는 원장 · 분 단위로 캐시"""
+    token, now = ledger_token(state), pd.Timestamp.now().floor('min')
+    store, metrics = ledger_store.default_store(), None
+    if store is not None and store.exists():
+        try:
+            metrics = stored_sales_metrics(token, store, now)
+        except FileNotFoundError:
+            # 적재 서비스가 파일을 합치는 중(compact)에 읽은 경우 → 이번에는 세션 원장으로 계산
+            pass
+    if metrics is None:
+        metrics = sales_metrics(token, state['history'], now)
+    stock = state.get('snapshot_stock')
+    if stock is not None:
+        current_stock = stock.loc[stock['품목명'] == item, '현재고'].sum()
+    else:
+        current_stock = sum(b['qty'] for b in state['inventory_queues'].get(item, []))
+    if item not in metrics.index:
+        return current_stock, 0, 0
+    return current_stock, metrics.at[item, 'avg_12m'], metrics.at[item, 'avg_3m']
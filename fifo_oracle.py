@@ -0,0 +1,459 @@
+"""
+FIFO 구현 간 차등 검증 (Differential test oracle)
+
+FIFO 원가 계산은 여러 곳에 따로 구현되어 있어 한쪽을 최적화하면 다른 쪽과 조용히 어긋날 수 있습니다.
+이 모듈은 같은 무작위 원장을 모든 구현에 넣고, 독립적으로 작성한 참조 모델(reference_fifo)과
+출고별 매출원가 · 재고부족 수량, 품목별 잔여 로트(큐)와 소진 원장의 잔여 로트가 같은지 확인합니다.
+
+검증 대상 (IMPLEMENTATIONS, register()로 새 엔진 추가)
+- main           : main.FIFOCostCalculator (add_stock / calculate_out_cost)
+- legacy_row     : streamlit_main_legacy.process_transaction (행 단위)
+- legacy_rebuild : streamlit_main_legacy.reconstruct_queues (원장 → 큐 · 소진 원장 복원)
+- app_row        : steamlit_main.process_secure_transaction (행 단위, 세션 상태 포함)
+- new_app_row    : new_streamlit_main.process_secure_transaction
+- engine         : ledger_engine.post_transactions (일괄)
+- engine_price   : 같은 날 · 같은 원가 입고 로트 병합 (LOT_COMPACTION='price')
+- engine_chunked : chunked_ingest.post_in_chunks (작은 덩어리로 나눠 반영)
+- shared         : shared_ledger.SharedLedger.post
+- service        : ledger_service.LedgerService (쓰기 큐 · group commit)
+
+무작위 원장 (random_ledger, 시드 고정)
+- 재고부족: 입고보다 큰 출고, 입고가 한 번도 없는 품목의 출고
+- 부분 소진: 출고 수량이 로트 경계와 무관하게 흩어짐
+- 같은 시각 동률: 시각을 몇 개로만 뽑아 같은 시각의 입고 · 출고가 섞임 (입력 순서가 처리 순서)
+- 같은 날 · 같은 원가 입고 (로트 병합 경로), 통관물류비가 있는 입고 (최종매입원가 = 순수단가 + 통관물류비 / 수량)
+
+불일치가 나오면 해당 구현만 다시 돌려 가며 행을 줄인 최소 반례(shrink)를 출력합니다.
+
+사용 예)
+    python fifo_oracle.py                               # 기본 20개 원장 × 전 구현
+    python fifo_oracle.py --cases 200 --rows 60 --items 3 --impl engine engine_chunked
+    python fifo_oracle.py --seed 7 --cases 1 --rows 400 --show   # 원장 1개와 구현별 결과 요약
+"""
+import argparse
+import re
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+RTOL = 1e-9
+ATOL = 1e-6
+BASE_DATE = pd.Timestamp('2025-03-01')
+
+
+# ==========================================
+# [1. 무작위 원장 생성]
+# ==========================================
+def random_ledger(seed, n_rows=120, n_items=6, n_days=8):
+    """
+    시드 고정 무작위 원장 (ingest.TRANSACTION_COLUMNS, 날짜순 stable 정렬, hash는 행마다 고유).
+    같은 시각 동률은 생성 순서가 곧 처리 순서
+    """
+    rng = np.random.default_rng(seed)
+    items = [f"품목_{i:02d}" for i in range(n_items)]
+    # 품목마다 출고 비중을 달리해 재고부족 · 재고없음 품목이 섞이게 함
+    out_share = rng.uniform(0.2, 0.9, n_items)
+    out_share[rng.random(n_items) < 0.15] = 1.0
+    item_idx = rng.integers(0, n_items, n_rows)
+    action = np.where(rng.random(n_rows) < out_share[item_idx], '출고', '입고')
+    # 시각을 하루 몇 개로만 뽑아 같은 시각 동률을 자주 만듦
+    times = pd.to_timedelta(rng.choice([9 * 60, 9 * 60, 13 * 60 + 30, 17 * 60], n_rows), unit='min')
+    dates = BASE_DATE + pd.to_timedelta(rng.integers(0, n_days, n_rows), unit='D') + times
+    is_in = action == '입고'
+    qty = np.where(is_in, rng.integers(1, 40, n_rows), rng.integers(1, 60, n_rows))
+    base = rng.choice([990.0, 1000.0, 1000.0, 1250.5, 3333.0], n_rows)
+    fee = rng.choice([0, 0, 0, 777, 10_001], n_rows)
+    df = pd.DataFrame({
+        '날짜': dates, '고객사': np.where(is_in, '본사', rng.choice(['고객사_A', '고객사_B'], n_rows)),
+        '품목명': np.asarray(items, dtype=object)[item_idx], '구분': action,
+        '세부구분': np.where(is_in, '매입', rng.choice(['매출', '샘플'], n_rows)), '수량': qty,
+        '순수단가': np.where(is_in, base, 0.0), '통관물류비': np.where(is_in, fee, 0),
+        '판매단가': np.where(is_in, 0, rng.integers(1_000, 5_000, n_rows)),
+        'hash': [f"r{seed}-{i}" for i in range(n_rows)],
+    })
+    return df.sort_values('날짜', kind='stable').reset_index(drop=True)
+
+
+def unit_costs(ledger):
+    """입고 행의 최종매입원가 (ledger_engine.apply_transaction과 같은 식)"""
+    return [base + fee / qty if qty > 0 else base
+            for base, fee, qty in zip(ledger['순수단가'], ledger['통관물류비'], ledger['수량'])]
+
+
+# ==========================================
+# [2. 결과 표준형 · 참조 모델]
+# ==========================================
+class Outcome:
+    """
+    구현 1개의 결과.
+    cogs / shortfall: 원장의 출고 행 순서대로 매출원가 · 미출고 수량
+    lots: {품목: [(단가, 잔량), ...]} FIFO 큐 잔여 로트 (연속된 같은 단가는 합침 → 로트 병합 여부와 무관)
+    ledger_lots: 소진 원장(ConsumptionLedger)으로 계산한 잔여 로트 (없으면 None)
+    """
+
+    def __init__(self, cogs, shortfall, lots, ledger_lots=None):
+        self.cogs = np.asarray(cogs, dtype=np.float64)
+        self.shortfall = np.asarray(shortfall, dtype=np.int64)
+        self.lots = lots
+        self.ledger_lots = ledger_lots
+
+
+def collapse_lots(pairs_by_item):
+    """{품목: [(단가, 수량), ...]} → 잔량 0 로트를 빼고 연속된 같은 단가를 합친 표준형 (빈 품목 제외)"""
+    result = {}
+    for item, pairs in pairs_by_item.items():
+        merged = []
+        for price, qty in pairs:
+            if qty <= 0:
+                continue
+            if merged and merged[-1][0] == price:
+                merged[-1][1] += qty
+            else:
+                merged.append([price, qty])
+        if merged:
+            result[item] = [(float(price), float(qty)) for price, qty in merged]
+    return result
+
+
+def queue_lots(queues):
+    return collapse_lots({item: [(b['price'], b['qty']) for b in queue] for item, queue in queues.items()})
+
+
+def ledger_lots(ledger):
+    """소진 원장의 로트별 잔량 (로트 ID 순 = 품목별 입고 순)"""
+    import inventory_aging
+    lots = inventory_aging.remaining_lots(ledger)
+    pairs = {}
+    for item, price, qty in zip(lots['품목명'].astype(object), lots['단가'], lots['잔량']):
+        pairs.setdefault(item, []).append((price, qty))
+    return collapse_lots(pairs)
+
+
+def reference_fifo(ledger):
+    """참조 모델: 품목별 리스트 큐로 입력 순서대로 선입선출 (앱 코드와 독립)"""
+    queues, cogs, shortfall = {}, [], []
+    for item, action, qty, cost in zip(ledger['품목명'], ledger['구분'], ledger['수량'], unit_costs(ledger)):
+        queue = queues.setdefault(item, [])
+        if action == '입고':
+            queue.append([cost, qty])
+            continue
+        need, total = qty, 0.0
+        while need > 0 and queue:
+            take = min(need, queue[0][1])
+            total += take * queue[0][0]
+            queue[0][1] -= take
+            need -= take
+            if queue[0][1] == 0:
+                queue.pop(0)
+        cogs.append(total)
+        shortfall.append(need)
+    return Outcome(cogs, shortfall, collapse_lots(queues))
+
+
+_SHORTFALL = re.compile(r'재고부족\D*(\d+)\s*개')
+
+
+def parse_shortfall(text, qty):
+    """구현별 상태 · 비고 문자열 → 미출고 수량 ('재고없음'은 전량)"""
+    text = str(text)
+    if '재고없음' in text:
+        return qty
+    match = _SHORTFALL.search(text)
+    return int(match.group(1)) if match else 0
+
+
+def _from_history(ledger, history, queues, consumption):
+    """원장 레코드(hash · 매출원가 · 비고)를 입력 원장의 출고 행 순서로 맞춘 Outcome"""
+    sales = ledger[ledger['구분'] == '출고']
+    rows = history.drop_duplicates('hash', keep='last').set_index('hash').reindex(sales['hash'])
+    shortfall = [parse_shortfall(text, qty) for text, qty in zip(rows['비고'], sales['수량'])]
+    return Outcome(rows['매출원가'].to_numpy(dtype=np.float64), shortfall, queue_lots(queues), ledger_lots(consumption))
+
+
+def _app_session():
+    """앱 모듈 함수를 bare mode로 부를 세션 (streamlit 경고 로그 억제)"""
+    import streamlit as st
+    import streamlit.logger
+    streamlit.logger.set_log_level('error')
+    st.session_state.clear()
+    return st.session_state
+
+
+# ==========================================
+# [3. 검증 대상 구현]
+# ==========================================
+IMPLEMENTATIONS = OrderedDict()
+
+
+def register(name):
+    """구현 등록 데코레이터. 함수는 원장(DataFrame)을 받아 Outcome을 반환"""
+    def decorator(func):
+        IMPLEMENTATIONS[name] = func
+        return func
+    return decorator
+
+
+@register('main')
+def run_main(ledger):
+    from main import FIFOCostCalculator
+    calc = FIFOCostCalculator()
+    for date, item, action, qty, cost in zip(ledger['날짜'], ledger['품목명'], ledger['구분'], ledger['수량'],
+                                             unit_costs(ledger)):
+        if action == '입고':
+            calc.add_stock(item, qty, cost, date)
+        else:
+            calc.calculate_out_cost(item, qty, date)
+    records = calc.sales_records
+    return Outcome([r['매출원가'] for r in records], [parse_shortfall(r['상태'], r['출고수량']) for r in records],
+                   queue_lots(calc._inventory_queues), ledger_lots(calc.consumption))
+
+
+def _legacy_module(session):
+    """streamlit_main_legacy는 import 시 화면까지 실행되므로 초기 데이터 로드를 건너뛰도록 세션을 채운 뒤 import"""
+    import ledger_schema
+    from consumption_ledger import ConsumptionLedger
+    from reorder_heap import ReorderHeap
+    session.update({'history': ledger_schema.empty_frame(LEGACY_COLUMNS), 'inventory_queues': {},
+                    'consumption': ConsumptionLedger(), 'reorder_heap': ReorderHeap()})
+    import streamlit_main_legacy
+    return streamlit_main_legacy
+
+
+LEGACY_COLUMNS = ['날짜', '품목명', '구분', '세부구분', '수량', '단가', '매출원가', '비고', 'hash']
+
+
+@register('legacy_row')
+def run_legacy_row(ledger):
+    session = _app_session()
+    legacy = _legacy_module(session)
+    records = []
+    for date, item, action, sub_type, qty, cost, row_hash in zip(
+            ledger['날짜'], ledger['품목명'], ledger['구분'], ledger['세부구분'], ledger['수량'], unit_costs(ledger),
+            ledger['hash']):
+        legacy.process_transaction(date, item, action, sub_type, qty, cost, row_hash, records)
+    return _from_history(ledger, pd.DataFrame(records), session.inventory_queues, session.consumption)
+
+
+@register('legacy_rebuild')
+def run_legacy_rebuild(ledger):
+    import ledger_schema
+    session = _app_session()
+    legacy = _legacy_module(session)
+    is_in = (ledger['구분'] == '입고').to_numpy()
+    session.history = ledger_schema.compact_frame(pd.DataFrame({
+        '날짜': ledger['날짜'], '품목명': ledger['품목명'], '구분': ledger['구분'], '세부구분': ledger['세부구분'],
+        '수량': ledger['수량'], '단가': np.where(is_in, unit_costs(ledger), 0.0), '매출원가': 0.0, '비고': '',
+        'hash': ledger['hash']}))
+    legacy.reconstruct_queues()
+    # 복원 경로는 출고별 결과를 원장에 쓰지 않으므로 소진 원장에서 출고별 매출원가 · 미출고 수량 계산
+    consumption = session.consumption
+    frame = consumption.frame()
+    by_sale = frame.groupby('출고ID')[['차감수량', '합계']].sum()
+    sales = pd.DataFrame({'hash': consumption.sale_ref, '출고수량': np.array(consumption.sale_qty)})
+    sales = sales.join(by_sale).fillna(0.0).drop_duplicates('hash', keep='last').set_index('hash')
+    sales = sales.reindex(ledger.loc[ledger['구분'] == '출고', 'hash'])
+    return Outcome(sales['합계'], (sales['출고수량'] - sales['차감수량']).round(), queue_lots(session.inventory_queues),
+                   ledger_lots(consumption))
+
+
+def _run_app_rows(app, ledger):
+    session = _app_session()
+    app.initialize_state()
+    for row in ledger.itertuples(index=False):
+        app.process_secure_transaction(row.날짜, row.품목명, row.구분, row.세부구분, row.수량, customer=row.고객사,
+                                       base_price=row.순수단가, customs_logistics_fee=row.통관물류비,
+                                       sale_price=row.판매단가, row_hash=row.hash)
+    return _from_history(ledger, session.history, session.inventory_queues, session.consumption)
+
+
+@register('app_row')
+def run_app_row(ledger):
+    import steamlit_main
+    return _run_app_rows(steamlit_main, ledger)
+
+
+@register('new_app_row')
+def run_new_app_row(ledger):
+    # new_streamlit_main도 import 시 화면(로그인)까지 실행되므로 세션을 먼저 초기화
+    _app_session()
+    import new_streamlit_main
+    return _run_app_rows(new_streamlit_main, ledger)
+
+
+def _run_engine(ledger, compaction='off', chunk_rows=None):
+    import chunked_ingest
+    import ledger_engine
+    import shared_ledger
+    state = shared_ledger.new_state()
+    post = lambda batch: ledger_engine.post_transactions(state, batch, compaction=compaction)
+    if chunk_rows is None:
+        post(ledger)
+    else:
+        chunked_ingest.post_in_chunks(post, ledger, chunk_rows=chunk_rows)
+    return _from_history(ledger, state['history'], state['inventory_queues'], state['consumption'])
+
+
+@register('engine')
+def run_engine(ledger):
+    return _run_engine(ledger)
+
+
+@register('engine_price')
+def run_engine_price(ledger):
+    return _run_engine(ledger, compaction='price')
+
+
+@register('engine_chunked')
+def run_engine_chunked(ledger):
+    return _run_engine(ledger, chunk_rows=25)
+
+
+@register('shared')
+def run_shared(ledger):
+    import shared_ledger
+    shared = shared_ledger.SharedLedger()
+    shared.post(ledger, compaction='off')
+    state = shared.state
+    return _from_history(ledger, state['history'], state['inventory_queues'], state['consumption'])
+
+
+@register('service')
+def run_service(ledger):
+    import ledger_service
+    service = ledger_service.LedgerService().start()
+    # 같은 원장을 세 묶음으로 나눠 보내 group commit 경로까지 거침
+    bounds = np.linspace(0, len(ledger), 4).astype(int)
+    tickets = [service.submit(ledger.iloc[start:end]) for start, end in zip(bounds, bounds[1:]) if end > start]
+    service.stop()
+    failed = [ticket.error for ticket in tickets if ticket.status != 'posted']
+    if failed:
+        raise RuntimeError(failed[0])
+    state = service.state
+    return _from_history(ledger, state['history'], state['inventory_queues'], state['consumption'])
+
+
+# ==========================================
+# [4. 비교 · 최소 반례]
+# ==========================================
+def _same_lots(a, b):
+    if a.keys() != b.keys():
+        return False
+    return all(len(a[item]) == len(b[item]) and all(
+        np.isclose(pa, pb, rtol=RTOL, atol=ATOL) and qa == qb for (pa, qa), (pb, qb) in zip(a[item], b[item]))
+        for item in a)
+
+
+def differences(expected, actual):
+    """참조 결과와 다른 점 목록 (같으면 빈 목록)"""
+    problems = []
+    if len(actual.cogs) != len(expected.cogs):
+        return [f"출고 결과 {len(actual.cogs)}건 (기대 {len(expected.cogs)}건)"]
+    bad = np.flatnonzero(~np.isclose(actual.cogs, expected.cogs, rtol=RTOL, atol=ATOL))
+    if len(bad):
+        i = bad[0]
+        problems.append(f"매출원가 {len(bad)}건 불일치 (출고 #{i}: {actual.cogs[i]:,.4f} ≠ 기대 {expected.cogs[i]:,.4f})")
+    bad = np.flatnonzero(actual.shortfall != expected.shortfall)
+    if len(bad):
+        i = bad[0]
+        problems.append(f"재고부족 수량 {len(bad)}건 불일치 (출고 #{i}: {actual.shortfall[i]} ≠ 기대 {expected.shortfall[i]})")
+    if not _same_lots(expected.lots, actual.lots):
+        items = sorted(set(expected.lots) ^ set(actual.lots)) or \
+            [item for item in expected.lots if not _same_lots({item: expected.lots[item]}, {item: actual.lots[item]})]
+        problems.append(f"잔여 로트(큐) 불일치 (품목 {items[:3]})")
+    if actual.ledger_lots is not None and not _same_lots(expected.lots, actual.ledger_lots):
+        problems.append("소진 원장 잔여 로트가 큐와 불일치")
+    return problems
+
+
+def check(name, ledger):
+    """구현 1개를 원장 1개로 검증. 반환: 다른 점 목록 (예외도 불일치로 기록)"""
+    expected = reference_fifo(ledger)
+    try:
+        actual = IMPLEMENTATIONS[name](ledger)
+    except Exception as e:
+        return [f"예외 {type(e).__name__}: {e}"]
+    return differences(expected, actual)
+
+
+def shrink(name, ledger):
+    """불일치를 유지하는 가장 작은 원장 (품목 1개로 좁힌 뒤 행 덩어리를 반씩 줄여 가며 제거)"""
+    for item in ledger['품목명'].unique():
+        subset = ledger[ledger['품목명'] == item].reset_index(drop=True)
+        if check(name, subset):
+            ledger = subset
+            break
+    chunk = max(len(ledger) // 2, 1)
+    while chunk >= 1:
+        start, removed = 0, False
+        while start < len(ledger):
+            candidate = ledger.drop(ledger.index[start:start + chunk]).reset_index(drop=True)
+            if len(candidate) and check(name, candidate):
+                ledger, removed = candidate, True
+            else:
+                start += chunk
+        if not removed:
+            chunk //= 2
+    return ledger
+
+
+def run_oracle(names, cases=20, n_rows=120, n_items=6, seed=0, show=False):
+    """
+    무작위 원장 cases개로 구현별 검증. 반환: {구현: 첫 불일치 (시드, 다른 점, 최소 반례) 또는 None}
+    같은 구현의 불일치는 첫 건만 줄여서 보고
+    """
+    failures = OrderedDict((name, None) for name in names)
+    elapsed = dict.fromkeys(names, 0.0)
+    for case in range(cases):
+        case_seed = seed + case
+        ledger = random_ledger(case_seed, n_rows, n_items)
+        expected = reference_fifo(ledger)
+        if show:
+            print(f"\n원장 seed={case_seed}: {len(ledger)}행, 출고 {len(expected.cogs)}건 "
+                  f"(재고부족 {int((expected.shortfall > 0).sum())}건), 잔여 로트 "
+                  f"{sum(len(v) for v in expected.lots.values())}개")
+        for name in names:
+            if failures[name] is not None:
+                continue
+            start = time.perf_counter()
+            try:
+                problems = differences(expected, IMPLEMENTATIONS[name](ledger))
+            except Exception as e:
+                problems = [f"예외 {type(e).__name__}: {e}"]
+            elapsed[name] += time.perf_counter() - start
+            if show:
+                print(f"  {name:<15} {'일치' if not problems else '; '.join(problems)}")
+            if problems:
+                failures[name] = (case_seed, problems, shrink(name, ledger))
+    return failures, elapsed
+
+
+# --- 실행부 ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FIFO 구현 간 차등 검증 (참조 모델 대비 매출원가 · 재고부족 · 잔여 로트)")
+    parser.add_argument('--impl', nargs='+', default=list(IMPLEMENTATIONS), choices=list(IMPLEMENTATIONS))
+    parser.add_argument('--cases', type=int, default=20, help="무작위 원장 수")
+    parser.add_argument('--rows', type=int, default=120, help="원장당 행 수 (행 단위 앱 경로는 행 수에 비례해 느려짐)")
+    parser.add_argument('--items', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=0, help="첫 원장 시드 (원장 i의 시드 = seed + i)")
+    parser.add_argument('--show', action='store_true', help="원장 · 구현별 결과를 모두 출력")
+    args = parser.parse_args(argv)
+
+    print(f"▶ FIFO 차등 검증: 원장 {args.cases}개 × {args.rows}행 (품목 {args.items}개, seed {args.seed}~)")
+    failures, elapsed = run_oracle(args.impl, args.cases, args.rows, args.items, args.seed, args.show)
+    print()
+    for name, failure in failures.items():
+        if failure is None:
+            print(f"  ✅ {name:<15} 일치 ({elapsed[name]:.2f}s)")
+            continue
+        case_seed, problems, minimal = failure
+        print(f"  ❌ {name:<15} seed={case_seed}: {'; '.join(problems)}")
+        print(f"     최소 반례 {len(minimal)}행:")
+        print(minimal[['날짜', '품목명', '구분', '수량', '순수단가', '통관물류비', 'hash']].to_string(index=False))
+    return 1 if any(failures.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
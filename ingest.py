@@ -0,0 +1,307 @@
+"""
+엑셀 업로드 수집(Ingestion) 파이프라인
+
+여러 엑셀 파일을 동기화할 때
+1) 워크북별 읽기 · 행 검증 · 날짜 변환 · 해시 · 컬럼 정규화를 병렬 워커에서 수행하고,
+   (검증에 실패한 행은 원장에 반영하지 않고 반려 사유와 함께 반려 시트로 모음)
+2) 결과를 한 번에 합친 뒤 파일 간 중복과 기존 원장 중복을 한 번에 제거하여,
+3) 날짜순으로 정렬된 하나의 거래 묶음으로 원장 엔진(ledger_engine.post_transactions)에 넘깁니다.
+
+컬럼 정규화 규칙
+- 통관비/물류비로 나뉜 파일은 통관물류비로 합산 (결측은 0)
+- 세부구분이 없으면 구분, 고객사가 없으면 '본사', 순수단가/판매단가가 없으면 0
+
+날짜 정규화(normalize_dates / normalize_date)는 main.py, 각 Streamlit 앱, test.py, make_dummy.py가 함께 사용합니다.
+"""
+import functools
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+import perf_trace
+
+REQUIRED_COLUMNS = ['날짜', '품목명', '구분', '수량']
+TRANSACTION_COLUMNS = ['날짜', '고객사', '품목명', '구분', '세부구분', '수량', '순수단가', '통관물류비', '판매단가', 'hash']
+FEE_COLUMNS = ['통관물류비', '통관비', '물류비']
+PRICE_COLUMNS = ['단가', '순수단가', '통관물류비', '통관비', '물류비', '판매단가']
+ACTIONS = ('입고', '출고')
+REJECT_COLUMNS = ['파일명', '행번호', '반려사유']
+
+# 프로세스 기동 비용(pandas import 포함 약 1초)보다 파싱이 오래 걸리는 경우에만 병렬 처리
+PARALLEL_MIN_BYTES = 1024 ** 2
+
+# 날짜 형식 추정에 사용할 고유 문자열 수
+DATE_FORMAT_SAMPLES = 20
+
+
+# ==========================================
+# [0. 날짜 정규화]
+# ==========================================
+def _guess_date_format(samples):
+    """샘플 문자열이 모두 같은 형식으로 추정될 때만 그 형식을 반환 (아니면 None → pandas 기본 추론)"""
+    fmt = None
+    for text in samples:
+        guess = guess_datetime_format(text)
+        if guess is None or (fmt is not None and guess != fmt):
+            return None
+        fmt = guess
+    return fmt
+
+
+def _parse_unique_dates(uniques, errors='raise'):
+    """고유값 배열 → DatetimeIndex. 문자열이면 형식을 한 번만 추정해 지정"""
+    if len(uniques) and all(isinstance(v, str) for v in uniques[:DATE_FORMAT_SAMPLES]):
+        uniques = pd.Index([v.strip() if isinstance(v, str) else v for v in uniques])
+        fmt = _guess_date_format(uniques[:DATE_FORMAT_SAMPLES])
+        if fmt is not None:
+            try:
+                return pd.DatetimeIndex(pd.to_datetime(uniques, format=fmt))
+            except (ValueError, TypeError):
+                pass
+    if errors == 'coerce':
+        # 형식이 섞인 컬럼은 값마다 추론하고, 날짜가 아닌 값만 NaT로
+        return pd.DatetimeIndex(pd.to_datetime(pd.Series(uniques, dtype=object), format='mixed', errors='coerce'))
+    return pd.DatetimeIndex(pd.to_datetime(uniques))
+
+
+def normalize_dates(values, to_day=False, errors='raise'):
+    """
+    날짜 컬럼 일괄 변환 (행별 pd.to_datetime / strptime 대체)
+    - 이미 datetime64 컬럼이면 변환 없이 사용
+    - 그 외에는 고유값만 변환 후 펼침 (같은 날짜 문자열을 반복 파싱하지 않음)
+    - to_day=True면 시각을 버리고 일 단위로 절사
+    - errors='coerce'면 변환할 수 없는 값은 NaT (업로드 검증용)
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        dates = series
+    else:
+        codes, uniques = pd.factorize(series)
+        parsed = _parse_unique_dates(uniques, errors)
+        dates = pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=series.index, name=series.name)
+    return dates.dt.normalize() if to_day else dates
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_text(text):
+    return pd.to_datetime(text)
+
+
+def normalize_date(value, to_day=False):
+    """날짜 1건 변환 (단건 입력 · PDF 수입일자용). 문자열은 캐시된 파싱 결과를 재사용"""
+    if isinstance(value, pd.Timestamp):
+        date = value
+    elif isinstance(value, str):
+        date = _parse_date_text(value.strip())
+    else:
+        date = pd.to_datetime(value)
+    return date.normalize() if to_day and isinstance(date, pd.Timestamp) else date
+
+
+# ==========================================
+# [1. 업로드 행 검증 (원가 계산 전 일괄 검사)]
+# ==========================================
+def _clean_numeric(series):
+    """숫자 변환 (문자가 섞인 object 컬럼만 변환, 정수값이면 정수형으로 맞춰 해시 문자열이 달라지지 않게 함)"""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series
+    values = pd.to_numeric(series.astype(object), errors='coerce')
+    if values.notna().all() and (values == values.round()).all():
+        return values.astype('int64')
+    return values
+
+
+def validate_rows(df, required=REQUIRED_COLUMNS):
+    """
+    업로드된 모든 행을 한 번에 검사하여 (정상 행, 반려 행)으로 분리. 반영(원가 계산) 전에 호출합니다.
+    - 정상 행: 날짜는 datetime으로, 수량 · 단가 컬럼은 숫자로 변환된 DataFrame
+    - 반려 행: 원본 값 + 행번호(엑셀 기준) + 반려사유
+    검사 항목: 날짜 누락/형식, 품목명 누락, 구분(입고/출고), 수량(숫자 · 0 초과), 단가류(숫자 · 0 이상, 빈칸 허용)
+    필수 컬럼이 없으면 ValueError
+    """
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ValueError(f"필수 컬럼 누락: {missing}")
+
+    dates = normalize_dates(df['날짜'], errors='coerce')
+    qty = pd.to_numeric(df['수량'].astype(object), errors='coerce')
+    checks = [
+        (df['날짜'].isna(), "날짜 누락"),
+        (dates.isna() & df['날짜'].notna(), "날짜 형식 오류"),
+        (df['품목명'].isna() | df['품목명'].astype(str).str.strip().eq(''), "품목명 누락"),
+        (~df['구분'].isin(ACTIONS), "구분 오류(입고/출고만 허용)"),
+        (df['수량'].isna(), "수량 누락"),
+        (qty.isna() & df['수량'].notna(), "수량 숫자 아님"),
+        (qty.le(0), "수량 0 이하"),
+    ]
+    for col in [c for c in PRICE_COLUMNS if c in df.columns]:
+        price = pd.to_numeric(df[col].astype(object), errors='coerce')
+        checks += [(price.isna() & df[col].notna(), f"{col} 숫자 아님"), (price.lt(0), f"{col} 음수")]
+
+    reasons = pd.Series('', index=df.index, dtype=object)
+    for mask, reason in checks:
+        reasons = reasons.mask(mask.to_numpy(), reasons + reason + ", ")
+    bad = reasons.ne('')
+
+    rejects = df[bad].copy()
+    rejects.insert(0, '행번호', rejects.index + 2 if isinstance(df.index, pd.RangeIndex) else rejects.index)
+    rejects['반려사유'] = reasons[bad].str.rstrip(', ')
+
+    valid = df[~bad].copy()
+    valid['날짜'] = dates[~bad]
+    for col in ['수량'] + [c for c in PRICE_COLUMNS if c in df.columns]:
+        valid[col] = _clean_numeric(valid[col])
+    return valid, rejects
+
+
+def rejects_to_excel(rejects):
+    """반려 행 → 다운로드용 엑셀 bytes"""
+    buffer = io.BytesIO()
+    rejects.to_excel(buffer, sheet_name='반려', index=False)
+    return buffer.getvalue()
+
+
+# ==========================================
+# [2. 벡터화 해시 · 컬럼 정규화]
+# ==========================================
+def _hash_text(series):
+    """f-string 포맷과 같은 문자열 표현 (generate_row_hash와 동일한 해시를 만들기 위함)"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        text = series.dt.strftime('%Y-%m-%d %H:%M:%S').fillna('NaT')
+        has_fraction = series.dt.microsecond.ne(0) | series.dt.nanosecond.ne(0)
+        if has_fraction.any():
+            text[has_fraction] = series[has_fraction].map(str)
+        return text
+    return series.astype(str)
+
+
+def row_hashes(df, columns):
+    """
+    행 해시 일괄 계산. 앱별 generate_row_hash(row)와 같은 값을 냅니다.
+    (없는 컬럼은 row.get(col, '')처럼 빈 문자열로 취급)
+    """
+    payload = pd.Series('', index=df.index, dtype=object)
+    for col in columns:
+        if col in df.columns:
+            payload = payload + _hash_text(df[col]).astype(object)
+    return pd.Series([hashlib.md5(p.encode()).hexdigest() for p in payload], index=df.index, dtype=object)
+
+
+def normalize_columns(df):
+    """업로드 양식 차이를 표준 거래 컬럼(TRANSACTION_COLUMNS)으로 정규화"""
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"필수 컬럼 누락: {missing}")
+
+    fee_columns = [c for c in FEE_COLUMNS if c in df.columns]
+    out = pd.DataFrame(index=df.index)
+    out['날짜'] = df['날짜']
+    out['고객사'] = df['고객사'].fillna('본사') if '고객사' in df.columns else '본사'
+    out['품목명'] = df['품목명']
+    out['구분'] = df['구분']
+    out['세부구분'] = df['세부구분'].fillna(df['구분']) if '세부구분' in df.columns else df['구분']
+    out['수량'] = df['수량']
+    out['순수단가'] = df['순수단가'].fillna(0) if '순수단가' in df.columns else 0
+    out['통관물류비'] = df[fee_columns].apply(pd.to_numeric, errors='coerce').sum(axis=1) if fee_columns else 0
+    out['판매단가'] = df['판매단가'].fillna(0) if '판매단가' in df.columns else 0
+    out['hash'] = df['hash']
+    return out
+
+
+# ==========================================
+# [3. 워크북 병렬 파싱]
+# ==========================================
+def _available_cpus():
+    """컨테이너 CPU 제한(affinity)을 반영한 사용 가능 코어 수"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def prepare_workbook(content, hash_columns):
+    """워커: 엑셀 bytes → (검증 · 해시 · 정규화된 거래 DataFrame, 반려 행 DataFrame)"""
+    valid, rejects = validate_rows(pd.read_excel(io.BytesIO(content)))
+    valid['hash'] = row_hashes(valid, hash_columns)
+    return normalize_columns(valid), rejects
+
+
+def read_workbooks(files, hash_columns, max_workers=None):
+    """
+    files: [(파일명, bytes), ...]
+    반환: [(파일명, DataFrame 또는 None, 반려 행 DataFrame 또는 None, 오류메시지), ...] (입력 순서 유지)
+    """
+    total_bytes = sum(len(content) for _, content in files)
+    workers = min(len(files), max_workers or _available_cpus())
+    outcomes = []
+
+    if workers > 1 and total_bytes >= PARALLEL_MIN_BYTES:
+        # Streamlit 서버는 다중 스레드 프로세스이므로 fork 대신 spawn으로 워커 생성
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(prepare_workbook, content, hash_columns) for _, content in files]
+            for (name, _), future in zip(files, futures):
+                try:
+                    outcomes.append((name, *future.result(), ''))
+                except Exception as e:
+                    outcomes.append((name, None, None, str(e)))
+    else:
+        for name, content in files:
+            try:
+                outcomes.append((name, *prepare_workbook(content, hash_columns), ''))
+            except Exception as e:
+                outcomes.append((name, None, None, str(e)))
+    return outcomes
+
+
+# ==========================================
+# [4. 일괄 중복 제거]
+# ==========================================
+def collect_new_rows(outcomes, existing_hashes):
+    """
+    파일별 결과를 한 번에 합쳐 중복 제거 후 날짜순 정렬.
+    - 같은 행이 여러 파일에 있으면 먼저 나온 파일의 행만 사용 (한 파일 안의 동일 행은 그대로 유지)
+    - 기존 원장에 있는 해시는 제외
+    반환: (신규 거래 DataFrame, 파일별 신규 건수 {파일명: 건수})
+    """
+    frames = {i: df for i, (_, df, _, _) in enumerate(outcomes) if df is not None and not df.empty}
+    if not frames:
+        return pd.DataFrame(columns=TRANSACTION_COLUMNS), {}
+
+    combined = pd.concat(frames, names=['_file', None]).reset_index(level=0)
+    first_file = combined.groupby('hash', sort=False)['_file'].transform('min')
+    keep = (combined['_file'] == first_file) & ~combined['hash'].isin(existing_hashes)
+    new_rows = combined[keep]
+
+    counts = new_rows['_file'].value_counts()
+    per_file = {outcomes[i][0]: int(counts.get(i, 0)) for i in frames}
+    new_rows = new_rows.drop(columns='_file').sort_values('날짜', kind='stable').reset_index(drop=True)
+    return new_rows, per_file
+
+
+def collect_rejects(outcomes):
+    """파일별 반려 행을 파일명 컬럼을 붙여 하나로 합침 (반려가 없으면 빈 DataFrame)"""
+    frames = [rejects.assign(파일명=name) for name, _, rejects, _ in outcomes if rejects is not None and not rejects.empty]
+    if not frames:
+        return pd.DataFrame(columns=REJECT_COLUMNS)
+    combined = pd.concat(frames, ignore_index=True)
+    return combined[REJECT_COLUMNS + [c for c in combined.columns if c not in REJECT_COLUMNS]]
+
+
+def load_new_transactions(files, existing_hashes, hash_columns, max_workers=None):
+    """
+    read_workbooks + collect_new_rows.
+    반환: (신규 거래, 파일별 신규 건수, 파일별 오류 {파일명: 메시지}, 반려 행)
+    """
+    with perf_trace.stage("read_excel") as s:
+        outcomes = read_workbooks(files, hash_columns, max_workers)
+        s.set_rows(sum(len(df) for _, df, _, _ in outcomes if df is not None))
+    with perf_trace.stage("dedup") as s:
+        new_rows, per_file = collect_new_rows(outcomes, existing_hashes)
+        s.set_rows(len(new_rows))
+    errors = {name: error for name, df, _, error in outcomes if df is None}
+    return new_rows, per_file, errors, collect_rejects(outcomes)
@@ -0,0 +1,56 @@
+import streamlit as st
+
+import chunked_ingest
+
+
+def _request_cancel():
+    st.session_state.ingest_cancelled = True
+
+
+def _resume_scope(per_session):
+    return "같은 세션에서 " if per_session else ""
+
+
+def render_stale_checkpoint(checkpoint, per_session=False):
+    """
+    resume()이 이어서 반영하지 못한 체크포인트 안내. 반환: 안내한 경우 감사로그 상세 문구 (없으면 None)
+    per_session: 세션별 원장 모드 (원장이 세션과 함께 사라져 다른 세션에서는 재개할 수 없음)
+    """
+    state = checkpoint.stale if checkpoint is not None else None
+    if state is None:
+        return None
+    reason = ("세션별 원장 모드에서는 세션이 바뀌면 이전 세션의 원장이 사라져 이어서 반영할 수 없습니다."
+              if per_session else "원장이 초기화되었거나 다른 원장에 반영된 기록입니다.")
+    st.warning(f"⚠️ 같은 파일의 중단된 적재 기록({state['offset']:,} / {state['total']:,}행 반영)이 있지만 "
+               f"반영된 행이 현재 원장에 없습니다. {reason} 현재 원장 기준으로 처음부터 다시 적재하며, "
+               f"이전 적재 기록은 감사로그에 남기고 지웁니다.")
+    return f"이전 기록 {state['offset']}/{state['total']}건 반영분이 현재 원장에 없어 처음부터 적재"
+
+
+def run_chunked_post(post, batch, start=0, checkpoint=None, label="FIFO 큐 적재", per_session=False):
+    """
+    거래 묶음을 덩어리별로 반영하며 진행률 · 처리 속도 · 남은 시간 표시.
+    중단 버튼을 누르면 재실행 요청이 다음 진행률 갱신(덩어리 경계)에서 스크립트를 멈추고 체크포인트가 남음
+    per_session: 세션별 원장 모드면 재개가 같은 세션 안에서만 된다고 안내
+    """
+    st.session_state.ingest_cancelled = False
+    if start:
+        st.info(f"🔁 중단된 업로드를 {start:,} / {len(batch):,}행부터 이어서 반영합니다.")
+    bar = st.progress(0.0, text=f"{label} 준비 중...")
+    caption = st.empty()
+    st.button(f"⏹ 적재 중단 ({_resume_scope(per_session)}다음에 같은 파일을 올리면 이어서 반영)", key="ingest_cancel",
+              on_click=_request_cancel)
+
+    def show(progress):
+        bar.progress(progress.fraction, text=f"{label} {progress.fraction:.0%}")
+        caption.caption(progress.text())
+
+    return chunked_ingest.post_in_chunks(post, batch, start, checkpoint=checkpoint, progress=show,
+                                         cancel=lambda: st.session_state.get('ingest_cancelled', False))
+
+
+def render_cancelled_notice(per_session=False):
+    """중단 버튼으로 멈춘 뒤 다시 그려진 화면에 안내 (1회)"""
+    if st.session_state.pop('ingest_cancelled', False):
+        st.warning(f"⏹ 적재를 중단했습니다. 반영된 덩어리는 원장에 남아 있으며, {_resume_scope(per_session)}"
+                   f"같은 파일을 다시 동기화하면 중단 지점부터 이어서 반영합니다.")
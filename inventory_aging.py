@@ -0,0 +1,99 @@
+"""
+재고 연령 분석 (Inventory Aging)
+
+FIFO 큐를 품목별 dict로 순회하지 않고, 소진 원장(ConsumptionLedger)의 컬럼형 로트 배열에서
+잔량이 남은 로트 전체를 한 번에 구해 연령 구간별 수량 · FIFO 금액을 벡터 연산으로 집계합니다.
+
+- 로트 잔량 = 입고수량 - 소진수량 (소진 행의 로트 ID로 np.bincount) → FIFO 큐 잔량과 같음
+- FIFO 금액 = 잔량 × 로트 단가 (큐의 price와 같은 값)
+- 연령(일) = 기준일 - 입고일, 구간: 0~30일 / 31~90일 / 91~180일 / 180일 초과 (미래 입고일은 0일)
+- 품목 × 구간 집계는 (품목 코드 × 구간 수 + 구간 번호)로 평탄화한 인덱스에 bincount 1번
+
+사용 예)
+    lots = remaining_lots(st.session_state.consumption)
+    report = aging_report(lots, now=pd.Timestamp.now())      # 품목별 구간 수량 · 금액
+    aging_summary(report)                                    # 구간별 합계 (차트용)
+"""
+import numpy as np
+import pandas as pd
+
+from consumption_ledger import column_copy
+
+BUCKET_EDGES = [30, 90, 180]
+BUCKET_LABELS = ['0~30일', '31~90일', '91~180일', '180일 초과']
+LOT_COLUMNS = ['품목명', '입고일', '잔량', '단가']
+
+_DAY_NS = 86_400 * 10 ** 9
+
+
+def remaining_lots(ledger):
+    """
+    잔량이 남은 로트 표 (품목명은 category, 행 순서는 로트 ID 순).
+    공유 원장은 다른 세션이 배열에 계속 추가하므로 원본 배열의 버퍼를 내보내지 않도록
+    먼저 정한 길이의 array 슬라이스 사본을 읽음 (consumption_ledger.column_copy)
+    """
+    n_lots, n_rows = len(ledger.lot_qty), min(len(ledger.lot_id), len(ledger.qty))
+    if n_lots == 0:
+        return pd.DataFrame({c: pd.Series(dtype='float64') for c in LOT_COLUMNS})
+    lot_qty = column_copy(ledger.lot_qty, np.float64, n_lots)
+    consumed = np.bincount(column_copy(ledger.lot_id, np.int64, n_rows),
+                           weights=column_copy(ledger.qty, np.float64, n_rows), minlength=n_lots)[:n_lots]
+    remaining = lot_qty - consumed
+    on_hand = np.flatnonzero(remaining > 0)
+    codes, names = pd.factorize(np.asarray(ledger.lot_item, dtype=object)[:n_lots][on_hand])
+    return pd.DataFrame({
+        '품목명': pd.Categorical.from_codes(codes, names),
+        '입고일': column_copy(ledger.lot_date, np.int64, n_lots)[on_hand].view('datetime64[ns]'),
+        '잔량': remaining[on_hand],
+        '단가': column_copy(ledger.lot_cost, np.float64, n_lots)[on_hand],
+    })
+
+
+def age_days(dates, now):
+    """입고일 → 기준일까지 경과 일수 (미래 입고일은 0)"""
+    stamps = pd.to_datetime(dates).to_numpy(dtype='datetime64[ns]').view(np.int64)
+    return np.maximum((pd.Timestamp(now).value - stamps) // _DAY_NS, 0)
+
+
+def aging_report(lots, now=None):
+    """
+    품목별 연령 구간 수량 · FIFO 금액 표
+    컬럼: 품목명, '<구간> 수량' × 4, '<구간> 금액' × 4, 총수량, 총금액, 평균연령(일, 수량 가중)
+    """
+    now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+    qty_columns = [f"{label} 수량" for label in BUCKET_LABELS]
+    value_columns = [f"{label} 금액" for label in BUCKET_LABELS]
+    columns = ['품목명'] + qty_columns + value_columns + ['총수량', '총금액', '평균연령']
+    if lots.empty:
+        return pd.DataFrame(columns=columns)
+
+    items = lots['품목명'] if isinstance(lots['품목명'].dtype, pd.CategoricalDtype) \
+        else lots['품목명'].astype('category')
+    codes, names = items.cat.codes.to_numpy(), items.cat.categories
+    n_items, n_buckets = len(names), len(BUCKET_LABELS)
+    ages = age_days(lots['입고일'], now)
+    cells = codes * n_buckets + np.searchsorted(BUCKET_EDGES, ages, side='left')
+
+    qty = lots['잔량'].to_numpy(dtype=np.float64)
+    value = qty * lots['단가'].to_numpy(dtype=np.float64)
+    size = n_items * n_buckets
+    qty_grid = np.bincount(cells, weights=qty, minlength=size).reshape(n_items, n_buckets)
+    value_grid = np.bincount(cells, weights=value, minlength=size).reshape(n_items, n_buckets)
+    age_weighted = np.bincount(codes, weights=qty * ages, minlength=n_items)
+
+    report = pd.DataFrame(np.hstack([qty_grid, value_grid]), columns=qty_columns + value_columns)
+    report.insert(0, '품목명', np.asarray(names))
+    report['총수량'] = qty_grid.sum(axis=1)
+    report['총금액'] = value_grid.sum(axis=1)
+    report['평균연령'] = np.divide(age_weighted, report['총수량'].to_numpy(),
+                               out=np.zeros(n_items), where=report['총수량'].to_numpy() > 0)
+    return report[report['총수량'] > 0].reset_index(drop=True)
+
+
+def aging_summary(report):
+    """구간별 전체 수량 · 금액 (구간 순서 유지, 차트용)"""
+    return pd.DataFrame({
+        '구간': BUCKET_LABELS,
+        '수량': [report[f"{label} 수량"].sum() for label in BUCKET_LABELS],
+        '금액': [report[f"{label} 금액"].sum() for label in BUCKET_LABELS],
+    })
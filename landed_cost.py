@@ -0,0 +1,171 @@
+"""
+수입 원가 배분 엔진 (Landed Cost Allocation)
+
+AI PDF 적재는 문서마다 총통관물류비를 품목목록에 수량 비율로 나눠(파이썬 루프, 원 단위 미만 소수 포함)
+품목마다 process_secure_transaction을 불러 history를 품목 수만큼 다시 만들었습니다.
+이 모듈은 문서 묶음 전체를 한 번에 처리합니다.
+
+- document_lines(): 문서 묶음 → 문서별 품목 줄 표 (문서 번호 · 수입일자 · 거래처 · 품목 · 수량 · 순수단가)
+- allocate(): 문서별 제비용을 가중치 비례로 나눈 원 단위 정수 배분 (numpy 벡터 연산)
+  최대 잉여 방식(largest remainder)으로 반올림해 문서별 배분 합계가 총통관물류비와 1원까지 일치
+- allocate_lines(): 배분 기준 'qty'(수량 비례) 또는 'value'(물품가액 = 수량 × 순수단가 비례)
+- import_batch(): 배분 결과를 ingest.TRANSACTION_COLUMNS 거래 묶음으로 → post_batch()로 1회 반영
+  (ledger_engine.post_transactions가 묶음 단위로 원자적이라 중간 실패 시 전체 롤백)
+
+총통관물류비는 원 단위로 사사오입(won)합니다 (round()는 .5를 짝수 쪽으로 보내 1원이 어긋날 수 있음).
+물품가액 합이 0인 문서는 수량 비례로 배분합니다. 제비용은 입고 수량이 있는 줄에만 배분하며
+(수량 0인 입고는 원가에 반영되지 않음), 품목이 없거나 수량이 모두 0이라 배분할 곳이 없는 문서는
+unallocated()로 걸러 import_batch()가 ValueError로 거절합니다 (제비용이 원장에서 사라지지 않도록).
+문서 입력은 ai_pipeline.ImportDocument처럼 수입일자 · 거래처 · 총통관물류비 · 품목목록 속성이 있으면 됩니다.
+(ai_pipeline은 import가 느리므로 이 모듈에서 불러오지 않습니다.)
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+import ingest
+
+BASES = ('qty', 'value')
+BASIS_LABELS = {'qty': "수량 비례", 'value': "금액 비례"}
+LINE_COLUMNS = ['문서', '날짜', '거래처', '품목명', '수량', '순수단가']
+# steamlit_main.generate_row_hash와 같은 해시 기준 컬럼
+HASH_COLUMNS = ['날짜', '고객사', '품목명', '수량', '구분']
+
+
+# ==========================================
+# [1. 문서 → 품목 줄]
+# ==========================================
+def won(amount):
+    """금액 → 원 단위 정수 (사사오입, 0.5원은 올림)"""
+    return int(math.floor(amount + 0.5))
+
+
+def document_lines(docs):
+    """
+    문서 묶음 [(파일명, 문서), ...] → (품목 줄 DataFrame, 문서별 총통관물류비 int64 배열)
+    '문서'는 묶음 안의 문서 순번 (파일명이 겹쳐도 문서별로 배분)
+    """
+    rows = [(doc_no, data.수입일자, data.거래처, item.품목명, item.수량, item.순수단가)
+            for doc_no, (_, data) in enumerate(docs) for item in data.품목목록]
+    lines = pd.DataFrame(rows, columns=LINE_COLUMNS)
+    fees = np.array([won(data.총통관물류비) for _, data in docs], dtype=np.int64)
+    return lines, fees
+
+
+# ==========================================
+# [2. 벡터화 배분 (최대 잉여 반올림)]
+# ==========================================
+def allocate(groups, weights, totals):
+    """
+    줄별 문서 번호 groups(0..n-1), 가중치 weights, 문서별 배분 총액 totals(원) → 줄별 배분액 (int64)
+    가중치 비례 몫을 내림한 뒤 남은 원을 소수부가 큰 줄부터 1원씩 (같으면 앞줄 우선) 더해 문서별 합계를 맞춤.
+    가중치가 0인 줄은 배분받지 않으며, 가중치 합이 0인 문서는 배분하지 않음 (reconcile 차액으로 드러남)
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    weights = np.asarray(weights, dtype=float)
+    totals = np.asarray(totals, dtype=np.int64)
+    n_groups = len(totals)
+    if len(groups) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    weight_sums = np.bincount(groups, weights, minlength=n_groups)
+    allocatable = weight_sums > 0
+    exact = np.divide(totals[groups] * weights, weight_sums[groups], out=np.zeros(len(groups)),
+                      where=allocatable[groups])
+    shares = np.floor(exact).astype(np.int64)
+    remainders = np.where(allocatable, totals - np.bincount(groups, shares, minlength=n_groups).astype(np.int64), 0)
+
+    # 문서 → 소수부 내림차순 → 줄 순서로 정렬해 문서 안 순위가 잉여 원 수보다 작은 줄에 1원씩
+    positions = np.arange(len(groups))
+    order = np.lexsort((positions, -(exact - shares), groups))
+    sorted_groups = groups[order]
+    rank = positions - np.searchsorted(sorted_groups, sorted_groups, side='left')
+    bump = np.zeros(len(groups), dtype=np.int64)
+    bump[order] = (rank < remainders[sorted_groups]) & (weights[order] > 0)
+    return shares + bump
+
+
+def allocate_lines(lines, fees, basis='qty'):
+    """
+    품목 줄에 배분 통관물류비 · 최종매입원가 컬럼을 붙인 사본.
+    basis: 'qty' 수량 비례 / 'value' 물품가액(수량 × 순수단가) 비례 (가액 합이 0인 문서는 수량 비례)
+    입고 수량이 0 이하인 줄은 가중치 0 (배분받지 않음)
+    """
+    if basis not in BASES:
+        raise ValueError(f"배분 기준은 {BASES} 중 하나여야 합니다: {basis}")
+    out = lines.copy()
+    groups = out['문서'].to_numpy(dtype=np.int64)
+    qty = out['수량'].to_numpy(dtype=float)
+    weights = np.where(qty > 0, qty, 0.0)
+    if basis == 'value':
+        value = weights * np.maximum(out['순수단가'].to_numpy(dtype=float), 0)
+        has_value = np.bincount(groups, value, minlength=len(fees)) > 0
+        weights = np.where(has_value[groups], value, weights)
+    out['통관물류비'] = allocate(groups, weights, fees)
+    # ledger_engine.apply_transaction의 최종매입원가(순수단가 + 통관물류비 / 수량)와 같은 값 (검토 화면용)
+    out['최종매입원가'] = out['순수단가'] + np.divide(out['통관물류비'], qty, out=np.zeros(len(out)), where=qty > 0)
+    return out
+
+
+def reconcile(lines, fees):
+    """문서별 총통관물류비와 배분 합계 대조표 (배분할 줄이 있는 문서는 차액 0)"""
+    allocated = np.bincount(lines['문서'].to_numpy(dtype=np.int64), lines['통관물류비'].to_numpy(dtype=np.int64),
+                            minlength=len(fees)).astype(np.int64)
+    return pd.DataFrame({'문서': np.arange(len(fees)), '총통관물류비': fees, '배분합계': allocated,
+                         '차액': fees - allocated})
+
+
+def unallocated(lines, fees):
+    """배분 합계가 총통관물류비와 다른 문서 (reconcile 표 중 차액 ≠ 0인 행 + 사유)"""
+    table = reconcile(lines, fees)
+    bad = table[table['차액'] != 0].reset_index(drop=True)
+    groups = lines['문서'].to_numpy(dtype=np.int64)
+    n_lines = np.bincount(groups, minlength=len(fees))[bad['문서']]
+    n_received = np.bincount(groups, lines['수량'].to_numpy(dtype=float) > 0, minlength=len(fees))[bad['문서']]
+    bad['사유'] = np.select([n_lines == 0, n_received == 0], ["품목 없음", "입고 수량이 모두 0"], "배분 합계 불일치")
+    return bad
+
+
+def check(lines, fees):
+    """배분하지 못한 제비용이 있으면 ValueError (원장 반영 전 검증)"""
+    bad = unallocated(lines, fees)
+    if len(bad):
+        detail = ", ".join(f"{doc + 1}번 문서({reason}, 제비용 {fee:,}원)"
+                           for doc, reason, fee in zip(bad['문서'], bad['사유'], bad['총통관물류비']))
+        raise ValueError(f"제비용을 배분할 수 없는 문서가 있습니다: {detail}")
+
+
+# ==========================================
+# [3. 거래 묶음 (일괄 반영용)]
+# ==========================================
+def transactions(lines, sub_type):
+    """배분된 품목 줄 → 날짜순 입고 거래 묶음 (ingest.TRANSACTION_COLUMNS, 행 해시 포함)"""
+    # 문서마다 수입일자 표기가 다를 수 있어 건별 변환 (ingest.normalize_date가 같은 문자열은 캐시)
+    batch = pd.DataFrame({
+        '날짜': pd.to_datetime(lines['날짜'].map(ingest.normalize_date)), '고객사': lines['거래처'],
+        '품목명': lines['품목명'], '구분': "입고", '세부구분': sub_type, '수량': lines['수량'], '순수단가': lines['순수단가'],
+        '통관물류비': lines['통관물류비'], '판매단가': 0,
+    }, index=lines.index)
+    batch['hash'] = ingest.row_hashes(batch, HASH_COLUMNS)
+    return batch[ingest.TRANSACTION_COLUMNS].sort_values('날짜', kind='stable').reset_index(drop=True)
+
+
+def import_batch(docs, basis='qty', sub_type="수입(AI자동화)"):
+    """
+    AI 추출 문서 묶음 → (배분된 품목 줄, 문서별 총통관물류비, 입고 거래 묶음).
+    제비용을 배분할 수 없는 문서(unallocated)가 있으면 ValueError
+    """
+    lines, fees = document_lines(docs)
+    lines = allocate_lines(lines, fees, basis)
+    check(lines, fees)
+    return lines, fees, transactions(lines, sub_type)
+
+
+def receipt_batch(date, item, qty, base_price, fee, customer="본사", sub_type="수동수입"):
+    """수동 수입 입고 1건 → 입고 거래 묶음 (총 부대비용을 원 단위로 맞춰 1줄에 배분)"""
+    lines = pd.DataFrame([(0, date, customer, item, qty, base_price)], columns=LINE_COLUMNS)
+    fees = np.array([won(fee)], dtype=np.int64)
+    lines = allocate_lines(lines, fees)
+    check(lines, fees)
+    return transactions(lines, sub_type)
@@ -0,0 +1,256 @@
+"""
+원장 FIFO 엔진 (단건 · 일괄 공용)
+
+apply_transaction()은 거래 1건을 FIFO 큐에 반영하고 원장 레코드를 만들어 돌려주는 핵심 로직으로,
+화면의 단건 입력(process_secure_transaction)과 엑셀 일괄 적재(post_transactions)가 함께 사용합니다.
+출고 시 입고분별 차감 내역은 소진 원장(ConsumptionLedger)에 기록하고, 화면용 표는 필요할 때만 만듭니다.
+
+post_transactions()는 날짜순으로 정렬된 거래 묶음을 받아 FIFO는 행 순서대로 처리하되
+history / crm_history 추가 · 정렬과 감사로그 기록은 묶음당 한 번만 수행합니다.
+state는 st.session_state 또는 dict 등 ['키'] 접근이 되는 객체면 됩니다.
+
+일괄 반영은 atomic()으로 감싸 중간에 예외가 나면 반영 전 상태로 되돌립니다.
+- 품목 큐: 묶음에서 처음 건드리는 품목의 큐만 변경 전에 복사 (copy-on-write)
+- 소진 원장: 기록 위치(mark)까지 잘라냄
+- history / crm_history 등 테이블: 새 DataFrame으로 교체되므로 기존 참조만 보관
+롤백 비용은 원장 전체 크기가 아니라 이번 묶음이 건드린 품목 · 행 수에 비례합니다.
+
+입고 로트 병합(LOT_COMPACTION, 환경변수 SKU_LOT_COMPACTION)
+ERP 추출본처럼 입고가 여러 줄로 쪼개져 있으면 줄마다 로트가 생겨 큐가 깊어지므로,
+큐의 마지막 로트와 같은 날 · 같은 최종매입원가 입고분은 새 로트 대신 마지막 로트에 합칠 수 있습니다.
+마지막 로트에 합치는 것은 FIFO 순서를 바꾸지 않고, 원가가 같으므로 출고별 매출원가도 그대로입니다.
+아직 한 개도 소진되지 않은 로트에만 합치므로(큐 항목의 received == qty) 이미 기록된 출고의
+로트 잔량 · 원가 조회(lot_status 등)는 바뀌지 않습니다.
+- 'off'  : 병합 안 함 (기본)
+- 'price': 같은 날 · 같은 최종매입원가 · 미소진 로트만 병합
+(입고 단가가 다른 로트를 평균 원가로 합치는 방식은 입고분별 원가가 사라지고 매출원가가 달라지므로 두지 않음)
+"""
+import os
+from collections import deque
+from contextlib import contextmanager
+
+import ledger_schema
+import perf_trace
+import profitability
+import reorder_heap
+
+# 매출 이력(CRM)에 남길 세부구분
+CRM_SUB_TYPES = ("매출", "출고")
+
+LOT_COMPACTION_MODES = ('off', 'price')
+LOT_COMPACTION = os.environ.get('SKU_LOT_COMPACTION', 'off')
+if LOT_COMPACTION not in LOT_COMPACTION_MODES:
+    LOT_COMPACTION = 'off'
+
+# 일괄 반영 실패 시 참조를 되돌릴 세션 키 (모두 통째로 교체되는 값)
+ROLLBACK_KEYS = ('history', 'crm_history', 'latest_fifo_detail', 'latest_batch_status')
+
+
+# ==========================================
+# [1. 일괄 반영 원자성 (Copy-on-Write 롤백)]
+# ==========================================
+class QueueSnapshot:
+    """품목 큐 copy-on-write 스냅샷. touch(item)는 해당 품목 큐를 변경하기 전에 호출"""
+
+    def __init__(self, queues):
+        self.queues = queues
+        self.saved = {}
+
+    def touch(self, item):
+        if item not in self.saved:
+            queue = self.queues.get(item)
+            # 제자리에서 바뀌는 값은 배치 dict의 qty(출고 차감 · 병합)와 마지막 로트의 received(병합)뿐이므로
+            # dict를 복사하지 않고 큐 순서 · qty 목록 · 마지막 received만 보관 (분할 적재는 덩어리마다 스냅샷을 뜸)
+            self.saved[item] = None if queue is None else (
+                deque(queue), [batch['qty'] for batch in queue], queue[-1].get('received') if queue else None)
+
+    def restore(self):
+        for item, saved in self.saved.items():
+            if saved is None:
+                self.queues.pop(item, None)
+                continue
+            queue, qtys, tail_received = saved
+            for batch, qty in zip(queue, qtys):
+                batch['qty'] = qty
+            if queue and tail_received is not None:
+                queue[-1]['received'] = tail_received
+            self.queues[item] = queue
+
+
+@contextmanager
+def atomic(state):
+    """
+    일괄 반영 트랜잭션. 블록 안에서 예외가 나면 큐 · 소진 원장 · 테이블을 반영 전으로 되돌리고 예외를 다시 던짐
+        with ledger_engine.atomic(st.session_state) as snapshot:
+            for ...: snapshot.touch(item); process_transaction(...)
+    """
+    snapshot = QueueSnapshot(state['inventory_queues'])
+    ledger = state['consumption']
+    mark = ledger.mark()
+    tables = {key: state[key] for key in ROLLBACK_KEYS if key in state}
+    try:
+        yield snapshot
+    except Exception:
+        with perf_trace.stage("rollback", rows=len(snapshot.saved)):
+            snapshot.restore()
+            ledger.truncate(mark)
+            for key, value in tables.items():
+                state[key] = value
+        raise
+
+
+def bump_version(state):
+    """원장 변경 후 호출. 대시보드 캐시(dashboard_cache)는 이 버전이 바뀔 때만 다시 계산"""
+    state['ledger_version'] = state.get('ledger_version', 0) + 1
+
+
+# ==========================================
+# [2. 거래 반영]
+# ==========================================
+def _same_day(a, b):
+    return a.day == b.day and a.month == b.month and a.year == b.year
+
+
+def _mergeable(tail, date, unit_cost, compaction):
+    """큐 마지막 로트에 이번 입고분을 합칠 수 있는지 (같은 날 · 같은 원가 · 아직 소진되지 않은 로트)"""
+    if tail is None or compaction == 'off' or not _same_day(tail['date'], date):
+        return False
+    return tail['price'] == unit_cost and tail.get('received') == tail['qty']
+
+
+def apply_transaction(queues, ledger, date, item, action, sub_type, qty, customer, base_price, customs_logistics_fee,
+                      sale_price, row_hash, compaction=None):
+    """
+    거래 1건 FIFO 반영. compaction이 None이면 LOT_COMPACTION 설정을 따름
+    반환: (원장 레코드, 출고 ID, 감사로그 상세)  ※ 입고면 출고 ID는 None
+    """
+    if item not in queues:
+        queues[item] = deque()
+
+    new_record = {
+        '날짜': date, '고객사': customer, '품목명': item, '구분': action, '세부구분': sub_type,
+        '수량': qty, '순수단가': 0, '통관물류비': 0, '최종매입원가': 0, '매출원가': 0, '상태': '정상', '비고': '', 'hash': row_hash
+    }
+    audit_details = f"[{action}] 품목:{item} | 수량:{qty}개 | "
+    sale = None
+
+    if action == "입고":
+        # 제비용 N빵 분배
+        unit_extra = customs_logistics_fee / qty if qty > 0 else 0
+        final_unit_cost = base_price + unit_extra
+
+        queue = queues[item]
+        tail = queue[-1] if queue else None
+        if _mergeable(tail, date, final_unit_cost, compaction or LOT_COMPACTION):
+            tail['qty'] += qty
+            tail['received'] = tail['qty']
+            ledger.extend_lot(tail['lot'], qty, tail['price'])
+        else:
+            lot = ledger.add_lot(item, date, qty, final_unit_cost)
+            queue.append({'date': date, 'qty': qty, 'price': final_unit_cost, 'lot': lot, 'received': qty})
+
+        new_record.update({'순수단가': base_price, '통관물류비': customs_logistics_fee, '최종매입원가': final_unit_cost,
+                           '비고': f"[{sub_type}] 제비용 분배완료"})
+        audit_details += f"최종매입원가:{final_unit_cost:,.0f}원"
+
+    elif action == "출고":
+        remaining = qty
+        total_cogs = 0
+        sale = ledger.open_sale(item, date, qty, row_hash)
+        queue = queues[item]
+
+        while remaining > 0 and queue:
+            batch = queue[0]
+
+            if batch['qty'] <= remaining:
+                use_qty = batch['qty']
+                total_cogs += use_qty * batch['price']
+                remaining -= use_qty
+                queue.popleft()
+            else:
+                use_qty = remaining
+                total_cogs += use_qty * batch['price']
+                batch['qty'] -= use_qty
+                remaining = 0
+            ledger.consume(sale, batch['lot'], use_qty, batch['price'])
+
+        new_record.update({'순수단가': sale_price, '매출원가': total_cogs,
+                           '비고': f"[{sub_type}] 정상출고" if remaining == 0 else f"재고부족({remaining}개)"})
+        audit_details += f"고객사:{customer} | 매출원가:{total_cogs:,.0f}원"
+
+    return new_record, sale, audit_details
+
+
+def fifo_pass(queues, ledger, batch, crm_sub_types=CRM_SUB_TYPES, compaction=None, touch=None):
+    """
+    거래 묶음의 FIFO 루프 (테이블은 만들지 않음). touch: 품목 큐를 바꾸기 전에 호출할 함수 (롤백 스냅샷용)
+    반환: (원장 레코드 목록, CRM 행 목록, 감사로그 [(구분, 상세), ...], 마지막 출고 ID 또는 None)
+    """
+    records, crm_rows, audit_entries = [], [], []
+    last_sale = None
+    with perf_trace.stage("fifo_loop", rows=len(batch)):
+        rows = zip(batch['날짜'], batch['품목명'], batch['구분'], batch['세부구분'], batch['수량'], batch['고객사'],
+                   batch['순수단가'], batch['통관물류비'], batch['판매단가'], batch['hash'])
+        for date, item, action, sub_type, qty, customer, base_price, fee, sale_price, row_hash in rows:
+            if touch is not None:
+                touch(item)
+            record, sale, details = apply_transaction(
+                queues, ledger, date, item, action, sub_type, qty, customer, base_price, fee, sale_price, row_hash,
+                compaction)
+            records.append(record)
+            audit_entries.append((action, details))
+            if sale is not None:
+                last_sale = sale
+                if sub_type in crm_sub_types:
+                    crm_rows.append({'날짜': date, '고객사': customer, '품목명': item, '판매단가': sale_price,
+                                     '비고': '정상판매'})
+    return records, crm_rows, audit_entries, last_sale
+
+
+def staged_tables(state, records, crm_rows):
+    """기존 테이블에 이번 묶음을 붙인 (crm_history, history). state에는 넣지 않음 (staged append)"""
+    crm_history = state['crm_history']
+    if crm_rows:
+        with perf_trace.stage("crm_concat", rows=len(crm_rows)):
+            crm_history = ledger_schema.append_rows(crm_history, crm_rows)
+    with perf_trace.stage("history_concat_sort", rows=len(records)):
+        base = state['history']
+        history = ledger_schema.append_rows(base, records)
+        # 기존 원장 마지막 날짜 이후로 날짜순으로만 붙으면 stable 정렬 결과가 그대로이므로 정렬 생략
+        dates = [record['날짜'] for record in records]
+        in_order = all(a <= b for a, b in zip(dates, dates[1:]))
+        if not (in_order and (base.empty or base['날짜'].iloc[-1] <= dates[0])):
+            history = history.sort_values(by='날짜', kind='stable').reset_index(drop=True)
+    return crm_history, history
+
+
+def post_transactions(state, batch, crm_sub_types=CRM_SUB_TYPES, compaction=None, store=None):
+    """
+    정렬된 거래 묶음(ingest.TRANSACTION_COLUMNS 컬럼의 DataFrame)을 원장에 일괄 반영.
+    compaction: 입고 로트 병합 방식 (None이면 LOT_COMPACTION)
+    store: 커밋 뒤에 원장 행을 이어 기록할 ledger_store.LedgerStore (write-behind, None이면 기록 안 함)
+    반환: 거래별 감사로그 [(구분, 상세), ...]
+    """
+    if batch.empty:
+        return []
+
+    queues, ledger = state['inventory_queues'], state['consumption']
+
+    # 중간에 실패하면 이번 묶음이 건드린 품목 큐 · 소진 원장 · 테이블만 되돌림
+    with atomic(state) as snapshot:
+        records, crm_rows, audit_entries, last_sale = fifo_pass(queues, ledger, batch, crm_sub_types, compaction,
+                                                                snapshot.touch)
+        # 테이블은 모두 만들어진 뒤에 한꺼번에 교체
+        state['crm_history'], state['history'] = staged_tables(state, records, crm_rows)
+        if last_sale is not None:
+            state['latest_fifo_detail'] = ledger.breakdown(last_sale)
+            state['latest_batch_status'] = ledger.lot_status(last_sale)
+    # 여기까지가 커밋. 버전을 먼저 올려 두면 아래 뒤처리(집계 · 저장소 기록)가 실패해도
+    # 호출 쪽이 반영 완료 여부를 ledger_version으로 구분할 수 있음 (같은 묶음을 다시 반영하지 않도록)
+    bump_version(state)
+    profitability.record_sales(state, records, crm_sub_types)
+    reorder_heap.record_movements(state, records)
+    if store is not None:
+        with perf_trace.stage("store_append", rows=len(records)):
+            store.append(ledger_schema.append_rows(ledger_schema.empty_history(), records))
+    return audit_entries
@@ -0,0 +1,204 @@
+"""
+대용량 가상 수불부(입출고 원장) 생성기
+
+make_dummy.py의 행 단위 루프 대신 NumPy 벡터 연산으로 수백만 행을 한 번에 생성합니다.
+- SKU/고객사 수, 기간, 입고·출고 비율, 세부구분 구성비 설정
+- 계절성(연간 사인파 + 주말 감소), 품목 인기도(Zipf), 로그정규 로트 크기
+- steamlit_main.py 업로드 양식의 통관물류비 / 판매단가 컬럼
+- 고정 시드로 재현 가능, no_stockout=True 시 재고부족이 발생하지 않도록 기초재고 보정
+- CSV / Parquet / 분할 xlsx 저장
+
+사용 예)
+    python ledger_generator.py --rows 1000000 --items 5000 --format parquet --out ledger.parquet
+    python ledger_generator.py --rows 3000000 --format xlsx --out ledger.xlsx --no-stockout
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+ERP_COLUMNS = ['날짜', '고객사', '품목명', '구분', '세부구분', '수량', '순수단가', '통관물류비', '판매단가']
+LEGACY_COLUMNS = ['날짜', '품목명', '구분', '세부구분', '수량', '단가']
+
+DEFAULT_IN_MIX = {'매입': 0.8, '반품': 0.2}
+DEFAULT_OUT_MIX = {'매출': 0.9, '샘플': 0.1}
+
+# 엑셀 시트당 최대 1,048,576행 (헤더 1행 제외)
+XLSX_MAX_ROWS = 1_048_575
+
+
+def _draw_days(rng, n_rows, n_days, start_date, seasonality, peak_day):
+    """연간 계절성과 주말 감소를 반영한 일자 샘플링 (일자별 가중치 역CDF)"""
+    days = np.arange(n_days)
+    doy = (pd.Timestamp(start_date).dayofyear + days) % 365
+    weights = 1.0 + seasonality * np.cos(2 * np.pi * (doy - peak_day) / 365)
+    weekday = (pd.Timestamp(start_date).weekday() + days) % 7
+    weights = weights * np.where(weekday >= 5, 0.3, 1.0)
+    return rng.choice(days, size=n_rows, p=weights / weights.sum())
+
+
+def _draw_mix(rng, n_rows, mix):
+    labels = np.array(list(mix.keys()), dtype=object)
+    probs = np.array(list(mix.values()), dtype=float)
+    return labels[rng.choice(len(labels), size=n_rows, p=probs / probs.sum())]
+
+
+def _opening_stock(item_idx, is_in, minute, qty):
+    """
+    품목별 누적 재고가 한 번이라도 음수가 되면 그 최저치만큼의 기초재고 수량을 계산.
+    같은 시각의 입고/출고는 출고가 먼저 처리된다고 가정(최악의 경우)하여 계산합니다.
+    반환: (기초재고가 필요한 품목 인덱스, 수량)
+    """
+    order = np.lexsort((is_in, minute, item_idx))
+    signed = np.where(is_in, qty, -qty)[order]
+    groups = item_idx[order]
+
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    running = np.cumsum(signed)
+    offset = np.repeat(running[starts] - signed[starts], np.diff(np.r_[starts, len(signed)]))
+    lowest = np.minimum.reduceat(running - offset, starts)
+
+    short = lowest < 0
+    return groups[starts][short], -lowest[short]
+
+
+def generate_ledger(n_rows, n_items=100, n_customers=50, start_date='2025-01-01', n_days=365,
+                    in_ratio=0.4, in_mix=None, out_mix=None, seasonality=0.3, peak_day=330,
+                    lot_size=200, sale_size=30, fee_rate=(0.03, 0.12), markup=(1.15, 1.6),
+                    item_names=None, no_stockout=False, schema='erp', seed=42):
+    """
+    시드 고정 가상 원장 생성
+
+    schema: 'erp'    → 날짜, 고객사, 품목명, 구분, 세부구분, 수량, 순수단가, 통관물류비, 판매단가
+            'legacy' → 날짜, 품목명, 구분, 세부구분, 수량, 단가 (main.py / legacy 앱 양식)
+            'all'    → erp 컬럼 + 단가(최종매입원가)
+    """
+    rng = np.random.default_rng(seed)
+    in_mix = in_mix or DEFAULT_IN_MIX
+    out_mix = out_mix or DEFAULT_OUT_MIX
+
+    if item_names is None:
+        item_names = [f"수입물품_{i:05d}" for i in range(n_items)]
+    items = np.array(item_names, dtype=object)
+    n_items = len(items)
+    customers = np.array([f"고객사_{i:04d}" for i in range(n_customers)], dtype=object)
+
+    # 품목 인기도(Zipf 유사)와 품목별 기준 매입가(로그정규, 100원 단위)
+    popularity = 1.0 / np.arange(1, n_items + 1) ** 0.8
+    item_idx = rng.choice(n_items, size=n_rows, p=popularity / popularity.sum())
+    item_base_price = np.round(rng.lognormal(np.log(10_000), 0.5, n_items), -2).clip(100)
+
+    # 영업시간(08~18시) 중 분 단위 시각
+    day = _draw_days(rng, n_rows, n_days, start_date, seasonality, peak_day)
+    minute = day * 1440 + rng.integers(8 * 60, 18 * 60, n_rows)
+
+    is_in = rng.random(n_rows) < in_ratio
+    sub_type = np.where(is_in, _draw_mix(rng, n_rows, in_mix), _draw_mix(rng, n_rows, out_mix))
+
+    # 입고는 로트 단위(10개 배수), 출고는 소량 판매
+    in_qty = np.maximum(np.round(rng.lognormal(np.log(lot_size), 0.6, n_rows), -1), 10)
+    out_qty = np.maximum(np.round(rng.lognormal(np.log(sale_size), 0.7, n_rows)), 1)
+    qty = np.where(is_in, in_qty, out_qty).astype(np.int64)
+
+    base = item_base_price[item_idx]
+    unit_price = np.round(base * rng.uniform(0.95, 1.05, n_rows), -1)
+    fee = np.round(qty * unit_price * rng.uniform(*fee_rate, n_rows))
+    sale_price = np.round(base * rng.uniform(*markup, n_rows), -1)
+    customer = np.where(is_in, '본사', customers[rng.integers(0, n_customers, n_rows)])
+    unit_price = np.where(is_in, unit_price, 0.0)
+    fee = np.where(is_in, fee, 0.0)
+    sale_price = np.where(is_in, 0.0, sale_price)
+
+    if no_stockout:
+        open_idx, open_qty = _opening_stock(item_idx, is_in, minute, qty)
+        n_open = len(open_idx)
+        item_idx = np.r_[open_idx, item_idx]
+        minute = np.r_[np.zeros(n_open, dtype=minute.dtype), minute]
+        is_in = np.r_[np.ones(n_open, dtype=bool), is_in]
+        sub_type = np.r_[np.full(n_open, '기초재고', dtype=object), sub_type]
+        qty = np.r_[open_qty, qty]
+        customer = np.r_[np.full(n_open, '본사', dtype=object), customer]
+        unit_price = np.r_[item_base_price[open_idx], unit_price]
+        fee = np.r_[np.zeros(n_open), fee]
+        sale_price = np.r_[np.zeros(n_open), sale_price]
+
+    # 같은 시각에는 입고를 먼저 배치하여 날짜순 FIFO 처리 시 순서가 결정적이도록 정렬
+    order = np.lexsort((~is_in, minute))
+    is_in = is_in[order]
+    df = pd.DataFrame({
+        '날짜': pd.Timestamp(start_date) + pd.to_timedelta(minute[order], unit='m'),
+        '고객사': customer[order],
+        '품목명': items[item_idx[order]],
+        '구분': np.where(is_in, '입고', '출고').astype(object),
+        '세부구분': sub_type[order],
+        '수량': qty[order],
+        '순수단가': unit_price[order],
+        '통관물류비': fee[order].astype(np.int64),
+        '판매단가': sale_price[order],
+    })
+
+    if schema in ('legacy', 'all'):
+        df['단가'] = np.where(df['구분'] == '입고', df['순수단가'] + df['통관물류비'] / df['수량'], 0.0).round(2)
+    if schema == 'legacy':
+        return df[LEGACY_COLUMNS]
+    return df
+
+
+def write_ledger(df, path, fmt=None, chunk_rows=XLSX_MAX_ROWS):
+    """
+    CSV / Parquet / xlsx 저장. xlsx는 chunk_rows 단위로 여러 파일(이름_part001.xlsx ...)로 분할하여
+    다중 엑셀 동기화 화면에 그대로 올릴 수 있게 합니다. 저장된 파일 경로 목록을 반환합니다.
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt == 'csv':
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+        return [path]
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+        return [path]
+    if fmt != 'xlsx':
+        raise ValueError(f"지원하지 않는 형식: {fmt}")
+
+    chunk_rows = min(chunk_rows, XLSX_MAX_ROWS)
+    if len(df) <= chunk_rows:
+        paths = [path]
+    else:
+        stem, ext = os.path.splitext(path)
+        paths = [f"{stem}_part{i + 1:03d}{ext or '.xlsx'}" for i in range((len(df) - 1) // chunk_rows + 1)]
+
+    for i, part_path in enumerate(paths):
+        part = df.iloc[i * chunk_rows:(i + 1) * chunk_rows]
+        with pd.ExcelWriter(part_path, engine='xlsxwriter',
+                            engine_kwargs={'options': {'constant_memory': True}}) as writer:
+            part.to_excel(writer, index=False)
+    return paths
+
+
+# --- 실행부 ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="대용량 가상 입출고 원장 생성기")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--customers', type=int, default=50)
+    parser.add_argument('--start', default='2025-01-01')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--in-ratio', type=float, default=0.4)
+    parser.add_argument('--seasonality', type=float, default=0.3)
+    parser.add_argument('--schema', choices=['erp', 'legacy', 'all'], default='erp')
+    parser.add_argument('--no-stockout', action='store_true', help="기초재고를 보정하여 재고부족 방지")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['csv', 'parquet', 'xlsx'], default=None)
+    parser.add_argument('--chunk-rows', type=int, default=XLSX_MAX_ROWS, help="xlsx 파일당 최대 행 수")
+    parser.add_argument('--out', default='inventory_generated.parquet')
+    args = parser.parse_args(argv)
+
+    df = generate_ledger(args.rows, n_items=args.items, n_customers=args.customers, start_date=args.start,
+                         n_days=args.days, in_ratio=args.in_ratio, seasonality=args.seasonality,
+                         no_stockout=args.no_stockout, schema=args.schema, seed=args.seed)
+    paths = write_ledger(df, args.out, args.format, args.chunk_rows)
+    print(f"✅ {len(df):,}행 원장이 생성되었습니다: {', '.join(paths)}")
+
+
+if __name__ == "__main__":
+    main()
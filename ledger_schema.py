@@ -0,0 +1,139 @@
+"""
+원장 DataFrame 압축 스키마 (history / crm_history / 업로드 데이터)
+
+- 저카디널리티 문자열(품목명, 구분, 세부구분, 고객사, 상태) → category
+- 자유 텍스트(비고, hash) → Arrow 문자열(string[pyarrow])
+- 수량 → 값이 들어가는 가장 작은 정수형(하한 int32)
+  * FIFO 루프가 NumPy 스칼라로 파이썬 연산을 하므로 int8/int16은 누적 시 오버플로 위험이 있어 쓰지 않습니다.
+- 금액(단가/원가/비용)은 64비트 유지
+  * 수량 × 단가 같은 원소별 곱은 dtype이 승격되지 않아 int32면 억 단위에서 넘치고,
+    float32는 원 단위 반올림 오차가 생기기 때문입니다.
+
+사용 예)
+    python ledger_schema.py inventory_10k_data.xlsx     # 변환 전/후 메모리 리포트
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+HISTORY_COLUMNS = ['날짜', '고객사', '품목명', '구분', '세부구분', '수량', '순수단가', '통관물류비', '최종매입원가', '매출원가',
+                   '상태', '비고', 'hash']
+CRM_COLUMNS = ['날짜', '고객사', '품목명', '판매단가', '비고']
+
+CATEGORY_COLUMNS = ['품목명', '구분', '세부구분', '고객사', '상태']
+STRING_COLUMNS = ['비고', 'hash']
+QUANTITY_COLUMNS = ['수량', '출고수량']
+STRING_DTYPE = pd.StringDtype('pyarrow')
+
+_INT_CANDIDATES = [np.int32, np.int64]
+
+
+def _smallest_int(values):
+    """정수값만 있는 배열이 들어가는 가장 작은 정수형 (없으면 None)"""
+    if len(values) == 0:
+        return np.int32
+    lo, hi = values.min(), values.max()
+    for dtype in _INT_CANDIDATES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return None
+
+
+def _compact_quantity(series):
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return series
+    values = series.to_numpy()
+    if pd.api.types.is_float_dtype(series):
+        # 결측치가 있거나 소수점이 있는 실수는 그대로 유지
+        if np.isnan(values).any() or not np.array_equal(values, np.floor(values)):
+            return series
+    dtype = _smallest_int(values)
+    return series.astype(dtype) if dtype is not None and dtype != series.dtype else series
+
+
+def compact_frame(df):
+    """원장 DataFrame을 압축 dtype으로 변환한 사본 반환 (없는 컬럼은 무시)"""
+    df = df.copy()
+    for col in df.columns:
+        if col in CATEGORY_COLUMNS:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        elif col in STRING_COLUMNS:
+            df[col] = df[col].astype(STRING_DTYPE)
+        elif col in QUANTITY_COLUMNS:
+            df[col] = _compact_quantity(df[col])
+    return df
+
+
+def empty_frame(columns):
+    """압축 스키마가 적용된 빈 원장 테이블"""
+    return compact_frame(pd.DataFrame({col: pd.Series(dtype='datetime64[ns]' if col == '날짜' else 'float64')
+                                       for col in columns}))
+
+
+def empty_history():
+    return empty_frame(HISTORY_COLUMNS)
+
+
+def empty_crm():
+    return empty_frame(CRM_COLUMNS)
+
+
+def append_rows(base, new_rows):
+    """
+    압축 스키마를 유지하며 행 추가.
+    category는 두 쪽 카테고리를 합쳐 맞추고, 정수 컬럼은 값이 들어가면 기존 dtype으로 맞춥니다.
+    (값이 넘치거나 실수가 들어오면 concat이 자동으로 상위 dtype으로 승격)
+    """
+    if not isinstance(new_rows, pd.DataFrame):
+        new_rows = pd.DataFrame(new_rows)
+    if new_rows.empty:
+        return base
+    if base.empty:
+        return compact_frame(new_rows.reindex(columns=base.columns.union(new_rows.columns, sort=False)))
+
+    base = base.copy(deep=False)
+    new_rows = new_rows.copy()
+    for col in new_rows.columns.intersection(base.columns):
+        dtype = base[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            merged = dtype.categories.union(pd.Index(new_rows[col].dropna().unique()), sort=False)
+            if len(merged) != len(dtype.categories):
+                base[col] = base[col].cat.set_categories(merged)
+            new_rows[col] = pd.Categorical(new_rows[col], categories=base[col].cat.categories)
+        elif dtype == STRING_DTYPE:
+            new_rows[col] = new_rows[col].astype(STRING_DTYPE)
+        elif pd.api.types.is_integer_dtype(dtype) and pd.api.types.is_numeric_dtype(new_rows[col]):
+            values = pd.to_numeric(new_rows[col]).to_numpy()
+            info = np.iinfo(dtype)
+            if (not np.isnan(values.astype(float)).any() and np.array_equal(values, np.floor(values))
+                    and info.min <= values.min() and values.max() <= info.max):
+                new_rows[col] = values.astype(dtype)
+    return pd.concat([base, new_rows], ignore_index=True)
+
+
+# ==========================================
+# [메모리 리포트]
+# ==========================================
+def memory_report(before, after):
+    """컬럼별 변환 전/후 메모리(deep) 비교표"""
+    b = before.memory_usage(deep=True, index=False)
+    a = after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        '변환전 dtype': before.dtypes.astype(str), '변환후 dtype': after.dtypes.astype(str),
+        '변환전(MB)': b / 1024 ** 2, '변환후(MB)': a / 1024 ** 2,
+    })
+    report.loc['합계'] = ['', '', b.sum() / 1024 ** 2, a.sum() / 1024 ** 2]
+    report['절감률'] = 1 - report['변환후(MB)'] / report['변환전(MB)']
+    return report
+
+
+# --- 실행부 ---
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else 'inventory_10k_data.xlsx'
+    raw = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_excel(path)
+    compact = compact_frame(raw)
+    with pd.option_context('display.width', 160, 'display.float_format', '{:,.3f}'.format):
+        print(memory_report(raw, compact))
@@ -0,0 +1,524 @@
+"""
+원장 적재 서비스 (Streamlit 없이 도는 HTTP / CLI 적재 엔드포인트)
+
+원장 반영은 지금까지 브라우저 세션(st.session_state) 안에서만 돌았기 때문에 야간 ERP 추출본을 자동으로 밀어 넣을 수 없었습니다.
+LedgerService는 세션과 무관한 원장 상태(dict, ledger_engine · shared_ledger와 같은 키)를 혼자 소유하고,
+들어온 거래 묶음을 쓰기 큐에 쌓아 작성자 스레드 1개가 일괄 엔진(ledger_engine.post_transactions)으로 반영합니다.
+
+- 접수(submit): 검증(ingest.validate_rows) · 해시 · 표준 컬럼 정규화 · 날짜순 정렬 후 큐에 넣고 접수번호(Ticket) 반환
+  hash 컬럼이 있으면 그대로 쓰고(앱에서 보낸 묶음), 없으면 HASH_COLUMNS로 계산
+- 반영: 큐에 쌓인 묶음을 도착 순서대로 모아(최대 GROUP_ROWS행) post_transactions 1회로 반영 (group commit)
+  · 중복 제거는 반영 시점에 원장 해시 집합으로 수행 (묶음 안의 동일 행은 유지, 다른 묶음과 겹치면 먼저 온 묶음만)
+  · 모은 묶음을 이어 붙여 한 번에 반영하므로 결과는 묶음을 도착 순서대로 하나씩 반영한 것과 같음
+  · 반영 중 오류가 나면 post_transactions가 전체를 롤백하고, 묶음별로 다시 반영해 실패한 묶음만 거절
+  · 커밋 뒤처리(집계 · 저장소 기록)만 실패한 경우는 ledger_version으로 구분해 반영된 것으로 처리 (다시 반영하지 않음)
+- 저장: SKU_LEDGER_STORE(ledger_store)가 있으면 반영분을 커밋 뒤에 기록하고(write-behind), 서비스 시작 때 저장소 원장을 날짜순으로 다시 반영해 큐를 복원
+  작성자 스레드는 큐가 빌 때 직전 합치기 이후 ledger_store.COMPACT_EVERY회 이상 반영했으면 저장소의 작은 파일을 합침
+  (저장소는 도착 순서를 남기지 않으므로 과거 날짜 묶음이 늦게 들어온 적이 있으면 복원된 큐는 날짜순 FIFO로 다시 계산됨)
+- 조회: SKU_LEDGER_SNAPSHOT이 있으면 반영 후 뷰어 스냅샷(ledger_snapshot)을 게시
+  (큐가 비었을 때 또는 PUBLISH_INTERVAL초마다) → Streamlit 앱은 스냅샷을 읽기만 하는 thin reader
+  게시 경로가 있으면 접수 건은 자기 행이 들어간 스냅샷이 게시된 뒤에 완료(snapshot_version 포함)
+
+HTTP (ThreadingHTTPServer)
+- POST /transactions  : JSON 배열 · {"rows": [...]} · CSV 본문. ?wait=1이면 반영 완료까지 대기, &audit=1이면 감사로그 포함
+- GET  /batches/<ID>   : 접수 건 상태 (queued / posted / failed)
+- GET  /status         : 큐 길이 · 누적 통계 · 원장 행 수
+
+사용 예)
+    python ledger_service.py serve --port 8790 --store .ledger_store --snapshot .ledger_snapshot
+    python ledger_service.py post erp_export.xlsx --url http://127.0.0.1:8790      # 야간 배치
+    SKU_LEDGER_SERVICE=http://127.0.0.1:8790 SKU_LEDGER_SNAPSHOT=.ledger_snapshot streamlit run steamlit_main.py
+    python benchmark.py service --clients 1 4 16                                    # 로컬 부하 테스트
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import ingest
+import ledger_engine
+import ledger_snapshot
+import ledger_store
+import perf_trace
+import shared_ledger
+
+SERVICE_URL = os.environ.get('SKU_LEDGER_SERVICE', '')
+DEFAULT_PORT = 8790
+HASH_COLUMNS = ['날짜', '고객사', '품목명', '수량', '구분']
+
+# 한 번에 모아 반영할 최대 행 수 (1이면 묶음마다 따로 반영)
+GROUP_ROWS = 50_000
+PUBLISH_INTERVAL = 5.0
+MAX_TICKETS = 1_000
+WAIT_TIMEOUT = 600
+
+
+# ==========================================
+# [1. 요청 행 정규화 · 저장소 원장 복원]
+# ==========================================
+def prepare_rows(df):
+    """요청 행 → (날짜순 표준 거래 묶음, 반려 행). 필수 컬럼이 없으면 ValueError"""
+    valid, rejects = ingest.validate_rows(df)
+    if 'hash' not in valid.columns:
+        valid['hash'] = ingest.row_hashes(valid, HASH_COLUMNS)
+    elif valid['hash'].isna().any():
+        valid['hash'] = valid['hash'].fillna(ingest.row_hashes(valid, HASH_COLUMNS))
+    batch = ingest.normalize_columns(valid).sort_values('날짜', kind='stable').reset_index(drop=True)
+    return batch, rejects
+
+
+def history_transactions(history):
+    """원장(history) → 다시 반영할 표준 거래 묶음 (출고 행의 순수단가는 판매단가로 기록되어 있음)"""
+    is_in = (history['구분'] == '입고').to_numpy()
+    batch = pd.DataFrame({
+        '날짜': history['날짜'], '고객사': history['고객사'].astype(object), '품목명': history['품목명'].astype(object),
+        '구분': history['구분'].astype(object), '세부구분': history['세부구분'].astype(object), '수량': history['수량'],
+        '순수단가': np.where(is_in, history['순수단가'], 0), '통관물류비': np.where(is_in, history['통관물류비'], 0),
+        '판매단가': np.where(is_in, 0, history['순수단가']), 'hash': history['hash'].astype(object),
+    })
+    return batch.sort_values('날짜', kind='stable').reset_index(drop=True)
+
+
+# ==========================================
+# [2. 접수 건 (Ticket)]
+# ==========================================
+class Ticket:
+    """접수된 거래 묶음 1건. 작성자 스레드가 반영을 마치면 done 이벤트가 켜짐"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, batch, rejects, source=''):
+        self.id = f"{int(time.time())}-{next(self._ids)}"
+        self.batch = batch
+        self.rejects = rejects
+        self.source = source
+        self.status = 'queued'
+        self.posted = 0
+        self.duplicates = 0
+        self.error = ''
+        self.audit = []
+        self.snapshot_version = None
+        self.received = time.time()
+        self.finished = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def finish(self, status, error=''):
+        self.status, self.error, self.finished = status, error, time.time()
+        self.batch = None
+        self.done.set()
+
+    def to_dict(self, audit=False):
+        result = {'batch_id': self.id, 'status': self.status, 'source': self.source, 'posted': self.posted,
+                  'duplicates': self.duplicates, 'rejected': len(self.rejects), 'error': self.error,
+                  'snapshot_version': self.snapshot_version,
+                  'seconds': None if self.finished is None else round(self.finished - self.received, 4)}
+        if len(self.rejects):
+            result['rejects'] = self.rejects.head(100).astype(str).to_dict(orient='records')
+        if audit:
+            result['audit'] = self.audit
+        return result
+
+
+# ==========================================
+# [3. 서비스 코어 (쓰기 큐 + 작성자 스레드)]
+# ==========================================
+class LedgerService:
+    """원장 상태를 혼자 소유하는 적재 서비스. 반영은 작성자 스레드 1개만 하므로 상태에 잠금이 필요 없음"""
+
+    def __init__(self, state=None, store=None, snapshot_root='', group_rows=GROUP_ROWS,
+                 publish_interval=PUBLISH_INTERVAL, crm_sub_types=ledger_engine.CRM_SUB_TYPES, journal=False):
+        self.state = state if state is not None else shared_ledger.new_state()
+        self.store = store
+        self.snapshot_root = snapshot_root
+        self.group_rows = group_rows
+        self.publish_interval = publish_interval
+        self.crm_sub_types = crm_sub_types
+        self.hashes = set(self.state['history']['hash'])
+        self.queue = queue.Queue()
+        self.tickets = OrderedDict()
+        self.stats = {'received': 0, 'posted': 0, 'duplicates': 0, 'rejected': 0, 'failed': 0, 'commits': 0,
+                      'published': 0, 'after_commit_errors': 0, 'compactions': 0}
+        # journal=True면 반영한 묶음을 반영 순서대로 남김 (직렬 재생 검증용)
+        self.journal = [] if journal else None
+        self._lock = threading.Lock()
+        self._last_publish = 0.0
+        self._compacted_at = 0
+        # 반영은 끝났지만 아직 스냅샷에 실리지 않은 접수 건 (다음 게시 때 완료)
+        self._unpublished = []
+        self._thread = threading.Thread(target=self._run, name='ledger-writer', daemon=True)
+
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        """저장소 원장을 날짜순으로 다시 반영해 큐 · 소진 원장을 복원한 서비스 (이후 반영분은 저장소에 이어 기록)"""
+        service = cls(store=store, **kwargs)
+        if store is not None and store.exists():
+            history = store.read()
+            with perf_trace.stage("service_restore", rows=len(history)):
+                ledger_engine.post_transactions(service.state, history_transactions(history),
+                                                crm_sub_types=service.crm_sub_types)
+            service.hashes = set(service.state['history']['hash'])
+        return service
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """큐에 남은 묶음을 모두 반영한 뒤 작성자 스레드 종료"""
+        self.queue.put(None)
+        self._thread.join(timeout)
+
+    # --- 접수 ---
+    def submit(self, rows, source=''):
+        """요청 행(DataFrame)을 정규화해 큐에 넣고 Ticket 반환 (검증 실패 행은 반려로 기록)"""
+        batch, rejects = prepare_rows(rows)
+        ticket = Ticket(batch, rejects, source)
+        with self._lock:
+            self.stats['received'] += len(rows)
+            self.stats['rejected'] += len(rejects)
+            self.tickets[ticket.id] = ticket
+            while len(self.tickets) > MAX_TICKETS:
+                self.tickets.popitem(last=False)
+        if batch.empty:
+            ticket.finish('posted')
+        else:
+            self.queue.put(ticket)
+        return ticket
+
+    def ticket(self, batch_id):
+        with self._lock:
+            return self.tickets.get(batch_id)
+
+    def status(self):
+        with self._lock:
+            stats = dict(self.stats)
+        return {**stats, 'queued': self.queue.qsize(), 'ledger_rows': len(self.state['history']),
+                'ledger_version': self.state.get('ledger_version', 0), 'items': len(self.state['inventory_queues'])}
+
+    # --- 반영 (작성자 스레드) ---
+    def _run(self):
+        stopping = False
+        while not stopping:
+            ticket = self.queue.get()
+            if ticket is None:
+                break
+            group, rows = [ticket], len(ticket.batch)
+            # 기다리는 동안 쌓인 묶음을 도착 순서대로 함께 반영
+            while rows < self.group_rows:
+                try:
+                    ticket = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if ticket is None:
+                    stopping = True
+                    break
+                group.append(ticket)
+                rows += len(ticket.batch)
+            self._apply(group)
+            if self.queue.empty():
+                self._maintain()
+        if self._unpublished:
+            self._finish_published(self._publish_safely())
+
+    def _fresh(self, tickets):
+        """묶음별 신규 행 (원장 해시 · 앞 묶음과 겹치는 행 제외, 묶음 안의 동일 행은 유지)"""
+        seen, parts = set(), []
+        for ticket in tickets:
+            hashes = ticket.batch['hash'].tolist()
+            keep = np.fromiter((h not in self.hashes and h not in seen for h in hashes), dtype=bool, count=len(hashes))
+            seen.update(hashes)
+            parts.append(ticket.batch[keep])
+        return parts
+
+    def _post(self, tickets):
+        """
+        묶음들을 이어 붙여 1회 반영. 실패하면 post_transactions가 반영 전으로 롤백한 뒤 예외 전달.
+        커밋 뒤처리만 실패했으면(ledger_version이 올라감) 예외를 삼키고 오류 문구 반환 (반영된 것으로 처리)
+        """
+        parts = self._fresh(tickets)
+        combined = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        version, warning = self.state.get('ledger_version', 0), ''
+        try:
+            audit_entries = ledger_engine.post_transactions(self.state, combined, crm_sub_types=self.crm_sub_types,
+                                                            store=self.store) if len(combined) else []
+        except Exception as e:
+            if self.state.get('ledger_version', 0) == version:
+                raise
+            audit_entries, warning = [], f"반영 완료, 후처리 실패: {e}"
+            with self._lock:
+                self.stats['after_commit_errors'] += 1
+        self.hashes.update(combined['hash'].tolist())
+        if self.journal is not None and len(combined):
+            self.journal.append(combined)
+        offset = 0
+        for ticket, part in zip(tickets, parts):
+            ticket.posted, ticket.duplicates = len(part), len(ticket.batch) - len(part)
+            ticket.audit = [list(entry) for entry in audit_entries[offset:offset + len(part)]]
+            offset += len(part)
+        with self._lock:
+            self.stats['commits'] += 1
+            self.stats['posted'] += len(combined)
+            self.stats['duplicates'] += sum(ticket.duplicates for ticket in tickets)
+        return warning
+
+    def _apply(self, tickets):
+        posted = []
+        with perf_trace.run("적재 서비스 반영", rows=sum(len(t.batch) for t in tickets)):
+            try:
+                warning = self._post(tickets)
+                posted = [(ticket, warning) for ticket in tickets]
+            except Exception as e:
+                if len(tickets) == 1:
+                    self._fail(tickets[0], str(e))
+                else:
+                    # 어느 묶음이 실패했는지 모르므로 묶음별로 다시 반영 (성공한 묶음은 그대로 반영)
+                    for ticket in tickets:
+                        try:
+                            posted.append((ticket, self._post([ticket])))
+                        except Exception as single_error:
+                            self._fail(ticket, str(single_error))
+            if not self.snapshot_root:
+                for ticket, warning in posted:
+                    ticket.finish('posted', warning)
+                return
+            self._unpublished.extend(posted)
+            if self.queue.empty() or time.monotonic() - self._last_publish >= self.publish_interval:
+                self._finish_published(self._publish_safely())
+
+    def _maintain(self):
+        """큐가 빈 사이의 정리 작업: 반영이 COMPACT_EVERY회 쌓이면 저장소 파일 합치기 (실패해도 다음에 다시 시도)"""
+        if self.store is None or self.stats['commits'] - self._compacted_at < ledger_store.COMPACT_EVERY:
+            return
+        try:
+            with perf_trace.stage("store_compact"):
+                self.store.compact()
+        except Exception:
+            return
+        self._compacted_at = self.stats['commits']
+        with self._lock:
+            self.stats['compactions'] += 1
+
+    def _fail(self, ticket, error):
+        with self._lock:
+            self.stats['failed'] += len(ticket.batch)
+        ticket.finish('failed', error)
+
+    def _publish_safely(self):
+        """게시. 실패하면 (None, 오류 문구) — 작성자 스레드는 계속 돌아야 하므로 예외를 넘기지 않음"""
+        try:
+            return self.publish(), ''
+        except Exception as e:
+            return None, f"스냅샷 게시 실패: {e}"
+
+    def _finish_published(self, published):
+        """반영 후 게시를 기다리던 접수 건 완료 (게시 실패면 버전 없이 오류 문구와 함께 완료)"""
+        version, error = published
+        for ticket, warning in self._unpublished:
+            ticket.snapshot_version = version
+            ticket.finish('posted', warning or error)
+        self._unpublished = []
+
+    def publish(self):
+        with perf_trace.stage("snapshot_publish", rows=len(self.state['history'])):
+            version = ledger_snapshot.publish(self.snapshot_root, ledger_snapshot.state_tables(self.state))
+        self._last_publish = time.monotonic()
+        with self._lock:
+            self.stats['published'] += 1
+        return version
+
+
+# ==========================================
+# [4. HTTP 엔드포인트]
+# ==========================================
+def _read_rows(body, content_type):
+    """요청 본문 → DataFrame (CSV 또는 JSON 배열 / {"rows": [...]})"""
+    if 'csv' in content_type:
+        return pd.read_csv(io.BytesIO(body))
+    payload = json.loads(body or b'[]')
+    return pd.DataFrame(payload['rows'] if isinstance(payload, dict) else payload)
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "LedgerService/1.0"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urllib.parse.urlparse(self.path).path.rstrip('/')
+        service = self.server.service
+        if path == '/status':
+            self._send_json(service.status())
+        elif path.startswith('/batches/'):
+            ticket = service.ticket(path.rsplit('/', 1)[-1])
+            if ticket is None:
+                self._send_json({'error': 'not found'}, 404)
+            else:
+                self._send_json(ticket.to_dict())
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path.rstrip('/') != '/transactions':
+            self._send_json({'error': 'not found'}, 404)
+            return
+        params = urllib.parse.parse_qs(url.query)
+        flag = lambda name: params.get(name, ['0'])[0] in ('1', 'true')
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            rows = _read_rows(self.rfile.read(length), self.headers.get('Content-Type', ''))
+            ticket = self.server.service.submit(rows, source=params.get('source', [''])[0])
+        except (ValueError, KeyError) as e:
+            self._send_json({'error': str(e)}, 400)
+            return
+        if not flag('wait'):
+            self._send_json(ticket.to_dict(), 202)
+            return
+        timeout = float(params.get('timeout', [WAIT_TIMEOUT])[0])
+        if not ticket.wait(timeout):
+            self._send_json(ticket.to_dict(), 202)
+            return
+        self._send_json(ticket.to_dict(audit=flag('audit')), 200 if ticket.status == 'posted' else 422)
+
+
+class LedgerServer:
+    """서비스 + HTTP 서버 (백그라운드 스레드). with 문으로 사용하면 종료까지 관리합니다."""
+
+    def __init__(self, service, host='127.0.0.1', port=DEFAULT_PORT):
+        self.service = service
+        self.httpd = ThreadingHTTPServer((host, port), _ServiceHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.service = service
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.service.start()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.service.stop()
+        return False
+
+
+# ==========================================
+# [5. 클라이언트 (앱 · 야간 배치)]
+# ==========================================
+def submit_remote(url, batch, wait=True, audit=False, source='', timeout=WAIT_TIMEOUT):
+    """
+    거래 묶음(DataFrame)을 서비스로 전송. wait면 반영 완료까지 기다린 결과 dict 반환
+    반영 실패(422) · 요청 오류(400)는 RuntimeError
+    """
+    query = urllib.parse.urlencode({'wait': int(wait), 'audit': int(audit), 'source': source, 'timeout': timeout})
+    body = batch.to_json(orient='records', force_ascii=False, date_format='iso').encode('utf-8')
+    request = urllib.request.Request(f"{url.rstrip('/')}/transactions?{query}", data=body, method='POST',
+                                     headers={'Content-Type': 'application/json; charset=utf-8'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout + 30) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        detail = json.loads(e.read() or b'{}')
+        raise RuntimeError(detail.get('error') or f"적재 서비스 오류 ({e.code})") from None
+
+
+def remote_status(url, timeout=10):
+    with urllib.request.urlopen(f"{url.rstrip('/')}/status", timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def _read_file(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+# --- 실행부 ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="원장 적재 서비스 (HTTP / CLI)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = sub.add_parser('serve', help="적재 서비스 실행")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--store', default=ledger_store.DEFAULT_ROOT, help="원장 저장소 경로 (비우면 메모리만)")
+    serve_parser.add_argument('--snapshot', default=ledger_snapshot.DEFAULT_ROOT, help="뷰어 스냅샷 게시 경로")
+    serve_parser.add_argument('--group-rows', type=int, default=GROUP_ROWS)
+
+    post_parser = sub.add_parser('post', help="엑셀/CSV/Parquet 파일을 서비스로 전송 (반영 완료까지 대기)")
+    post_parser.add_argument('paths', nargs='+')
+    post_parser.add_argument('--url', default=SERVICE_URL or f"http://127.0.0.1:{DEFAULT_PORT}")
+
+    status_parser = sub.add_parser('status', help="서비스 상태 조회")
+    status_parser.add_argument('--url', default=SERVICE_URL or f"http://127.0.0.1:{DEFAULT_PORT}")
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        print(json.dumps(remote_status(args.url), ensure_ascii=False, indent=2))
+        return 0
+
+    if args.command == 'post':
+        failed = 0
+        for path in args.paths:
+            start = time.perf_counter()
+            try:
+                result = submit_remote(args.url, _read_file(path), source=os.path.basename(path))
+            except RuntimeError as e:
+                print(f"❌ {path}: {e}")
+                failed += 1
+                continue
+            print(f"✅ {path}: 반영 {result['posted']:,}건 · 중복 {result['duplicates']:,}건 · 반려 {result['rejected']:,}건 "
+                  f"({time.perf_counter() - start:.2f}s, 접수번호 {result['batch_id']})")
+        return 1 if failed else 0
+
+    store = ledger_store.LedgerStore(args.store) if args.store else None
+    start = time.perf_counter()
+    service = LedgerService.from_store(store, snapshot_root=args.snapshot, group_rows=args.group_rows)
+    print(f"원장 {len(service.state['history']):,}행 복원 ({time.perf_counter() - start:.2f}s)")
+    with LedgerServer(service, args.host, args.port) as server:
+        if args.snapshot:
+            service.publish()
+        print(f"📥 원장 적재 서비스 실행 중: {server.url}  (Ctrl+C 종료)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
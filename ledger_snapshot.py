@@ -0,0 +1,177 @@
+"""
+뷰어용 읽기 전용 원장 스냅샷 (memory-mapped Arrow IPC / Feather v2)
+
+조회 전용(뷰어) 세션은 원장을 바꾸지 않으므로 세션마다 history 사본을 들고 있을 필요가 없습니다.
+쓰기 세션이 원장을 반영할 때 스냅샷을 비압축 Arrow IPC 파일로 게시하고,
+뷰어는 파일을 memory-map으로 열어 zero-copy로 읽습니다.
+
+- 파일 내용은 OS 페이지 캐시에 올라가므로 뷰어 세션 · 앱 프로세스 · 재시작 사이에 공유됩니다.
+- 숫자/날짜 컬럼은 split_blocks로, 문자열 컬럼은 string[pyarrow]로 받아 Arrow 버퍼를 그대로 씁니다.
+  (category 컬럼은 코드 배열만 변환되므로 warm-open은 수 ms ~ 수십 ms)
+- 게시는 버전 디렉터리(v<ns>)를 다 쓴 뒤 CURRENT 포인터를 원자적으로 교체합니다.
+  이전 버전을 열고 있는 뷰어는 교체 중에도 자기 버전을 끝까지 읽습니다 (최근 KEEP_VERSIONS개 보관).
+
+- 게시 위치: 환경변수 SKU_LEDGER_SNAPSHOT (없으면 스냅샷 기능 사용 안 함)
+- 게시는 원장 전체를 다시 쓰므로(O(원장 크기) 디스크 I/O) 반영할 때마다 하지 않고 SnapshotPublisher가
+  백그라운드에서 최대 PUBLISH_INTERVAL초에 1번, 그 사이 요청은 마지막 상태로 묶어 게시합니다.
+  게시 원본은 공유 원장(SKU_SHARED_LEDGER) 또는 적재 서비스처럼 프로세스에 하나뿐인 원장이어야 합니다.
+  (세션별 원장을 게시하면 마지막으로 게시한 세션의 원장이 다른 세션의 원장을 덮어씀)
+
+사용 예)
+    python ledger_snapshot.py .ledger_snapshot          # 현재 스냅샷 열기 시간 · 행 수
+"""
+import os
+import shutil
+import sys
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+import inventory_aging
+import ledger_schema
+
+DEFAULT_ROOT = os.environ.get('SKU_LEDGER_SNAPSHOT', '')
+TABLES = ('history', 'crm_history', 'stock', 'lots')
+KEEP_VERSIONS = 2
+PUBLISH_INTERVAL = 5.0
+
+# Arrow 문자열 → string[pyarrow] (object로 복사하지 않고 Arrow 버퍼를 그대로 사용)
+_TYPES = {pa.string(): ledger_schema.STRING_DTYPE, pa.large_string(): ledger_schema.STRING_DTYPE}
+
+
+# ==========================================
+# [1. 게시 (쓰기 세션)]
+# ==========================================
+def stock_table(queues):
+    """품목별 현재고 · 자산금액 (최종매입원가 기준)"""
+    rows = [{"품목명": item, "현재고": sum(b['qty'] for b in queue), "자산금액": sum(b['qty'] * b['price'] for b in queue)}
+            for item, queue in queues.items()]
+    return pd.DataFrame(rows, columns=["품목명", "현재고", "자산금액"])
+
+
+def state_tables(state, stock=None):
+    """원장 상태(dict) → 게시할 {TABLES 이름: DataFrame} (stock을 이미 구했으면 넘겨서 재계산 생략)"""
+    return {'history': state['history'], 'crm_history': state['crm_history'],
+            'stock': stock_table(state['inventory_queues']) if stock is None else stock,
+            'lots': inventory_aging.remaining_lots(state['consumption'])}
+
+
+def publish(root, tables):
+    """tables({TABLES 이름: DataFrame})를 새 버전으로 게시하고 버전 번호 반환"""
+    version = time.time_ns()
+    os.makedirs(root, exist_ok=True)
+    staging = os.path.join(root, f".v{version}")
+    os.makedirs(staging)
+    for name, df in tables.items():
+        feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), os.path.join(staging, f"{name}.arrow"),
+                              compression='uncompressed')
+    os.rename(staging, os.path.join(root, f"v{version}"))
+
+    pointer = os.path.join(root, f".CURRENT.{version}")
+    with open(pointer, 'w') as f:
+        f.write(str(version))
+    os.replace(pointer, os.path.join(root, 'CURRENT'))
+
+    # 오래된 버전 정리 (이미 memory-map으로 연 뷰어는 파일이 지워져도 계속 읽을 수 있음)
+    for name in sorted(versions(root))[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(root, f"v{name}"), ignore_errors=True)
+    return version
+
+
+class SnapshotPublisher:
+    """
+    백그라운드 게시 스레드. request()는 게시 요청만 남기고 바로 돌아가며, 스레드가 마지막 게시 후
+    interval초가 지나면 그때의 원장으로 1번 게시. source(): 게시할 {TABLES 이름: DataFrame}을 돌려주는 함수
+    """
+
+    def __init__(self, root, source, interval=PUBLISH_INTERVAL):
+        self.root = root
+        self.source = source
+        self.interval = interval
+        self.version = current_version(root)
+        self.error = None
+        self.stats = {'requests': 0, 'published': 0}
+        self._pending = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._last = 0.0
+        self._thread = threading.Thread(target=self._run, name='snapshot-publisher', daemon=True)
+        self._thread.start()
+
+    def request(self):
+        self.stats['requests'] += 1
+        self._idle.clear()
+        self._pending.set()
+
+    def wait(self, timeout=None):
+        """요청한 게시가 모두 끝날 때까지 대기. 반환: 완료 여부"""
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            delay = self._last + self.interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # 기다리는 동안 들어온 요청은 이번 게시에 함께 실림
+            self._pending.clear()
+            try:
+                self.version = publish(self.root, self.source())
+                self.error = None
+                self.stats['published'] += 1
+            except Exception as e:
+                self.error = e
+            self._last = time.monotonic()
+            if not self._pending.is_set():
+                self._idle.set()
+
+
+def versions(root):
+    return [int(name[1:]) for name in os.listdir(root) if name.startswith('v') and name[1:].isdigit()]
+
+
+# ==========================================
+# [2. 열기 (뷰어 세션)]
+# ==========================================
+def current_version(root):
+    """게시된 최신 버전 (없으면 None)"""
+    try:
+        with open(os.path.join(root, 'CURRENT')) as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def open_table(path):
+    """Arrow IPC 파일을 memory-map으로 열기 (읽은 버퍼는 파일 매핑을 그대로 가리킴)"""
+    with pa.memory_map(path) as source:
+        return ipc.open_file(source).read_all()
+
+
+def to_frame(table):
+    return table.to_pandas(split_blocks=True, types_mapper=_TYPES.get)
+
+
+def load(root, version):
+    """버전 1개의 {이름: DataFrame}. 호출 측은 읽기 전용으로만 사용 (이전 버전에 없던 표는 빠짐)"""
+    directory = os.path.join(root, f"v{version}")
+    paths = {name: os.path.join(directory, f"{name}.arrow") for name in TABLES}
+    return {name: to_frame(open_table(path)) for name, path in paths.items() if os.path.exists(path)}
+
+
+# --- 실행부 ---
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ROOT
+    version = current_version(root) if root else None
+    if version is None:
+        print("게시된 스냅샷이 없습니다. (SKU_LEDGER_SNAPSHOT 또는 경로 인자 확인)")
+        sys.exit(1)
+    start = time.perf_counter()
+    frames = load(root, version)
+    elapsed = time.perf_counter() - start
+    sizes = ", ".join(f"{name} {len(df):,}행" for name, df in frames.items())
+    print(f"v{version}: {sizes} · 열기 {elapsed * 1000:.1f}ms")
@@ -0,0 +1,245 @@
+"""
+월 단위 파티션 Parquet 원장 저장소 (Time-partitioned Ledger Store)
+
+원장(history)을 month=YYYY-MM (옵션: bucket=품목 해시 버킷) 하이브 파티션 Parquet으로 저장하고,
+pyarrow.dataset으로 읽을 때 기간/품목 조건으로 파티션을 걸러(pruning) 필요한 컬럼만 읽습니다(projection).
+30일 조회는 보관 기간과 상관없이 1~2개 월 파티션만 읽습니다.
+
+- 저장 위치: 환경변수 SKU_LEDGER_STORE (없으면 저장소 사용 안 함 → 앱은 세션 원장만 사용)
+- 품목 버킷 수: 환경변수 SKU_LEDGER_BUCKETS (기본 0 = 버킷 없음)
+- 추가(append)는 파티션마다 새 파일을 쓰므로, 작은 파일이 쌓이면 compact()로 파티션별 1개 파일로 합칩니다.
+  적재 서비스는 작성자 스레드가 한가할 때 COMPACT_EVERY회 반영마다 합치고, 공유 원장은 앱 시작 때 합칩니다.
+
+저장소는 원장 반영(커밋)이 끝난 뒤에 이어 쓰는 write-behind 로그입니다. 커밋과 한 트랜잭션이 아니므로
+기록이 실패하면 그 묶음은 메모리 원장에만 있고, 다음 시작 때 저장소에서 복원한 원장에는 빠집니다.
+기록 · 조회는 프로세스에 원장이 하나뿐인 공유 원장(SKU_SHARED_LEDGER=1) · 적재 서비스(SKU_LEDGER_SERVICE) 모드에서만 합니다.
+(세션별 원장은 세션마다 내용이 달라, 한 저장소에 모으면 세션 재고와 저장소 판매량 지표가 어긋남)
+
+사용 예)
+    python ledger_store.py import inventory_10k_data.xlsx --root .ledger_store
+    python ledger_store.py query --root .ledger_store --days 30 --items 수입물품_A
+    python ledger_store.py compact --root .ledger_store
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+import uuid
+import zlib
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import ledger_schema
+
+DEFAULT_ROOT = os.environ.get('SKU_LEDGER_STORE', '')
+DEFAULT_BUCKETS = int(os.environ.get('SKU_LEDGER_BUCKETS', '0'))
+# 저장소를 쓰는 원장 모드 (shared_ledger.ENABLED · ledger_service.SERVICE_URL과 같은 환경변수)
+PROCESS_LEDGER = os.environ.get('SKU_SHARED_LEDGER', '') == '1' or bool(os.environ.get('SKU_LEDGER_SERVICE', ''))
+COMPACT_EVERY = 50
+
+STRING_FIELDS = set(ledger_schema.CATEGORY_COLUMNS + ledger_schema.STRING_COLUMNS)
+
+
+def _arrow_type(column):
+    if column == '날짜':
+        return pa.timestamp('ns')
+    return pa.string() if column in STRING_FIELDS else pa.float64()
+
+
+def month_key(dates):
+    return dates.dt.strftime('%Y-%m')
+
+
+def item_bucket(items, buckets):
+    """품목명 → 버킷 번호 (프로세스와 무관하게 같은 값이 나오도록 crc32 사용)"""
+    codes, uniques = pd.factorize(items.astype(str))
+    table = [zlib.crc32(name.encode()) % buckets for name in uniques]
+    return pd.Series(pd.Index(table).take(codes), index=items.index, dtype='int32')
+
+
+def _ns_scalar(value):
+    return pa.scalar(pd.Timestamp(value).as_unit('ns').to_datetime64(), pa.timestamp('ns'))
+
+
+def _month_text(value):
+    return pd.Timestamp(value).strftime('%Y-%m')
+
+
+class LedgerStore:
+    """원장 Parquet 저장소 (root 디렉터리 1개 = 원장 1개)"""
+
+    def __init__(self, root, buckets=DEFAULT_BUCKETS, columns=ledger_schema.HISTORY_COLUMNS):
+        self.root = root
+        self.buckets = buckets
+        self.columns = list(columns)
+        fields = [pa.field(c, _arrow_type(c)) for c in self.columns] + [pa.field('month', pa.string())]
+        if buckets:
+            fields.append(pa.field('bucket', pa.int32()))
+        self.schema = pa.schema(fields)
+        self.partitioning = ds.partitioning(
+            pa.schema([f for f in fields if f.name in ('month', 'bucket')]), flavor='hive')
+
+    # ==========================================
+    # [1. 쓰기]
+    # ==========================================
+    def _to_table(self, df):
+        out = pd.DataFrame(index=df.index)
+        for column in self.columns:
+            values = df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+            if column == '날짜':
+                out[column] = pd.to_datetime(values)
+            elif column in STRING_FIELDS:
+                out[column] = values.astype('string')
+            else:
+                out[column] = pd.to_numeric(values, errors='coerce').astype('float64')
+        out['month'] = month_key(out['날짜'])
+        if self.buckets:
+            out['bucket'] = item_bucket(out['품목명'], self.buckets)
+        return pa.Table.from_pandas(out, schema=self.schema, preserve_index=False)
+
+    def append(self, df):
+        """원장 행 추가 (해당 월/버킷 파티션에 새 파일로 기록)"""
+        if df is None or len(df) == 0:
+            return
+        ds.write_dataset(self._to_table(df), self.root, format='parquet', partitioning=self.partitioning,
+                         basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                         existing_data_behavior='overwrite_or_ignore')
+
+    def compact(self):
+        """파티션별 파일을 1개로 합침 (append로 쌓인 작은 파일 정리). 반환: 합친 파티션 수"""
+        if not self.exists():
+            return 0
+        merged = 0
+        for partition_dir in {os.path.dirname(f.path) for f in self.dataset().get_fragments()}:
+            files = [os.path.join(partition_dir, name) for name in os.listdir(partition_dir)
+                     if name.endswith('.parquet') and not name.startswith('.')]
+            if len(files) <= 1:
+                continue
+            # '.'으로 시작하는 임시 파일은 dataset 조회에서 제외되므로, 다 쓴 뒤 이름을 바꾸고 기존 파일 삭제
+            tmp_path = os.path.join(partition_dir, f".compact-{uuid.uuid4().hex}.parquet")
+            pq.write_table(pq.ParquetDataset(files).read(), tmp_path)
+            os.replace(tmp_path, os.path.join(partition_dir, f"part-{uuid.uuid4().hex}-0.parquet"))
+            for path in files:
+                os.remove(path)
+            merged += 1
+        return merged
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    # ==========================================
+    # [2. 읽기 (파티션 프루닝 + 컬럼 프로젝션)]
+    # ==========================================
+    def exists(self):
+        return os.path.isdir(self.root) and any(os.scandir(self.root))
+
+    def dataset(self):
+        return ds.dataset(self.root, schema=self.schema, format='parquet', partitioning=self.partitioning)
+
+    def _filter(self, start=None, end=None, items=None, sale_only=False):
+        """기간은 month 파티션 조건(프루닝)과 날짜 조건(경계 월 안의 행 선별)을 함께 걸어 둠"""
+        conditions = []
+        # 월 파티션 값은 'YYYY-MM' 문자열이라 문자열 비교가 곧 월 비교 (한쪽 끝만 주면 다른 쪽은 열어 둠)
+        if start is not None:
+            conditions.append(ds.field('month') >= _month_text(start))
+            conditions.append(ds.field('날짜') >= _ns_scalar(start))
+        if end is not None:
+            conditions.append(ds.field('month') <= _month_text(end))
+            conditions.append(ds.field('날짜') <= _ns_scalar(end))
+        if items is not None:
+            items = [str(i) for i in items]
+            if self.buckets:
+                buckets = sorted({zlib.crc32(i.encode()) % self.buckets for i in items})
+                conditions.append(ds.field('bucket').isin(buckets))
+            conditions.append(ds.field('품목명').isin(items))
+        if sale_only:
+            conditions.append(ds.field('구분') == '출고')
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def months(self):
+        """저장된 월 파티션 목록"""
+        if not self.exists():
+            return []
+        return sorted(name.split('=', 1)[1] for name in os.listdir(self.root) if name.startswith('month='))
+
+    def fragments(self, start=None, end=None, items=None):
+        """조건에 걸리는 파일(fragment) 목록 (프루닝 결과 확인용)"""
+        return [f.path for f in self.dataset().get_fragments(filter=self._filter(start, end, items))]
+
+    def read(self, start=None, end=None, items=None, columns=None, sale_only=False):
+        """기간(양끝 포함) · 품목 조건의 원장 행 (columns 지정 시 해당 컬럼만 읽음)"""
+        if not self.exists():
+            return ledger_schema.empty_frame(columns or self.columns)
+        table = self.dataset().to_table(columns=columns or self.columns,
+                                        filter=self._filter(start, end, items, sale_only))
+        df = table.to_pandas()
+        if '날짜' in df.columns:
+            df = df.sort_values('날짜', kind='stable').reset_index(drop=True)
+        return ledger_schema.compact_frame(df)
+
+
+def default_store():
+    """SKU_LEDGER_STORE가 설정되고 공유 원장 · 적재 서비스 모드인 경우의 저장소 (아니면 None)"""
+    return LedgerStore(DEFAULT_ROOT) if DEFAULT_ROOT and PROCESS_LEDGER else None
+
+
+# --- 실행부 ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="월 파티션 Parquet 원장 저장소")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = sub.add_parser('import', help="엑셀/Parquet 원장을 저장소로 적재")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--root', default=DEFAULT_ROOT or '.ledger_store')
+    import_parser.add_argument('--buckets', type=int, default=DEFAULT_BUCKETS)
+
+    query_parser = sub.add_parser('query', help="최근 N일 조회 (읽은 파일 수 · 시간 출력)")
+    query_parser.add_argument('--root', default=DEFAULT_ROOT or '.ledger_store')
+    query_parser.add_argument('--buckets', type=int, default=DEFAULT_BUCKETS)
+    query_parser.add_argument('--days', type=int, default=30)
+    query_parser.add_argument('--items', nargs='*', default=None)
+
+    compact_parser = sub.add_parser('compact', help="파티션별 작은 파일을 1개로 합침")
+    compact_parser.add_argument('--root', default=DEFAULT_ROOT or '.ledger_store')
+    compact_parser.add_argument('--buckets', type=int, default=DEFAULT_BUCKETS)
+    args = parser.parse_args(argv)
+
+    store = LedgerStore(args.root, buckets=args.buckets)
+    if args.command == 'compact':
+        before = len(store.fragments()) if store.exists() else 0
+        start = time.perf_counter()
+        merged = store.compact()
+        after = len(store.fragments()) if store.exists() else 0
+        print(f"파티션 {merged}개 합침: 파일 {before}개 → {after}개 ({time.perf_counter() - start:.2f}s)")
+        return 0
+    if args.command == 'import':
+        df = pd.read_parquet(args.path) if args.path.endswith('.parquet') else pd.read_excel(args.path)
+        df['날짜'] = pd.to_datetime(df['날짜'])
+        store = LedgerStore(args.root, buckets=args.buckets,
+                            columns=list(dict.fromkeys(ledger_schema.HISTORY_COLUMNS + list(df.columns))))
+        start = time.perf_counter()
+        store.append(df)
+        print(f"{len(df):,}행 → {args.root} ({len(store.fragments())}개 파일, {time.perf_counter() - start:.2f}s)")
+        return 0
+
+    total = len(store.fragments())
+    months = store.months()
+    end = store.read(start=months[-1] + '-01', columns=['날짜'])['날짜'].max() if months else pd.Timestamp.now()
+    start_date = end - pd.Timedelta(days=args.days)
+    start = time.perf_counter()
+    df = store.read(start_date, end, items=args.items, columns=['날짜', '품목명', '구분', '수량'])
+    elapsed = time.perf_counter() - start
+    touched = len(store.fragments(start_date, end, args.items))
+    print(f"{start_date:%Y-%m-%d} ~ {end:%Y-%m-%d}: {len(df):,}행, 파일 {touched}/{total}개 읽음, {elapsed:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
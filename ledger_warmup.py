@@ -0,0 +1,164 @@
+"""
+기본 원장 백그라운드 선적재 (Warm-loading)
+
+streamlit_main_legacy.py는 첫 세션이 inventory_10k_data.xlsx 읽기 · 행 해시 · FIFO 큐 복원을 모두 마칠 때까지
+화면을 하나도 그리지 못했습니다. LedgerWarmup은 프로세스에서 스크립트가 처음 실행될 때(st.cache_resource로 1개)
+백그라운드 스레드로 적재를 시작하고, 화면은 바로 그린 뒤 데이터가 필요한 페이지만 적재 완료를 기다립니다.
+
+- 적재는 프로세스당 1회: 다른 세션은 진행 중인 같은 적재를 기다리거나 완료된 결과를 바로 받음 (세션별 적재 없음)
+- 결과(history · 큐 · 소진 원장)는 공용 원본으로 두고 세션에는 session_copy()로 사본을 연결
+  (업로드가 큐 · 소진 원장을 제자리에서 바꾸므로). history는 통째로 교체만 되므로 그대로 공유
+- 행 해시는 ingest.row_hashes(기존 행 단위 md5 해시와 같은 값)로 한 번에 계산
+- 단계별 시간(stages)과 적재 시간을 기록해 화면의 첫 화면(TTFP) · 데이터 준비(TTD) 시간과 함께 보고
+※ Streamlit은 첫 브라우저 접속 때 스크립트를 처음 실행하므로, 적재 시작은 서버 기동 후 첫 실행의 맨 앞입니다.
+
+사용 예)
+    python ledger_warmup.py inventory_10k_data.xlsx     # 단계별 적재 시간
+"""
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+import ingest
+import ledger_schema
+from consumption_ledger import ConsumptionLedger
+
+DEFAULT_PATH = 'inventory_10k_data.xlsx'
+HASH_COLUMNS = ['날짜', '품목명', '구분', '수량', '단가']
+
+
+# ==========================================
+# [1. 적재 · FIFO 큐 복원]
+# ==========================================
+def load_history(path, stage=None):
+    """기본 원장 엑셀 → 날짜순 history (세부구분 · hash가 없으면 채움). stage: 단계 시간 기록용 컨텍스트 함수"""
+    stage = stage or (lambda name: _no_stage())
+    with stage("엑셀 읽기"):
+        df = pd.read_excel(path)
+        df['날짜'] = ingest.normalize_dates(df['날짜'])
+    with stage("행 해시 · 정렬"):
+        # 기존 데이터에 세부구분 컬럼이 없을 경우 기본값 할당
+        if '세부구분' not in df.columns:
+            df['세부구분'] = df['구분'].map({'입고': '매입', '출고': '매출'})
+        if 'hash' not in df.columns:
+            df['hash'] = ingest.row_hashes(df, HASH_COLUMNS)
+        return ledger_schema.compact_frame(df.sort_values(by='날짜', kind='stable').reset_index(drop=True))
+
+
+def rebuild_queues(history):
+    """전체 히스토리를 날짜순으로 다시 계산해 (품목별 FIFO 큐, 소진 원장) 복원"""
+    queues = {item: deque() for item in history['품목명'].unique()}
+    ledger = ConsumptionLedger()
+    sorted_hist = history.sort_values('날짜', kind='stable')
+    rows = zip(sorted_hist['날짜'], sorted_hist['품목명'], sorted_hist['구분'], sorted_hist['수량'],
+               sorted_hist['단가'], sorted_hist['hash'])
+    for date, item, action, qty, price, row_hash in rows:
+        if action == '입고':
+            lot = ledger.add_lot(item, date, qty, price)
+            queues[item].append({'date': date, 'qty': qty, 'price': price, 'lot': lot})
+        elif action == '출고':
+            sale = ledger.open_sale(item, date, qty, row_hash)
+            q = queues.get(item, deque())
+            while qty > 0 and q:
+                if q[0]['qty'] <= qty:
+                    use_qty = q[0]['qty']
+                    qty -= use_qty
+                    ledger.consume(sale, q[0]['lot'], use_qty, q[0]['price'])
+                    q.popleft()
+                else:
+                    ledger.consume(sale, q[0]['lot'], qty, q[0]['price'])
+                    q[0]['qty'] -= qty
+                    qty = 0
+    return queues, ledger
+
+
+def session_copy(queues, ledger):
+    """공용 큐 · 소진 원장의 세션용 사본 (로트 dict까지 복사)"""
+    return {item: deque(dict(batch) for batch in queue) for item, queue in queues.items()}, ledger.copy()
+
+
+@contextmanager
+def _no_stage():
+    yield
+
+
+# ==========================================
+# [2. 백그라운드 선적재]
+# ==========================================
+class LedgerWarmup:
+    """기본 원장 1회 적재 (백그라운드 스레드). 세션은 wait()로 기다린 뒤 result를 사본으로 연결"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.stages = {}
+        self.current = "대기 중"
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='ledger-warmup', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    @contextmanager
+    def stage(self, name):
+        self.current = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - start
+
+    def _run(self):
+        try:
+            history = load_history(self.path, self.stage)
+            with self.stage("FIFO 큐 복원"):
+                queues, ledger = rebuild_queues(history)
+            self.result = {'history': history, 'inventory_queues': queues, 'consumption': ledger}
+            self.current = "완료"
+        except Exception as e:
+            self.error = e
+            self.current = "실패"
+        finally:
+            self.finished = time.perf_counter()
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    @property
+    def seconds(self):
+        """적재 시작부터 완료(진행 중이면 현재)까지 걸린 시간"""
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started if self.started is not None else 0.0
+
+    def wait(self, timeout=None):
+        """완료까지 대기. 반환: 완료 여부 (실패도 완료 — error 확인)"""
+        return self._done.wait(timeout)
+
+    def summary(self):
+        stages = " · ".join(f"{name} {seconds:.2f}s" for name, seconds in self.stages.items())
+        return f"기본 원장 적재 {self.seconds:.2f}s ({stages})"
+
+
+# --- 실행부 ---
+if __name__ == "__main__":
+    warmup = LedgerWarmup(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH).start()
+    warmup.wait()
+    if warmup.error is not None:
+        print(f"적재 실패: {warmup.error}")
+        sys.exit(1)
+    print(f"{len(warmup.result['history']):,}행 · 품목 {len(warmup.result['inventory_queues']):,}개")
+    print(warmup.summary())
+    start = time.perf_counter()
+    session_copy(warmup.result['inventory_queues'], warmup.result['consumption'])
+    print(f"세션 사본 {time.perf_counter() - start:.3f}s")
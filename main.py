@@ -3,17 +3,24 @@ from collections import deque
 from datetime import datetime
 from typing import Dict, List, Optional
 
+import ingest
+from consumption_ledger import CALCULATOR_NOTE, ConsumptionLedger
+from period_close import PeriodClose
+
 
 #
 
 class FIFOCostCalculator:
     """기능 1: 선입선출(FIFO) 방식의 원가 계산 및 재고 관리 담당"""
 
-    def __init__(self):
+    def __init__(self, render_notes: bool = False):
         # 품목별 입고 내역을 저장하는 큐: { "품목A": deque([배치1, 배치2, ...]) }
         self._inventory_queues: Dict[str, deque] = {}
         # 출고 처리 결과 저장
         self.sales_records = []
+        # 출고별 배치 소진 내역 (비고 문자열 대신 컬럼형으로 기록, 비고는 sales_frame()에서 생성)
+        self.consumption = ConsumptionLedger()
+        self.render_notes = render_notes
 
     def add_stock(self, item_name: str, qty: int, unit_price: float, date: datetime):
         """입고 기록을 시스템에 등록"""
@@ -23,7 +30,8 @@ class FIFOCostCalculator:
         self._inventory_queues[item_name].append({
             'qty': qty,
             'price': unit_price,
-            'date': date
+            'date': date,
+            'lot': self.consumption.add_lot(item_name, date, qty, unit_price)
         })
 
     def calculate_out_cost(self, item_name: str, qty_to_sell: int, date: datetime) -> Dict:
@@ -32,10 +40,10 @@ class FIFOCostCalculator:
         """
         remaining_needed = qty_to_sell
         total_cogs = 0.0  # 매출원가 합계
-        batches_used = []
+        sale_id = self.consumption.open_sale(item_name, date, qty_to_sell)
 
         if item_name not in self._inventory_queues or not self._inventory_queues[item_name]:
-            return self._record_sale(date, item_name, qty_to_sell, 0, "재고없음")
+            return self._record_sale(date, item_name, qty_to_sell, 0, "재고없음", sale_id)
 
         # 선입선출 핵심 로직 시작
         while remaining_needed > 0 and self._inventory_queues[item_name]:
@@ -55,19 +63,27 @@ class FIFOCostCalculator:
                 oldest_batch['qty'] -= use_qty
                 remaining_needed = 0
 
-            batches_used.append(f"{use_qty}개(단가:{oldest_batch['price']:,.0f})")
+            self.consumption.consume(sale_id, oldest_batch['lot'], use_qty, oldest_batch['price'])
 
         status = "정상" if remaining_needed == 0 else f"재고부족({remaining_needed}개)"
-        return self._record_sale(date, item_name, qty_to_sell, total_cogs, status, ", ".join(batches_used))
+        return self._record_sale(date, item_name, qty_to_sell, total_cogs, status, sale_id)
 
-    def _record_sale(self, date, item, qty, cost, status, details=""):
+    def _record_sale(self, date, item, qty, cost, status, sale_id):
         record = {
-            '날짜': date, '품목명': item, '출고수량': qty,
-            '매출원가': cost, '상태': status, '비고': details
+            '날짜': date, '품목명': item, '출고수량': qty, '매출원가': cost, '상태': status,
+            '비고': self.consumption.render_note(sale_id, CALCULATOR_NOTE) if self.render_notes else '',
+            '출고ID': sale_id
         }
         self.sales_records.append(record)
         return record
 
+    def sales_frame(self, with_notes: bool = True) -> pd.DataFrame:
+        """출고 결과표. 비고(배치별 소진 내역)는 이 시점에 한 번에 생성"""
+        df = pd.DataFrame(self.sales_records)
+        if with_notes and not self.render_notes and not df.empty:
+            df['비고'] = self.consumption.render_notes(df['출고ID'], CALCULATOR_NOTE)
+        return df
+
     def get_current_stock_level(self, item_name: str) -> int:
         """현재 특정 품목의 남은 총 재고량 반환"""
         return sum(batch['qty'] for batch in self._inventory_queues.get(item_name, []))
@@ -107,6 +123,7 @@ class InventorySystem:
         # 1. 데이터 로드
         df_history = pd.read_excel(self.file_path, sheet_name='거래이력')
         df_master = pd.read_excel(self.file_path, sheet_name='재고분석기준')
+        df_history['날짜'] = ingest.normalize_dates(df_history['날짜'])
 
         # 날짜순 정렬 (FIFO 처리를 위해 필수)
         df_history = df_history.sort_values(by='날짜')
@@ -123,10 +140,20 @@ class InventorySystem:
         self.reporter.print_analysis(df_master, self.calculator)
 
         # 4. 결과 저장
-        output_df = pd.DataFrame(self.calculator.sales_records)
+        output_df = self.calculator.sales_frame()
         output_df.to_excel('inventory_cogs_final.xlsx', index=False)
         print("\n💾 매출원가 계산 결과가 'inventory_cogs_final.xlsx'로 저장되었습니다.")
 
+        # 5. 월별 수불표 (마감월은 확정 테이블, 미마감 월만 원장에서 계산)
+        ledger = df_history.copy()
+        ledger['매출원가'] = 0.0
+        ledger.loc[ledger['구분'] == '출고', '매출원가'] = output_df['매출원가'].to_numpy() if not output_df.empty else 0.0
+        closing = PeriodClose()
+        report = closing.report(ledger)
+        report.to_excel('inventory_close_report.xlsx', index=False)
+        closed = f" (~{closing.last_closed()} 마감 확정분 사용)" if closing.last_closed() else ""
+        print(f"💾 월별 수불표가 'inventory_close_report.xlsx'로 저장되었습니다.{closed}")
+
 
 # --- 실행부 ---
 if __name__ == "__main__":
@@ -1,12 +1,13 @@
-from datetime import datetime
 import pandas as pd
 
+import ingest
+
 def test():
     file_path = 'inventory_10k_data.xlsx'
     df_history = pd.read_excel(file_path)
 
-    df_history['datetime'] = df_history['날짜'].apply(lambda x: str(x).split(' ')[0])
-    df_history['datetime'] = df_history['datetime'].apply(lambda x: datetime.strptime(str(x), "%Y-%m-%d"))
+    # 일 단위로 절사 (같은 날 거래를 하나로 묶기 위함)
+    df_history['datetime'] = ingest.normalize_dates(df_history['날짜'], to_day=True)
 
     df_history['날짜'] = df_history['datetime']
 
@@ -38,35 +39,19 @@ def test():
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from ledger_generator import generate_ledger
 
 # 1. 기초 설정
 items = [f"수입물품_{chr(65 + i)}" for i in range(10)]
 start_date = datetime(2025, 1, 1)
 data_rows = 100
 
-# 2. 거래 내역 생성 (로직 반영)
-transactions = []
-for i in range(data_rows):
-    item = np.random.choice(items)
-    date = start_date + timedelta(days=np.random.randint(0, 350))
-
-    # [수정] 대분류(구분) 결정
-    trans_type = np.random.choice(['입고', '출고'], p=[0.4, 0.6])
-
-    # [수정] 대분류에 따른 소분류(세부구분) 매칭
-    if trans_type == '입고':
-        sub_type = np.random.choice(['매입', '반품'], p=[0.8, 0.2])  # 매입이 더 많게 설정
-        price = np.random.randint(50, 151) * 100
-    else:
-        sub_type = np.random.choice(['매출', '샘플'], p=[0.9, 0.1])  # 매출이 더 많게 설정
-        price = 0
-
-    qty = np.random.randint(10, 100)
-    transactions.append([date, item, trans_type, sub_type, qty, price])
-
-# 데이터프레임 생성
-df_history = pd.DataFrame(transactions, columns=['날짜', '품목명', '구분', '세부구분', '수량', '단가'])
+# 2. 거래 내역 생성 (벡터화 생성기: 입고 40% / 출고 60%, 매입·반품 / 매출·샘플 구성비 반영)
+df_history = generate_ledger(data_rows, item_names=items, start_date=start_date, n_days=350, in_ratio=0.4,
+                             in_mix={'매입': 0.8, '반품': 0.2}, out_mix={'매출': 0.9, '샘플': 0.1},
+                             schema='legacy')
 df_history = df_history.sort_values(by=['날짜', '품목명']).reset_index(drop=True)
 
 # 3. 마스터 데이터 생성 (동일)
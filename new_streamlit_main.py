@@ -1,14 +1,35 @@
 import streamlit as st
 import pandas as pd
-from collections import deque
 from datetime import datetime
 import hashlib
 import os
 
+import chunked_ingest
+import dashboard_cache
+import ingest
+import ledger_engine
+import ledger_schema
+import perf_trace
+import profitability
+import reorder_heap
+from aging_panel import render_aging_report
+from consumption_ledger import ConsumptionLedger
+from ingest_panel import render_cancelled_notice, render_stale_checkpoint, run_chunked_post
+from perf_panel import render_perf_page
+from profit_panel import render_profit_ranking
+from profitability import ProfitCube
+from reorder_heap import ReorderHeap
+from rejects_panel import render_upload_rejects, store_upload_rejects
+from reorder_panel import render_reorder_alerts
+from trace_panel import render_lot_trace
+
 # ==========================================
 # [환경 설정 및 초기화]
 # ==========================================
 st.set_page_config(layout="wide", page_title="AI & Secure Enterprise ERP")
+
+# 매출 이력(CRM) · 수익성 큐브에 넣을 세부구분
+CRM_SUB_TYPES = ("매출",)
 st.markdown("""
     <style>
     [data-testid="stSidebar"] { min-width: 320px; max-width: 320px; }
@@ -35,14 +56,17 @@ def initialize_state():
 
     # 융합된 메인 데이터베이스 스키마
     if 'history' not in st.session_state:
-        st.session_state.history = pd.DataFrame(columns=[
-            '날짜', '고객사', '품목명', '구분', '세부구분', '수량', '순수단가', '통관물류비', '최종매입원가', '매출원가', '상태', '비고', 'hash'
-        ])
+        st.session_state.history = ledger_schema.empty_history()
     if 'crm_history' not in st.session_state:
-        st.session_state.crm_history = pd.DataFrame(columns=['날짜', '고객사', '품목명', '판매단가', '비고'])
+        st.session_state.crm_history = ledger_schema.empty_crm()
+    if 'profit_cube' not in st.session_state:
+        st.session_state.profit_cube = ProfitCube()
+    if 'reorder_heap' not in st.session_state:
+        st.session_state.reorder_heap = ReorderHeap()
 
     # FIFO 큐 및 뷰어
     if 'inventory_queues' not in st.session_state: st.session_state.inventory_queues = {}
+    if 'consumption' not in st.session_state: st.session_state.consumption = ConsumptionLedger()
     if 'latest_fifo_detail' not in st.session_state: st.session_state.latest_fifo_detail = pd.DataFrame()
     if 'latest_batch_status' not in st.session_state: st.session_state.latest_batch_status = pd.DataFrame()
 
@@ -51,11 +75,27 @@ def initialize_state():
 # [핵심 모듈 1] 보안 로그 (Audit Trail)
 # ==========================================
 def write_audit_log(action, details):
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    ip_address = "192.168.1.10"
-    user = st.session_state.current_user if st.session_state.current_user else "System"
-    log_entry = {'시간': now, '작업자': user, '접속IP': ip_address, '수행작업': action, '상세내용': details}
-    st.session_state.audit_logs = pd.concat([st.session_state.audit_logs, pd.DataFrame([log_entry])], ignore_index=True)
+    with perf_trace.stage("write_audit_log", rows=1):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ip_address = "192.168.1.10"
+        user = st.session_state.current_user if st.session_state.current_user else "System"
+        log_entry = {'시간': now, '작업자': user, '접속IP': ip_address, '수행작업': action, '상세내용': details}
+        st.session_state.audit_logs = pd.concat([st.session_state.audit_logs, pd.DataFrame([log_entry])],
+                                                ignore_index=True)
+
+
+def write_audit_logs(entries):
+    """감사 로그 여러 건을 한 번에 기록 (일괄 업로드 시 거래별 로그를 concat 1회로 추가)"""
+    if not entries:
+        # 빈 묶음(중복만 있던 덩어리 등)은 빈 DataFrame concat을 하지 않음
+        return
+    with perf_trace.stage("write_audit_log", rows=len(entries)):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        user = st.session_state.current_user if st.session_state.current_user else "System"
+        log_entries = [{'시간': now, '작업자': user, '접속IP': "192.168.1.10", '수행작업': action, '상세내용': details}
+                       for action, details in entries]
+        st.session_state.audit_logs = pd.concat([st.session_state.audit_logs, pd.DataFrame(log_entries)],
+                                                ignore_index=True)
 
 
 # ==========================================
@@ -85,76 +125,34 @@ def login_screen():
 # ==========================================
 def process_secure_transaction(date, item, action, sub_type, qty, customer="본사", base_price=0, customs_logistics_fee=0,
                                sale_price=0, row_hash=None):
-    date = pd.to_datetime(date)
+    date = ingest.normalize_date(date)
 
     if not row_hash:
         payload = f"{date}{item}{action}{qty}{customer}"
         row_hash = hashlib.md5(payload.encode()).hexdigest()
 
-    if item not in st.session_state.inventory_queues:
-        st.session_state.inventory_queues[item] = deque()
-
-    new_record = {
-        '날짜': date, '고객사': customer, '품목명': item, '구분': action, '세부구분': sub_type,
-        '수량': qty, '순수단가': 0, '통관물류비': 0, '최종매입원가': 0, '매출원가': 0, '상태': '정상', '비고': '', 'hash': row_hash
-    }
-
-    audit_details = f"[{action}] 품목:{item} | 수량:{qty}개 | "
-
-    if action == "입고":
-        # 수입 부대비용 분배 및 최종 단가 산출
-        unit_extra = customs_logistics_fee / qty if qty > 0 else 0
-        final_unit_cost = base_price + unit_extra
-
-        st.session_state.inventory_queues[item].append({'date': date, 'qty': qty, 'price': final_unit_cost})
-
-        new_record.update({'순수단가': base_price, '통관물류비': customs_logistics_fee, '최종매입원가': final_unit_cost,
-                           '비고': f"[{sub_type}] 제비용 분배완료"})
-        audit_details += f"최종매입원가:{final_unit_cost:,.0f}원"
-
-    elif action == "출고":
-        remaining = qty
-        total_cogs = 0
-        fifo_breakdown = []
-        batch_status = []
-        queue = st.session_state.inventory_queues[item]
-
-        while remaining > 0 and queue:
-            batch = queue[0]
-            batch_date_str = batch['date'].strftime('%Y-%m-%d')
-
-            if batch['qty'] <= remaining:
-                use_qty = batch['qty']
-                cost = use_qty * batch['price']
-                total_cogs += cost
-                remaining -= use_qty
-                fifo_breakdown.append({'입고일': batch_date_str, '차감수량': use_qty, '적용원가': batch['price'], '합계': cost})
-                batch_status.append({'입고일': batch_date_str, '잔량': 0})
-                queue.popleft()
-            else:
-                use_qty = remaining
-                cost = use_qty * batch['price']
-                total_cogs += cost
-                batch['qty'] -= use_qty
-                remaining = 0
-                fifo_breakdown.append({'입고일': batch_date_str, '차감수량': use_qty, '적용원가': batch['price'], '합계': cost})
-                batch_status.append({'입고일': batch_date_str, '잔량': batch['qty']})
-
-        new_record.update({'순수단가': sale_price, '매출원가': total_cogs,
-                           '비고': f"[{sub_type}] 정상출고" if remaining == 0 else f"재고부족({remaining}개)"})
+    with perf_trace.stage("fifo_loop", rows=1):
+        new_record, sale, audit_details = ledger_engine.apply_transaction(
+            st.session_state.inventory_queues, st.session_state.consumption, date, item, action, sub_type, qty,
+            customer, base_price, customs_logistics_fee, sale_price, row_hash
+        )
 
+    if action == "출고":
         # CRM 저장 (매출일 경우)
-        if sub_type == "매출":
+        if sub_type in CRM_SUB_TYPES:
             new_crm = {'날짜': date, '고객사': customer, '품목명': item, '판매단가': sale_price, '비고': '정상판매'}
-            st.session_state.crm_history = pd.concat([st.session_state.crm_history, pd.DataFrame([new_crm])],
-                                                     ignore_index=True)
+            with perf_trace.stage("crm_concat", rows=1):
+                st.session_state.crm_history = ledger_schema.append_rows(st.session_state.crm_history, [new_crm])
 
-        st.session_state.latest_fifo_detail = pd.DataFrame(fifo_breakdown)
-        st.session_state.latest_batch_status = pd.DataFrame(batch_status)
-        audit_details += f"고객사:{customer} | 매출원가:{total_cogs:,.0f}원"
+        st.session_state.latest_fifo_detail = st.session_state.consumption.breakdown(sale)
+        st.session_state.latest_batch_status = st.session_state.consumption.lot_status(sale)
 
-    st.session_state.history = pd.concat([st.session_state.history, pd.DataFrame([new_record])], ignore_index=True)
-    st.session_state.history = st.session_state.history.sort_values(by='날짜').reset_index(drop=True)
+    with perf_trace.stage("history_concat_sort", rows=1):
+        st.session_state.history = ledger_schema.append_rows(st.session_state.history, [new_record])
+        st.session_state.history = st.session_state.history.sort_values(by='날짜', kind='stable').reset_index(drop=True)
+    profitability.record_sales(st.session_state, [new_record], CRM_SUB_TYPES)
+    reorder_heap.record_movements(st.session_state, [new_record])
+    ledger_engine.bump_version(st.session_state)
 
     write_audit_log(f"수동 {action}", audit_details)
 
@@ -163,97 +161,178 @@ def process_secure_transaction(date, item, action, sub_type, qty, customer="본
 # [핵심 모듈 4] 엑셀 대량 업로드 (파이프라인)
 # ==========================================
 def handle_excel_upload(uploaded_file):
+    with perf_trace.run("엑셀 일괄 업로드"):
+        _handle_excel_upload(uploaded_file)
+
+
+def _handle_excel_upload(uploaded_file):
+    # 같은 파일의 적재가 중간에 멈췄으면 저장해 둔 거래 묶음을 중단 지점부터 이어서 반영 (읽기 · 검증 · 중복 제거 생략)
+    checkpoint = chunked_ingest.IngestCheckpoint.for_files([(uploaded_file.name, uploaded_file.getvalue())])
+    batch, start = checkpoint.resume(st.session_state.history['hash'])
+    stale = render_stale_checkpoint(checkpoint, per_session=True)
+    if stale:
+        write_audit_log("엑셀 일괄 업로드 재개 불가", stale)
+        checkpoint.clear()
+    if batch is not None:
+        write_audit_log("엑셀 일괄 업로드 재개", f"총 {len(batch)}건 중 {start}건 반영 지점부터")
+    else:
+        batch = prepare_excel_batch(uploaded_file)
+        if batch is None:
+            return
+        start = 0
+        if len(batch) > chunked_ingest.CHUNK_ROWS:
+            checkpoint.stage(batch)
+        else:
+            checkpoint = None
+
+    def post_chunk(chunk):
+        audit_entries = ledger_engine.post_transactions(st.session_state, chunk, crm_sub_types=CRM_SUB_TYPES)
+        write_audit_logs([(f"수동 {action}", details) for action, details in audit_entries])
+
     try:
-        df = pd.read_excel(uploaded_file)
+        with perf_trace.stage("post_transactions", rows=len(batch) - start):
+            run_chunked_post(post_chunk, batch, start, checkpoint, label="엑셀 데이터 FIFO 큐 적재", per_session=True)
+    except Exception as e:
+        # 적재 중 오류는 post_transactions가 실패한 덩어리만 반영 전 상태로 롤백한 뒤 전달
+        done = checkpoint.state()['offset'] if checkpoint is not None else 0
+        st.error(f"파일 처리 오류 ({done:,}건까지 반영, 실패한 덩어리는 반영 전 상태로 유지됩니다): {e}")
+        return
+    write_audit_log("엑셀 일괄 업로드", f"총 {len(batch)}건의 데이터 파이프라인 동기화 완료")
+    st.rerun()
+
+
+def prepare_excel_batch(uploaded_file):
+    """엑셀 → 검증 · 해시 · 중복 제거 · 정규화된 날짜순 거래 묶음 (반영할 행이 없거나 양식 오류면 None)"""
+    try:
+        with perf_trace.stage("read_excel") as s:
+            df = pd.read_excel(uploaded_file)
+            s.set_rows(len(df))
         required = ['날짜', '고객사', '품목명', '구분', '세부구분', '수량', '순수단가', '통관물류비', '판매단가']
         if not all(c in df.columns for c in required):
             st.error(f"양식 오류! 필수 컬럼: {required}")
-            return
+            return None
+
+        # 원가 계산 전에 전 행 일괄 검증 → 정상 행만 적재, 오류 행은 반려 시트로
+        with perf_trace.stage("validate", rows=len(df)):
+            valid, rejects = ingest.validate_rows(df, required)
+            store_upload_rejects(rejects)
+        if not rejects.empty:
+            write_audit_log("업로드 검증", f"총 {len(rejects)}건 반려")
 
-        df['날짜'] = pd.to_datetime(df['날짜'])
-        df['hash'] = df.apply(generate_row_hash, axis=1)
+        with perf_trace.stage("generate_row_hash", rows=len(valid)):
+            valid['hash'] = ingest.row_hashes(valid, ['날짜', '품목명', '구분', '수량', '고객사'])
 
-        existing_hashes = set(st.session_state.history['hash'].tolist())
-        new_data = df[~df['hash'].isin(existing_hashes)].copy()
+        with perf_trace.stage("dedup", rows=len(valid)):
+            new_data = valid[~valid['hash'].isin(st.session_state.history['hash'])]
 
         if new_data.empty:
             st.warning("추가할 신규 데이터가 없습니다. (중복 방지 됨)")
-            return
+            return None
 
-        new_data = new_data.sort_values('날짜')
-        with st.status("엑셀 데이터 분석 및 FIFO 큐 적재 중...") as status:
-            for _, row in new_data.iterrows():
-                process_secure_transaction(
-                    date=row['날짜'], item=row['품목명'], action=row['구분'], sub_type=row['세부구분'],
-                    qty=row['수량'], customer=row['고객사'], base_price=row['순수단가'],
-                    customs_logistics_fee=row['통관물류비'], sale_price=row['판매단가'], row_hash=row['hash']
-                )
-            status.update(label="반영 완료!", state="complete")
-
-        write_audit_log("엑셀 일괄 업로드", f"총 {len(new_data)}건의 데이터 파이프라인 동기화 완료")
-        st.rerun()
+        return ingest.normalize_columns(new_data).sort_values('날짜', kind='stable').reset_index(drop=True)
     except Exception as e:
-        st.error(f"파일 처리 오류: {e}")
+        st.error(f"파일 처리 오류 (원장은 업로드 전 상태로 유지됩니다): {e}")
+        return None
 
 
 # ==========================================
 # [핵심 모듈 5] AI 분석 및 대시보드 함수
 # ==========================================
 def calculate_sales_metrics(item_name):
-    history = st.session_state.history
-    now = datetime.now()
-    sales_df = history[(history['품목명'] == item_name) & (history['구분'] == '출고')].copy()
-
-    if sales_df.empty: return 0, 0, 0
-    one_year_ago = now - pd.Timedelta(days=365)
-    three_months_ago = now - pd.Timedelta(days=90)
-
-    avg_12m = sales_df[sales_df['날짜'] >= one_year_ago]['수량'].sum() / 12
-    avg_3m = sales_df[sales_df['날짜'] >= three_months_ago]['수량'].sum() / 3
-    current_stock = sum(b['qty'] for b in st.session_state.inventory_queues.get(item_name, []))
-
-    return current_stock, avg_12m, avg_3m
+    """(현재고, 1년 월평균, 3개월 월평균). 전 품목 집계는 원장 변경 시에만 다시 계산 (dashboard_cache)"""
+    return dashboard_cache.item_metrics(st.session_state, item_name)
 
 
 def get_inventory_summary():
-    summary_data = []
-    for item, queue in st.session_state.inventory_queues.items():
-        total_qty = sum(b['qty'] for b in queue)
-        total_value = sum(b['qty'] * b['price'] for b in queue)  # price는 최종매입원가
-        if total_qty >= 0:
-            summary_data.append({"품목명": item, "현재고": total_qty, "자산금액": total_value})
-    return pd.DataFrame(summary_data)
+    return dashboard_cache.inventory_summary(dashboard_cache.ledger_token(st.session_state),
+                                             st.session_state.inventory_queues)
 
 
 # ==========================================
-# [메인 애플리케이션 실행]
+# [핵심 모듈 6] 대시보드 패널 (패널별 부분 재실행)
 # ==========================================
-initialize_state()
-
-if not st.session_state.logged_in:
-    login_screen()
-else:
-    with st.sidebar:
-        st.title("⚙️ 통합 시스템 메뉴")
-        st.info(f"👤 접속자: **{st.session_state.current_user}**")
+# 각 패널은 st.fragment라 패널 안의 위젯을 바꾸면 그 패널만 다시 실행되고,
+# 정렬/집계 결과는 원장 토큰(dashboard_cache.ledger_token)이 바뀔 때만 다시 계산합니다.
+@st.fragment
+def fifo_detail_panel():
+    l_col, r_col = st.columns(2)
+    with l_col:
+        st.subheader("🧪 FIFO 차감 상세 내역")
+        if not st.session_state.latest_fifo_detail.empty: st.dataframe(st.session_state.latest_fifo_detail,
+                                                                       use_container_width=True)
+    with r_col:
+        st.subheader("📅 관련 배치의 출고 후 잔량")
+        if not st.session_state.latest_batch_status.empty: st.dataframe(st.session_state.latest_batch_status,
+                                                                        use_container_width=True)
+
+
+@st.fragment
+def crm_panel():
+    if not st.session_state.crm_history.empty:
+        st.dataframe(st.session_state.crm_history, use_container_width=True)
+    else:
+        st.info("매출 기록이 없습니다.")
+
+
+@st.fragment
+def profit_panel():
+    render_profit_ranking(st.session_state, CRM_SUB_TYPES)
+
+
+@st.fragment
+def inventory_summary_panel():
+    st.subheader("📦 창고 전체 자산 요약")
+    inv_df = get_inventory_summary()
+    if not inv_df.empty:
+        m1, m2, m3 = st.columns(3)
+        m1.metric("관리 품목 수", f"{len(inv_df)} 종")
+        m2.metric("총 재고 수량", f"{inv_df['현재고'].sum():,} 개")
+        m3.metric("총 재고 자산", f"₩ {inv_df['자산금액'].sum():,.0f}")
+        st.dataframe(inv_df.sort_values('자산금액', ascending=False), use_container_width=True)
+
+
+@st.fragment
+def reorder_alert_panel():
+    render_reorder_alerts(dashboard_cache.reorder_heap(st.session_state))
+
+
+@st.fragment
+def aging_panel():
+    render_aging_report(dashboard_cache.aging_report(st.session_state))
+
+
+@st.fragment
+def item_analysis_panel():
+    st.subheader("💡 품목별 적정재고 (리드타임) 검토")
+    item_list = dashboard_cache.item_list(dashboard_cache.ledger_token(st.session_state), st.session_state.history)
+    if not item_list:
+        return
+    selected_item = st.selectbox("분석할 품목 선택", item_list)
+    curr_stock, m12_avg, m3_avg = calculate_sales_metrics(selected_item)
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("현재 재고", f"{curr_stock:,} 개")
+    c2.metric("1년 월평균 판매", f"{int(m12_avg)} 개")
+    c3.metric("최근 3개월 평균", f"{int(m3_avg)} 개", delta=f"{m3_avg - m12_avg:,.1f} 추세")
+
+    stock_months = curr_stock / m3_avg if m3_avg > 0 else 0
+    c4.metric("재고 소진 예상", f"{stock_months:.1f} 개월")
+
+    if stock_months < 2.0:
+        st.error("⚠️ **발주 경고**: 재고가 수입 리드타임(2개월) 대비 부족합니다.")
+    elif stock_months < 3.0:
+        st.warning("🟡 **관찰 필요**: 재고가 적정선 하단입니다.")
+    else:
+        st.success("✅ **안정권**: 재고가 충분합니다.")
+
+    render_lot_trace(st.session_state.consumption, selected_item)
 
-        menu_options = [
-            "1. 📁 엑셀 일괄 업로드",
-            "2. 🚢 수동 수입/입고",
-            "3. 📤 수동 매출/출고",
-            "4. 🤝 CRM 및 단가 이력",
-            "5. 📊 AI 재고/발주 분석"
-        ]
-        if st.session_state.role == "admin":
-            menu_options.append("6. 🛡️ 시스템 감사 (Admin)")
-
-        app_mode = st.radio("작업 선택", menu_options)
-        st.divider()
-        if st.button("🚪 로그아웃", use_container_width=True):
-            write_audit_log("로그아웃", "시스템 정상 종료")
-            st.session_state.logged_in = False
-            st.rerun()
 
+# ==========================================
+# [메인 애플리케이션 실행]
+# ==========================================
+def render_page(app_mode):
+    """선택한 메뉴 화면 (화면 렌더링 계측 구간 안에서 호출)"""
     # --- 1. 엑셀 파이프라인 ---
     if app_mode == "1. 📁 엑셀 일괄 업로드":
         st.title("📥 대량 데이터 마이그레이션 (Excel)")
@@ -266,6 +345,8 @@ else:
         uploaded_file = st.file_uploader("엑셀 파일을 선택하세요", type=['xlsx'])
         if uploaded_file and st.button("🚀 데이터 동기화 실행", type="primary", use_container_width=True):
             handle_excel_upload(uploaded_file)
+        render_cancelled_notice(per_session=True)
+        render_upload_rejects()
 
     # --- 2. 수동 입고 ---
     elif app_mode == "2. 🚢 수동 수입/입고":
@@ -300,64 +381,73 @@ else:
                 st.rerun()
 
         st.divider()
-        l_col, r_col = st.columns(2)
-        with l_col:
-            st.subheader("🧪 FIFO 차감 상세 내역")
-            if not st.session_state.latest_fifo_detail.empty: st.dataframe(st.session_state.latest_fifo_detail,
-                                                                           use_container_width=True)
-        with r_col:
-            st.subheader("📅 관련 배치의 출고 후 잔량")
-            if not st.session_state.latest_batch_status.empty: st.dataframe(st.session_state.latest_batch_status,
-                                                                            use_container_width=True)
+        fifo_detail_panel()
 
     # --- 4. CRM ---
     elif app_mode == "4. 🤝 CRM 및 단가 이력":
         st.title("🤝 고객사 CRM 및 발주 알림")
-        if not st.session_state.crm_history.empty:
-            st.dataframe(st.session_state.crm_history, use_container_width=True)
-        else:
-            st.info("매출 기록이 없습니다.")
+        profit_panel()
+        crm_panel()
 
     # --- 5. AI 대시보드 ---
     elif app_mode == "5. 📊 AI 재고/발주 분석":
         st.title("📊 통합 대시보드 및 AI 발주 분석")
 
         # 1) 전체 요약
-        st.subheader("📦 창고 전체 자산 요약")
-        inv_df = get_inventory_summary()
-        if not inv_df.empty:
-            m1, m2, m3 = st.columns(3)
-            m1.metric("관리 품목 수", f"{len(inv_df)} 종")
-            m2.metric("총 재고 수량", f"{inv_df['현재고'].sum():,} 개")
-            m3.metric("총 재고 자산", f"₩ {inv_df['자산금액'].sum():,.0f}")
-            st.dataframe(inv_df.sort_values('자산금액', ascending=False), use_container_width=True)
+        inventory_summary_panel()
 
         st.divider()
 
-        # 2) 개별 AI 발주 분석
-        st.subheader("💡 품목별 적정재고 (리드타임) 검토")
-        item_list = sorted(st.session_state.history['품목명'].unique())
-        if item_list:
-            selected_item = st.selectbox("분석할 품목 선택", item_list)
-            curr_stock, m12_avg, m3_avg = calculate_sales_metrics(selected_item)
-
-            c1, c2, c3, c4 = st.columns(4)
-            c1.metric("현재 재고", f"{curr_stock:,} 개")
-            c2.metric("1년 월평균 판매", f"{int(m12_avg)} 개")
-            c3.metric("최근 3개월 평균", f"{int(m3_avg)} 개", delta=f"{m3_avg - m12_avg:,.1f} 추세")
-
-            stock_months = curr_stock / m3_avg if m3_avg > 0 else 0
-            c4.metric("재고 소진 예상", f"{stock_months:.1f} 개월")
-
-            if stock_months < 2.0:
-                st.error("⚠️ **발주 경고**: 재고가 수입 리드타임(2개월) 대비 부족합니다.")
-            elif stock_months < 3.0:
-                st.warning("🟡 **관찰 필요**: 재고가 적정선 하단입니다.")
-            else:
-                st.success("✅ **안정권**: 재고가 충분합니다.")
+        # 2) 전 품목 발주 우선순위
+        reorder_alert_panel()
+
+        st.divider()
+
+        # 3) 재고 연령 분석
+        aging_panel()
+
+        st.divider()
+
+        # 4) 개별 AI 발주 분석
+        item_analysis_panel()
 
     # --- 6. 보안 로그 ---
     elif app_mode == "6. 🛡️ 시스템 감사 (Admin)":
         st.title("🛡️ 전산 감사 로그 (Paper Trail)")
         st.error("물리적 삭제 불가 영역. 전산 감사를 위한 위변조 방지 기록입니다.")
-        st.dataframe(st.session_state.audit_logs.sort_values(by='시간', ascending=False), use_container_width=True)
\ No newline at end of file
+        st.dataframe(st.session_state.audit_logs.sort_values(by='시간', ascending=False), use_container_width=True)
+
+    # --- 7. 성능 계측 ---
+    elif app_mode == "7. ⏱️ 성능 계측 (Admin)":
+        render_perf_page()
+
+
+initialize_state()
+
+if not st.session_state.logged_in:
+    login_screen()
+else:
+    with st.sidebar:
+        st.title("⚙️ 통합 시스템 메뉴")
+        st.info(f"👤 접속자: **{st.session_state.current_user}**")
+
+        menu_options = [
+            "1. 📁 엑셀 일괄 업로드",
+            "2. 🚢 수동 수입/입고",
+            "3. 📤 수동 매출/출고",
+            "4. 🤝 CRM 및 단가 이력",
+            "5. 📊 AI 재고/발주 분석"
+        ]
+        if st.session_state.role == "admin":
+            menu_options.append("6. 🛡️ 시스템 감사 (Admin)")
+            menu_options.append("7. ⏱️ 성능 계측 (Admin)")
+
+        app_mode = st.radio("작업 선택", menu_options)
+        st.divider()
+        if st.button("🚪 로그아웃", use_container_width=True):
+            write_audit_log("로그아웃", "시스템 정상 종료")
+            st.session_state.logged_in = False
+            st.rerun()
+
+    with perf_trace.run(f"화면 렌더링:{app_mode}"):
+        render_page(app_mode)
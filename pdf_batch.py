@@ -0,0 +1,126 @@
+"""
+AI 통관서류 일괄 처리 (병렬 파싱/추출 + 문서 해시 캐시)
+
+분기말 수백 건의 수입 서류를 한 건씩 순차 처리하면 Document Parse / Solar LLM 호출 대기시간이
+그대로 누적됩니다. 이 모듈은
+- 문서 내용(SHA-256) 기준 캐시로 같은 파일 재업로드 시 API를 다시 호출하지 않고,
+- 캐시에 없는 문서만 제한된 개수의 스레드 워커에서 '파싱 → 구조화 추출'을 동시에 수행합니다.
+
+파싱/추출 함수는 호출부에서 주입하므로 실제 Upstage 대신 로컬 스텁 서버(upstage_stub.py)로 검증할 수 있습니다.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import perf_trace
+
+DEFAULT_WORKERS = int(os.environ.get('SKU_PDF_WORKERS', '4'))
+CACHE_DIR = os.environ.get('SKU_PDF_CACHE_DIR', os.path.join('.cache', 'pdf_extract'))
+
+
+def document_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class ExtractionCache:
+    """문서 해시 → 추출 결과(JSON) 디스크 캐시. 여러 세션/재시작 간에 공유됩니다."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, doc_hash):
+        return os.path.join(self.cache_dir, f"{doc_hash}.json")
+
+    def get(self, doc_hash):
+        try:
+            with open(self._path(doc_hash), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, doc_hash, data):
+        # 임시파일에 쓴 뒤 교체하여 동시 쓰기 중 반쯤 쓰인 파일이 읽히지 않도록 함
+        tmp_path = f"{self._path(doc_hash)}.{threading.get_ident()}.tmp"
+        with self._lock, open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(doc_hash))
+
+
+def _as_dict(data):
+    return data.model_dump() if hasattr(data, 'model_dump') else dict(data)
+
+
+def _parse_and_extract(name, content, parse_fn, extract_fn):
+    """워커 스레드: 임시파일 저장 → 파싱 → 구조화 추출 (Streamlit API 호출 금지)"""
+    suffix = os.path.splitext(name)[1] or '.pdf'
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        tmp_file.write(content)
+        tmp_file_path = tmp_file.name
+    try:
+        with perf_trace.stage("upstage_parse"):
+            parsed_text = parse_fn(tmp_file_path)
+        with perf_trace.stage("solar_extract"):
+            return _as_dict(extract_fn(parsed_text))
+    finally:
+        os.remove(tmp_file_path)
+
+
+def process_documents(documents, parse_fn, extract_fn, max_workers=DEFAULT_WORKERS, cache=None, on_result=None):
+    """
+    documents: [(파일명, bytes), ...]
+    반환: 입력 순서대로 [{'파일명', 'hash', '상태'(캐시/완료/오류), '소요시간', 'data', '오류내용'}, ...]
+    on_result(완료건수, 전체건수, 결과): 결과가 나올 때마다 호출 (호출 스레드에서 실행되므로 UI 갱신 가능)
+    """
+    results = [None] * len(documents)
+    pending = {}  # 해시 → 같은 내용의 문서 인덱스 목록 (배치 내 중복 파일은 한 번만 호출)
+    done = 0
+
+    def finish(index, result):
+        nonlocal done
+        results[index] = result
+        done += 1
+        if on_result:
+            on_result(done, len(documents), result)
+
+    for index, (name, content) in enumerate(documents):
+        doc_hash = document_hash(content)
+        cached = cache.get(doc_hash) if cache else None
+        if cached is not None:
+            finish(index, {'파일명': name, 'hash': doc_hash, '상태': '캐시', '소요시간': 0.0, 'data': cached, '오류내용': ''})
+        else:
+            pending.setdefault(doc_hash, []).append(index)
+
+    if not pending:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='pdf-batch') as pool:
+        futures = {}
+        for doc_hash, indexes in pending.items():
+            name, content = documents[indexes[0]]
+            futures[pool.submit(_timed, _parse_and_extract, name, content, parse_fn, extract_fn)] = doc_hash
+
+        for future in as_completed(futures):
+            doc_hash = futures[future]
+            try:
+                data, elapsed = future.result()
+                status, error = '완료', ''
+                if cache:
+                    cache.put(doc_hash, data)
+            except Exception as e:
+                data, elapsed, status, error = None, 0.0, '오류', str(e)
+            for index in pending[doc_hash]:
+                finish(index, {'파일명': documents[index][0], 'hash': doc_hash, '상태': status,
+                               '소요시간': round(elapsed, 3), 'data': data, '오류내용': error})
+    return results
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    value = func(*args)
+    return value, time.perf_counter() - start
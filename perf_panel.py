@@ -0,0 +1,54 @@
+import streamlit as st
+from datetime import datetime
+
+import perf_trace
+
+
+def render_perf_page():
+    """관리자 전용 성능 계측 화면 (perf_trace 기록 조회 · 내보내기)"""
+    st.title("⏱️ 성능 계측 (Stage Profiler)")
+    st.info("업로드 · FIFO 처리 · 감사로그 · 화면 렌더링 단계별 소요시간과 처리행수, 최대 메모리를 기록합니다. "
+            "계측을 끄면 추가 비용이 발생하지 않습니다.")
+
+    c1, c2, c3 = st.columns([1, 1, 2])
+    enabled = c1.toggle("계측 켜기", value=perf_trace.is_enabled())
+    trace_memory = c2.toggle("메모리 추적 (tracemalloc)", value=perf_trace.is_memory_traced(),
+                             disabled=not enabled, help="최대 메모리를 측정하지만 처리 속도가 느려집니다. 프로세스 전체 기준 근사치로, "
+                                  "여러 세션이 동시에 작업하면 다른 세션의 할당이 섞입니다.")
+    if enabled != perf_trace.is_enabled() or (enabled and trace_memory != perf_trace.is_memory_traced()):
+        perf_trace.set_enabled(enabled, trace_memory)
+        st.rerun()
+    if c3.button("🗑️ 기록 초기화"):
+        perf_trace.clear()
+        st.rerun()
+
+    records = perf_trace.records_frame()
+    if records.empty:
+        st.warning("수집된 계측 기록이 없습니다. 계측을 켠 뒤 업로드/입출고 작업을 수행하세요.")
+        return
+
+    summary = perf_trace.stage_summary(records)
+    m1, m2, m3 = st.columns(3)
+    m1.metric("수집 구간 수", f"{len(records):,} 건")
+    m2.metric("실행(Run) 수", f"{records['run_id'].nunique():,} 회")
+    m3.metric("최다 소요 단계", summary.iloc[0]['단계'], f"{summary.iloc[0]['합계(s)']:,.2f} s", delta_color="off")
+
+    st.subheader("📊 단계별 요약")
+    st.bar_chart(summary.set_index('단계')['합계(s)'])
+    st.dataframe(summary, use_container_width=True, hide_index=True, column_config={
+        '합계(s)': st.column_config.NumberColumn(format="%.3f"),
+        '평균(ms)': st.column_config.NumberColumn(format="%.2f"),
+        'p95(ms)': st.column_config.NumberColumn(format="%.2f"),
+        '행/초': st.column_config.NumberColumn(format="%.0f"),
+    })
+
+    st.subheader("🧾 최근 실행 내역")
+    runs = records[records['깊이'] == 0].sort_values('시작시각', ascending=False)
+    st.dataframe(runs.drop(columns=['깊이']), use_container_width=True, hide_index=True)
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    d1, d2 = st.columns(2)
+    d1.download_button("📥 계측 기록 CSV", data=records.to_csv(index=False).encode('utf-8-sig'),
+                       file_name=f"perf_trace_{stamp}.csv", use_container_width=True)
+    d2.download_button("📥 계측 기록 JSON", data=perf_trace.export_json().encode('utf-8'),
+                       file_name=f"perf_trace_{stamp}.json", use_container_width=True)
@@ -0,0 +1,232 @@
+"""
+단계별 성능 계측 (수행시간 · 처리행수 · 최대 메모리)
+
+업로드가 느릴 때 read_excel / 해시 / FIFO 루프 / concat·정렬 / 감사로그 / 화면 렌더링 중
+어디에서 시간이 소요되는지 확인하기 위한 경량 계측 훅입니다.
+
+    with perf_trace.run("엑셀 업로드"):
+        with perf_trace.stage("read_excel") as s:
+            df = pd.read_excel(f)
+            s.set_rows(len(df))
+
+계측이 꺼져 있으면 stage()/run()은 아무 일도 하지 않는 공용 객체를 돌려주므로
+기록 · 시간측정 · 메모리 추적 비용이 발생하지 않습니다.
+기록은 프로세스 전역(모든 세션 공용)으로 보관되어 관리자 화면에서 함께 조회됩니다.
+
+최대 메모리는 근사치입니다. tracemalloc은 프로세스 전체의 할당을 세므로 같은 시간에 도는 다른 세션 · 스레드의
+할당이 섞이고, 최대치 초기화(reset_peak)도 프로세스 전역이라 다른 스레드의 구간이 열려 있을 때는 초기화하지 않습니다
+(그 동안의 값은 구간 시작 전 최대치가 포함되어 실제보다 클 수 있음). 정확한 값은 단일 스레드 실행에서만 나옵니다.
+st.rerun() · st.stop()이 구간을 빠져나가는 것은 정상 흐름이므로 오류로 기록하지 않습니다.
+
+환경변수: SKU_PERF_TRACE=1 (계측 켜기), SKU_PERF_TRACE_MEMORY=1 (tracemalloc 최대 메모리 측정)
+"""
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+MAX_RECORDS = 20_000
+
+_enabled = os.environ.get('SKU_PERF_TRACE', '0') == '1'
+_trace_memory = os.environ.get('SKU_PERF_TRACE_MEMORY', '0') == '1'
+_records = deque(maxlen=MAX_RECORDS)
+_lock = threading.Lock()
+_local = threading.local()
+_run_ids = itertools.count(1)
+# 계측 구간이 열려 있는 스레드 수 (reset_peak은 혼자일 때만)
+_open_threads = 0
+
+
+# ==========================================
+# [1. 계측 ON/OFF]
+# ==========================================
+def is_enabled():
+    return _enabled
+
+
+def is_memory_traced():
+    return _enabled and _trace_memory
+
+
+def set_enabled(enabled, trace_memory=None):
+    """계측 켜기/끄기. 메모리 추적은 tracemalloc 비용이 크므로 별도 옵션으로 둡니다."""
+    global _enabled, _trace_memory
+    _enabled = bool(enabled)
+    if trace_memory is not None:
+        _trace_memory = bool(trace_memory)
+
+    if _enabled and _trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    elif tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+# ==========================================
+# [2. 계측 구간]
+# ==========================================
+class _NullStage:
+    """계측 OFF 시 사용하는 빈 구간 (공용 싱글턴)"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_rows(self, rows):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _is_control_flow(exc_type):
+    """Streamlit의 화면 재실행 · 중단 예외 (Streamlit을 불러온 프로세스에서만 발생)"""
+    scriptrunner = sys.modules.get('streamlit.runtime.scriptrunner')
+    return (exc_type is not None and scriptrunner is not None
+            and issubclass(exc_type, (scriptrunner.RerunException, scriptrunner.StopException)))
+
+
+class _Stage:
+    __slots__ = ('name', 'rows', 'is_run', 'run_id', 'run_name', '_start', '_wall', '_mem_base', '_mem_peak')
+
+    def __init__(self, name, rows=None, is_run=False):
+        self.name = name
+        self.rows = rows
+        self.is_run = is_run
+        self._mem_base = self._mem_peak = 0
+
+    def set_rows(self, rows):
+        self.rows = int(rows)
+
+    def __enter__(self):
+        global _open_threads
+        stack = _stack()
+        parent = stack[-1] if stack else None
+        if self.is_run or parent is None:
+            self.run_id, self.run_name = next(_run_ids), self.name
+        else:
+            self.run_id, self.run_name = parent.run_id, parent.run_name
+        if parent is None:
+            with _lock:
+                _open_threads += 1
+
+        if _trace_memory and tracemalloc.is_tracing():
+            # 상위 구간의 최대치를 먼저 반영한 뒤 하위 구간 기준으로 peak 초기화 (다른 스레드 구간이 열려 있으면 근사)
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent._mem_peak = max(parent._mem_peak, peak)
+            if _open_threads == 1:
+                tracemalloc.reset_peak()
+            self._mem_base = self._mem_peak = current
+
+        stack.append(self)
+        self._wall = datetime.now()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _open_threads
+        elapsed = time.perf_counter() - self._start
+        stack = _stack()
+        stack.pop()
+        if not stack:
+            with _lock:
+                _open_threads -= 1
+
+        peak_mb = None
+        if _trace_memory and tracemalloc.is_tracing():
+            self._mem_peak = max(self._mem_peak, tracemalloc.get_traced_memory()[1])
+            peak_mb = round((self._mem_peak - self._mem_base) / 1024 ** 2, 3)
+            if stack:
+                stack[-1]._mem_peak = max(stack[-1]._mem_peak, self._mem_peak)
+
+        record = {
+            'run_id': self.run_id, '실행': self.run_name, '단계': self.name, '깊이': len(stack),
+            '시작시각': self._wall.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3], '소요시간(s)': round(elapsed, 6),
+            '처리행수': self.rows, '최대메모리(MB)': peak_mb,
+            '오류': exc_type.__name__ if exc_type and not _is_control_flow(exc_type) else '',
+            '스레드': threading.current_thread().name,
+        }
+        with _lock:
+            _records.append(record)
+        return False
+
+
+def stage(name, rows=None):
+    """계측 구간. 계측 OFF면 공용 빈 객체를 반환합니다."""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, rows)
+
+
+def run(name, rows=None):
+    """하나의 작업 단위(업로드 1회, 화면 렌더 1회 등). 하위 stage()는 같은 run_id로 묶입니다."""
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, rows, is_run=True)
+
+
+# ==========================================
+# [3. 조회 및 내보내기]
+# ==========================================
+def records_frame():
+    with _lock:
+        rows = list(_records)
+    columns = ['run_id', '실행', '단계', '깊이', '시작시각', '소요시간(s)', '처리행수', '최대메모리(MB)', '오류', '스레드']
+    return pd.DataFrame(rows, columns=columns)
+
+
+def stage_summary(df=None):
+    """단계별 호출수 / 합계 / 평균 / p95 / 처리량 / 최대메모리 요약"""
+    df = records_frame() if df is None else df
+    if df.empty:
+        return pd.DataFrame(columns=['단계', '호출수', '합계(s)', '평균(ms)', 'p95(ms)', '처리행수', '행/초', '최대메모리(MB)'])
+
+    grouped = df.groupby('단계')
+    summary = pd.DataFrame({
+        '호출수': grouped.size(),
+        '합계(s)': grouped['소요시간(s)'].sum(),
+        '평균(ms)': grouped['소요시간(s)'].mean() * 1000,
+        'p95(ms)': grouped['소요시간(s)'].quantile(0.95) * 1000,
+        '처리행수': grouped['처리행수'].sum(min_count=1),
+        '최대메모리(MB)': grouped['최대메모리(MB)'].max(),
+    })
+    summary['행/초'] = summary['처리행수'] / summary['합계(s)']
+    summary = summary.reset_index().sort_values('합계(s)', ascending=False)
+    return summary[['단계', '호출수', '합계(s)', '평균(ms)', 'p95(ms)', '처리행수', '행/초', '최대메모리(MB)']]
+
+
+def export_json():
+    """오프라인 분석용 JSON (레코드 전체 + 수집 환경)"""
+    payload = {
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'trace_memory': _trace_memory,
+        'records': records_frame().to_dict(orient='records'),
+    }
+    return json.dumps(payload, ensure_ascii=False, indent=2, default=str)
+
+
+def clear():
+    with _lock:
+        _records.clear()
+
+
+if _enabled and _trace_memory:
+    tracemalloc.start()
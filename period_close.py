@@ -0,0 +1,250 @@
+"""
+월 마감 (Period Close) — 품목 × 월 수불 · 원가 확정 테이블
+
+월별 매출원가 · 매출액을 구할 때마다 전체 출고 행을 다시 훑지 않도록,
+마감한 월의 품목별 합계를 확정 테이블(Parquet)로 얼려 둡니다.
+
+- 컬럼: 월, 품목명, 기초수량, 기초금액, 입고수량, 입고금액, 출고수량, 매출원가, 매출액, 기말수량, 기말금액
+  * 기말수량 = 기초수량 + 입고수량 - 출고수량, 기말금액 = 기초금액 + 입고금액 - 매출원가
+  * 매출액 = 판매단가 × 수량 (앱 원장은 출고 행의 순수단가 컬럼에 판매단가를 기록)
+- 마감은 월 순서대로만 진행하고, 다음 월의 기초는 직전 마감월의 기말을 그대로 이어받습니다.
+- 보고서(report)는 마감된 월을 확정 테이블에서 읽고, 마지막 마감월 이후(미마감) 행만 원장에서 실시간 계산합니다.
+- 마감 후 과거 일자로 들어온 거래는 reopen(월)으로 해당 월부터 마감을 풀고 다시 close 해야 반영됩니다.
+
+- 저장 위치: 환경변수 SKU_PERIOD_CLOSE (기본 period_close.parquet)
+
+사용 예)
+    python period_close.py close 2025-06 inventory_10k_data.xlsx     # 2025-06까지 마감
+    python period_close.py report inventory_10k_data.xlsx            # 월별 수불표 (확정 + 실시간)
+    python period_close.py reopen 2025-05
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import ingest
+
+DEFAULT_PATH = os.environ.get('SKU_PERIOD_CLOSE', 'period_close.parquet')
+
+MOVEMENT_COLUMNS = ['입고수량', '입고금액', '출고수량', '매출원가', '매출액']
+CLOSE_COLUMNS = ['월', '품목명', '기초수량', '기초금액'] + MOVEMENT_COLUMNS + ['기말수량', '기말금액']
+
+
+# ==========================================
+# [1. 월별 수불 집계]
+# ==========================================
+def _month(dates):
+    """날짜 → 월 번호 (1970-01 = 0인 정수, 정렬 · 범위 계산용)"""
+    return pd.Series(dates).to_numpy(dtype='datetime64[ns]').astype('datetime64[M]').astype(np.int64)
+
+
+def _month_code(text):
+    return int(np.datetime64(text, 'M').astype(np.int64))
+
+
+def _month_text(codes):
+    return np.asarray(codes, dtype=np.int64).astype('datetime64[M]').astype(str)
+
+
+def _prices(history):
+    """(입고 단가, 판매단가). 앱 원장은 최종매입원가/순수단가, 엑셀 원장(main.py · 레거시)은 단가 1개 컬럼"""
+    if '최종매입원가' in history.columns:
+        return history['최종매입원가'], history['순수단가']
+    return history['단가'], history['단가']
+
+
+def monthly_movements(history):
+    """원장 행 → (월 번호, 품목명)별 입고/출고 합계"""
+    if history.empty:
+        return pd.DataFrame(columns=['월', '품목명'] + MOVEMENT_COLUMNS)
+    receipt = (history['구분'] == '입고').to_numpy()
+    issue = (history['구분'] == '출고').to_numpy()
+    qty = history['수량'].to_numpy(dtype='float64')
+    cost, price = (s.to_numpy(dtype='float64') for s in _prices(history))
+    frame = pd.DataFrame({
+        '월': _month(history['날짜']), '품목명': history['품목명'].astype(str).to_numpy(),
+        '입고수량': np.where(receipt, qty, 0), '입고금액': np.where(receipt, qty * cost, 0),
+        '출고수량': np.where(issue, qty, 0), '매출원가': np.where(issue, history['매출원가'].to_numpy(dtype='float64'), 0),
+        '매출액': np.where(issue, qty * price, 0),
+    })
+    return frame.groupby(['월', '품목명'], sort=True).sum().reset_index()
+
+
+def roll_forward(movements, opening=None, months=None):
+    """
+    월별 수불에 기초 잔액을 이어 붙여 월 × 품목 수불표 계산.
+    opening: 기초 잔액 DataFrame(품목명, 기말수량, 기말금액) — 직전 마감월의 기말
+    months: 결과에 넣을 월 번호 목록 (없으면 수불이 있는 첫 월 ~ 마지막 월, 거래 없는 월도 포함)
+    """
+    if months is None:
+        if movements.empty:
+            return pd.DataFrame(columns=CLOSE_COLUMNS)
+        months = np.arange(movements['월'].min(), movements['월'].max() + 1)
+    months = np.asarray(months, dtype=np.int64)
+    if len(months) == 0:
+        return pd.DataFrame(columns=CLOSE_COLUMNS)
+
+    opening = opening if opening is not None else pd.DataFrame(columns=['품목명', '기말수량', '기말금액'])
+    items = pd.Index(opening['품목명']).union(pd.Index(movements['품목명'].unique()))
+    grid = pd.MultiIndex.from_product([months, items], names=['월', '품목명'])
+    frame = movements.set_index(['월', '품목명']).reindex(grid, fill_value=0).reset_index()
+
+    # 품목별 누적 순증감 + 기초 잔액 = 기말 (월 × 품목 격자를 품목 기준으로 재배열해 누적)
+    start = opening.set_index('품목명').reindex(items, fill_value=0)
+    n_items = len(items)
+    net_qty = (frame['입고수량'] - frame['출고수량']).to_numpy().reshape(len(months), n_items)
+    net_value = (frame['입고금액'] - frame['매출원가']).to_numpy().reshape(len(months), n_items)
+    closing_qty = start['기말수량'].to_numpy(dtype='float64') + net_qty.cumsum(axis=0)
+    closing_value = start['기말금액'].to_numpy(dtype='float64') + net_value.cumsum(axis=0)
+    frame['기말수량'] = closing_qty.ravel()
+    frame['기말금액'] = closing_value.ravel()
+    frame['기초수량'] = frame['기말수량'] - net_qty.ravel()
+    frame['기초금액'] = frame['기말금액'] - net_value.ravel()
+
+    # 잔액도 거래도 없는 품목 행은 제외
+    active = frame[['기초수량', '기초금액'] + MOVEMENT_COLUMNS].ne(0).any(axis=1)
+    frame = frame[active].reset_index(drop=True)
+    frame['월'] = _month_text(frame['월'])
+    return frame[CLOSE_COLUMNS]
+
+
+# ==========================================
+# [2. 마감 테이블]
+# ==========================================
+class PeriodClose:
+    """마감 확정 테이블 (Parquet 파일 1개)"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.table = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame(columns=CLOSE_COLUMNS)
+
+    def closed_months(self):
+        return sorted(self.table['월'].unique())
+
+    def last_closed(self):
+        months = self.closed_months()
+        return months[-1] if months else None
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        self.table.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+
+    def _opening(self):
+        """마지막 마감월의 기말 = 다음 월의 기초"""
+        last = self.last_closed()
+        if last is None:
+            return None
+        return self.table.loc[self.table['월'] == last, ['품목명', '기말수량', '기말금액']]
+
+    def _open_rows(self, history, until=None):
+        """마지막 마감월 이후 ~ until(월, 포함) 원장 행 (날짜순 원장이면 이진 탐색으로 잘라냄)"""
+        dates = history['날짜']
+        last = self.last_closed()
+        lower = pd.Timestamp(np.datetime64(last, 'M') + 1) if last is not None else None
+        upper = pd.Timestamp(np.datetime64(until, 'M') + 1) if until is not None else None
+        if dates.is_monotonic_increasing:
+            lo = dates.searchsorted(lower, side='left') if lower is not None else 0
+            hi = dates.searchsorted(upper, side='left') if upper is not None else len(dates)
+            return history.iloc[lo:hi]
+        mask = np.ones(len(history), dtype=bool)
+        if lower is not None:
+            mask &= (dates >= lower).to_numpy()
+        if upper is not None:
+            mask &= (dates < upper).to_numpy()
+        return history[mask]
+
+    def close(self, history, through):
+        """through(YYYY-MM)까지 아직 마감되지 않은 월을 확정 · 저장하고 새로 마감한 행 반환"""
+        last = self.last_closed()
+        if last is not None and through <= last:
+            return pd.DataFrame(columns=CLOSE_COLUMNS)
+        rows = self._open_rows(history, until=through)
+        movements = monthly_movements(rows)
+        if last is not None:
+            first = _month_code(last) + 1
+        elif not movements.empty:
+            first = movements['월'].min()
+        else:
+            return pd.DataFrame(columns=CLOSE_COLUMNS)
+        frozen = roll_forward(movements, self._opening(), np.arange(first, _month_code(through) + 1))
+        self.table = pd.concat([self.table, frozen], ignore_index=True) if not self.table.empty else frozen
+        self._save()
+        return frozen
+
+    def reopen(self, month):
+        """month(YYYY-MM)부터 이후 마감 취소"""
+        self.table = self.table[self.table['월'] < month].reset_index(drop=True)
+        self._save()
+
+    def report(self, history, start=None, end=None):
+        """월별 수불표: 마감된 월은 확정 테이블, 이후 월은 원장에서 실시간 계산 (start/end는 YYYY-MM, 포함)"""
+        movements = monthly_movements(self._open_rows(history))
+        months, last = None, self.last_closed()
+        if last is not None:
+            # 마감 직후 월부터 이어서 (거래 없이 잔액만 있는 월도 close()와 같이 포함)
+            last_month = movements['월'].max() if not movements.empty else _month_code(last)
+            months = np.arange(_month_code(last) + 1, last_month + 1)
+        live = roll_forward(movements, self._opening(), months)
+        out = pd.concat([t for t in (self.table, live) if not t.empty], ignore_index=True) \
+            if not (self.table.empty and live.empty) else pd.DataFrame(columns=CLOSE_COLUMNS)
+        if start is not None:
+            out = out[out['월'] >= start]
+        if end is not None:
+            out = out[out['월'] <= end]
+        return out.reset_index(drop=True)
+
+
+# --- 실행부 ---
+def _load_history(path):
+    df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_excel(path)
+    if '매출원가' not in df.columns:
+        raise SystemExit(f"{path}: 매출원가 컬럼이 없습니다. (FIFO 계산을 마친 원장을 지정하세요)")
+    df['날짜'] = ingest.normalize_dates(df['날짜'])
+    return df.sort_values('날짜', kind='stable').reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="월 마감 확정 테이블")
+    parser.add_argument('--path', default=DEFAULT_PATH, help="마감 테이블 Parquet 경로")
+    sub = parser.add_subparsers(dest='command', required=True)
+    close_parser = sub.add_parser('close', help="지정 월까지 마감")
+    close_parser.add_argument('through', help="YYYY-MM")
+    close_parser.add_argument('source', help="원장 엑셀/Parquet")
+    report_parser = sub.add_parser('report', help="월별 수불표 출력")
+    report_parser.add_argument('source')
+    report_parser.add_argument('--out', default=None, help="엑셀로 저장할 경로")
+    reopen_parser = sub.add_parser('reopen', help="지정 월부터 마감 취소")
+    reopen_parser.add_argument('month', help="YYYY-MM")
+    args = parser.parse_args(argv)
+
+    closing = PeriodClose(args.path)
+    if args.command == 'reopen':
+        closing.reopen(args.month)
+        print(f"{args.month}부터 마감 취소 (마지막 마감월: {closing.last_closed()})")
+        return 0
+
+    history = _load_history(args.source)
+    start = time.perf_counter()
+    if args.command == 'close':
+        frozen = closing.close(history, args.through)
+        print(f"{len(frozen['월'].unique()) if not frozen.empty else 0}개월 마감 ({len(frozen):,}행, "
+              f"{time.perf_counter() - start:.3f}s) · 마지막 마감월 {closing.last_closed()}")
+        return 0
+
+    report = closing.report(history)
+    elapsed = time.perf_counter() - start
+    summary = report.groupby('월', sort=True)[['입고금액', '매출원가', '매출액', '기말금액']].sum()
+    print(summary.to_string(float_format=lambda v: f"{v:,.0f}"))
+    print(f"\n마감 {len(closing.closed_months())}개월 확정 + 미마감 실시간 계산 · {elapsed:.3f}s")
+    if args.out:
+        report.to_excel(args.out, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+import streamlit as st
+
+import dashboard_cache
+
+_MONEY = st.column_config.NumberColumn(format="₩ %.0f")
+_COLUMNS = {'매출액': _MONEY, '매출원가': _MONEY, '매출이익': _MONEY,
+            '이익률': st.column_config.NumberColumn(format="%.1f%%")}
+
+
+def render_profit_ranking(state, sub_types, n=5):
+    """고객사 · 품목별 매출이익 상위/하위 (수익성 큐브 조회)"""
+    cube = dashboard_cache.profit_cube(state, sub_types)
+    months = cube.months()
+    if not months:
+        st.info("수익성을 집계할 매출 기록이 없습니다.")
+        return
+
+    st.subheader("💰 고객사 · 품목 수익성")
+    c1, c2 = st.columns([1, 2])
+    dimension = c1.radio("기준", ['고객사', '품목명'], horizontal=True, key="profit_dimension")
+    if len(months) > 1:
+        start, end = c2.select_slider("기간", options=months, value=(months[0], months[-1]), key="profit_period")
+    else:
+        start = end = months[0]
+        c2.caption(f"기간: {start}")
+
+    top, bottom = dashboard_cache.profit_ranking(dashboard_cache.ledger_token(state), cube, dimension, n, start, end)
+    top, bottom = (df.assign(이익률=df['이익률'] * 100) for df in (top, bottom))
+    left, right = st.columns(2)
+    with left:
+        st.caption(f"📈 매출이익 상위 {n}")
+        st.dataframe(top, use_container_width=True, hide_index=True, column_config=_COLUMNS)
+    with right:
+        st.caption(f"📉 매출이익 하위 {n}")
+        st.dataframe(bottom, use_container_width=True, hide_index=True, column_config=_COLUMNS)
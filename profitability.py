@@ -0,0 +1,145 @@
+"""
+고객사 수익성 큐브 (고객사 × 품목 × 월)
+
+고객사별 마진을 보려면 매출 이력(판매단가)과 원장(매출원가)을 맞춰야 하는데,
+볼 때마다 전체 테이블을 merge하지 않도록 출고가 반영될 때마다 집계 셀에 더해 둡니다.
+원장 레코드에는 판매단가(출고 행의 순수단가)와 FIFO 매출원가가 함께 있으므로 별도 조인이 필요 없습니다.
+
+- 셀: (고객사, 품목명, 연, 월) → (수량, 매출액, 매출원가)  ※ 매출이익 · 이익률은 화면용 표에서 계산
+- 고객사 × 월, 품목 × 월 롤업도 같은 시점에 함께 갱신하므로 상위/하위 순위는 셀 전체가 아니라 롤업만 훑습니다.
+- 대상: 출고 중 세부구분이 CRM 대상(ledger_engine.CRM_SUB_TYPES 등)인 행 — 매출 이력과 같은 기준
+- 셀 값은 튜플을 통째로 바꿔 넣으므로, 공유 원장 커밋 중에도 읽는 쪽은 잠금 없이 셀 단위로 일관된 값을 봅니다.
+- 롤업 크기는 판매 행 수가 아니라 (고객사 또는 품목 수) × 월 수라서 판매 행이 수백만이어도 순위 계산은 즉시 끝납니다.
+
+사용 예)
+    cube = ProfitCube.from_history(history, ("매출", "출고"))    # 기존 원장에서 1회 구축
+    cube.add_records(records, ("매출", "출고"))                  # 이후 반영분만 누적
+    cube.ranking('고객사', n=5)                                  # (상위, 하위) 매출이익 순위
+"""
+import pandas as pd
+
+DIMENSIONS = ('고객사', '품목명')
+KEY_COLUMNS = ['고객사', '품목명', '월']
+MEASURE_COLUMNS = ['수량', '매출액', '매출원가']
+CUBE_COLUMNS = KEY_COLUMNS + MEASURE_COLUMNS + ['매출이익', '이익률']
+
+
+class ProfitCube:
+    """고객사 × 품목 × 월 수익성 집계 (출고 반영 시 증분 갱신)"""
+
+    def __init__(self):
+        self.cells = {}
+        # 순위 조회용 롤업: (고객사 또는 품목명, 연, 월) → (수량, 매출액, 매출원가)
+        self.rollups = {dimension: {} for dimension in DIMENSIONS}
+        self.version = 0
+        self._frames = {}
+
+    # ==========================================
+    # [1. 증분 갱신]
+    # ==========================================
+    @staticmethod
+    def _add(table, key, qty, revenue, cogs):
+        cell = table.get(key)
+        if cell is None:
+            table[key] = (qty, revenue, cogs)
+        else:
+            table[key] = (cell[0] + qty, cell[1] + revenue, cell[2] + cogs)
+
+    def add_records(self, records, sub_types):
+        """원장 레코드(dict) 목록 중 판매 출고분을 누적"""
+        added = 0
+        by_customer, by_item = self.rollups['고객사'], self.rollups['품목명']
+        for record in records:
+            if record['구분'] != '출고' or record['세부구분'] not in sub_types:
+                continue
+            date, customer, item, qty = record['날짜'], record['고객사'], record['품목명'], record['수량']
+            revenue, cogs = qty * record['순수단가'], record['매출원가']
+            self._add(self.cells, (customer, item, date.year, date.month), qty, revenue, cogs)
+            self._add(by_customer, (customer, date.year, date.month), qty, revenue, cogs)
+            self._add(by_item, (item, date.year, date.month), qty, revenue, cogs)
+            added += 1
+        if added:
+            self.version += 1
+        return added
+
+    def _merge(self, table, grouped):
+        keys = zip(*(grouped[c].tolist() for c in grouped.columns[:-3]))
+        values = zip(grouped['수량'].tolist(), grouped['매출액'].tolist(), grouped['매출원가'].tolist())
+        if not table:
+            table.update(zip(keys, values))
+            return
+        for key, (qty, revenue, cogs) in zip(keys, values):
+            self._add(table, key, qty, revenue, cogs)
+
+    def add_frame(self, history, sub_types):
+        """원장 DataFrame의 판매 출고분을 한 번에 집계해 누적 (초기 구축 · 대량 적재용)"""
+        sales = history[(history['구분'] == '출고') & history['세부구분'].isin(sub_types)]
+        if sales.empty:
+            return 0
+        dates = pd.to_datetime(sales['날짜'])
+        qty = sales['수량'].to_numpy(dtype='float64')
+        lines = pd.DataFrame({
+            '고객사': sales['고객사'].astype(str).to_numpy(), '품목명': sales['품목명'].astype(str).to_numpy(),
+            '연': dates.dt.year.to_numpy(), '월': dates.dt.month.to_numpy(), '수량': qty,
+            '매출액': qty * sales['순수단가'].to_numpy(dtype='float64'),
+            '매출원가': sales['매출원가'].to_numpy(dtype='float64'),
+        })
+        cells = lines.groupby(['고객사', '품목명', '연', '월'], sort=False).sum().reset_index()
+        self._merge(self.cells, cells)
+        for dimension in DIMENSIONS:
+            self._merge(self.rollups[dimension],
+                        cells.drop(columns=[d for d in DIMENSIONS if d != dimension])
+                        .groupby([dimension, '연', '월'], sort=False).sum().reset_index())
+        self.version += 1
+        return len(sales)
+
+    @classmethod
+    def from_history(cls, history, sub_types):
+        cube = cls()
+        cube.add_frame(history, sub_types)
+        return cube
+
+    # ==========================================
+    # [2. 조회]
+    # ==========================================
+    def frame(self, dimension=None):
+        """
+        집계 표 (버전이 바뀔 때만 다시 만듦).
+        dimension 없음 → 고객사 × 품목 × 월 셀 전체, '고객사'/'품목명' → 해당 기준 × 월 롤업
+        """
+        version, frame = self._frames.get(dimension, (None, None))
+        if version == self.version:
+            return frame
+        table = self.cells if dimension is None else self.rollups[dimension]
+        keys = KEY_COLUMNS if dimension is None else [dimension, '월']
+        rows = [(*key[:-2], f"{key[-2]:04d}-{key[-1]:02d}", *value) for key, value in list(table.items())]
+        frame = _with_margin(pd.DataFrame(rows, columns=keys + MEASURE_COLUMNS))
+        self._frames[dimension] = (self.version, frame)
+        return frame
+
+    def months(self):
+        return sorted({f"{y:04d}-{m:02d}" for _, y, m in list(self.rollups['고객사'])})
+
+    def ranking(self, dimension, n=5, start=None, end=None):
+        """dimension(고객사/품목명)별 매출이익 (상위 n, 하위 n). start/end는 YYYY-MM (포함)"""
+        frame = self.frame(dimension)
+        if start is not None:
+            frame = frame[frame['월'] >= start]
+        if end is not None:
+            frame = frame[frame['월'] <= end]
+        totals = _with_margin(frame.groupby(dimension, sort=False)[MEASURE_COLUMNS].sum().reset_index())
+        totals = totals.sort_values('매출이익', ascending=False, kind='stable').reset_index(drop=True)
+        return totals.head(n), totals.tail(n).iloc[::-1].reset_index(drop=True)
+
+
+def _with_margin(frame):
+    frame['매출이익'] = frame['매출액'] - frame['매출원가']
+    frame['이익률'] = (frame['매출이익'] / frame['매출액'].where(frame['매출액'] != 0)).fillna(0.0)
+    return frame
+
+
+def record_sales(state, records, sub_types):
+    """state에 수익성 큐브가 있으면 반영한 원장 레코드를 누적 (원장 반영이 끝난 뒤 호출)"""
+    cube = state.get('profit_cube')
+    if cube is not None:
+        cube.add_records(records, sub_types)
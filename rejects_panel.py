@@ -0,0 +1,20 @@
+import streamlit as st
+
+import ingest
+
+
+def store_upload_rejects(rejects):
+    """반려 행과 다운로드용 엑셀을 세션에 보관 (화면이 다시 그려지거나 st.rerun 이후에도 내려받을 수 있게)"""
+    st.session_state.upload_rejects = rejects
+    st.session_state.upload_rejects_file = ingest.rejects_to_excel(rejects) if not rejects.empty else None
+
+
+def render_upload_rejects():
+    """마지막 업로드에서 검증에 실패한 행 (최대 100행 미리보기 + 반려 시트 다운로드)"""
+    rejects = st.session_state.get('upload_rejects')
+    if rejects is None or rejects.empty:
+        return
+    st.warning(f"⚠️ 검증에 실패하여 반영되지 않은 행 {len(rejects):,}건 — 반려 사유를 확인하고 수정 후 다시 업로드하세요.")
+    st.dataframe(rejects.head(100), use_container_width=True, hide_index=True)
+    st.download_button("📥 반려 행 다운로드 (Excel)", data=st.session_state.upload_rejects_file,
+                       file_name="upload_rejects.xlsx")
@@ -0,0 +1,228 @@
+"""
+발주 우선순위 힙 (재고 소진 예상 개월 수 기준)
+
+대시보드의 발주 경고(소진 예상 개월 < 리드타임)는 선택한 품목 1개만 계산하므로, 수천 개 품목 중
+무엇을 발주해야 하는지 보려면 품목을 하나씩 눌러 봐야 합니다.
+ReorderHeap은 입고/출고가 반영될 때마다 품목별 현재고 · 최근 3개월 판매량을 갱신하고,
+여유 개월(= 소진 예상 개월 - 품목별 기준 개월) 최소 힙으로 가장 급한 품목 N개를 바로 꺼냅니다.
+
+- 소진 예상 개월 = 현재고 / (최근 WINDOW_DAYS일 판매량 / WINDOW_MONTHS)  ※ dashboard_cache.item_metrics와 같은 기준
+  최근 판매가 없으면 무한대(발주 대상 아님)로 보고 목록에서 뺍니다.
+- 기준 개월(리드타임): 기본 DEFAULT_THRESHOLD, 품목별 값은 set_threshold() 또는
+  환경변수 SKU_REORDER_THRESHOLDS(품목명 · 기준개월 컬럼의 CSV/엑셀)로 지정
+- 힙 항목은 (여유 개월, 품목명, 버전). 여유 개월이 같으면 품목명 순
+- 힙 갱신은 지연 무효화: 값이 바뀐 품목은 새 항목을 넣고 이전 항목은 버전이 달라 무시됨
+  (무효 항목이 유효 항목보다 많아지면 힙을 다시 만듦)
+- 판매량 창: 창 안의 판매를 날짜 최소 힙 하나에 모아 두고 advance(now) 때 창을 벗어난 판매만 빼므로,
+  거래가 없는 품목도 시간이 지나면 판매량이 줄어 순위가 바뀝니다.
+- top(n)은 힙 배열을 루트부터 최선 우선으로 훑어 O(n log n)으로 상위 n개를 구하고 힙은 바꾸지 않습니다.
+- 공유 원장 커밋과 화면 조회가 겹칠 수 있으므로 공개 메서드는 내부 잠금을 잡습니다.
+
+사용 예)
+    heap = ReorderHeap.from_state(history, queues, now)
+    heap.apply_records(records)            # 원장 반영 후
+    heap.advance(pd.Timestamp.now())
+    heap.top(20)                           # 가장 급한 20개 품목 표
+"""
+import heapq
+import itertools
+import math
+import os
+import threading
+
+import pandas as pd
+
+DEFAULT_THRESHOLD = 2.0
+WINDOW_DAYS = 90
+WINDOW_MONTHS = 3
+THRESHOLDS_PATH = os.environ.get('SKU_REORDER_THRESHOLDS', '')
+
+TOP_COLUMNS = ['품목명', '현재고', '3개월평균', '소진예상개월', '기준개월', '여유개월', '상태']
+
+
+def load_thresholds(path=THRESHOLDS_PATH):
+    """품목별 기준 개월 {품목명: 개월} (파일이 없으면 빈 dict)"""
+    if not path or not os.path.exists(path):
+        return {}
+    df = pd.read_csv(path) if path.endswith('.csv') else pd.read_excel(path)
+    return dict(zip(df['품목명'].astype(str), df['기준개월'].astype(float)))
+
+
+def status_label(cover, threshold):
+    """대시보드 발주 판단과 같은 3단계 (기준 미만 경고, 기준 + 1개월 미만 관찰)"""
+    if cover < threshold:
+        return "발주 경고"
+    if cover < threshold + 1:
+        return "관찰 필요"
+    return "안정권"
+
+
+class ReorderHeap:
+    """품목별 여유 개월 최소 힙 (입고/출고 · 시간 경과 시 증분 갱신)"""
+
+    def __init__(self, thresholds=None, default_threshold=DEFAULT_THRESHOLD, window_days=WINDOW_DAYS):
+        self.stock = {}
+        self.demand = {}
+        self.thresholds = dict(thresholds if thresholds is not None else load_thresholds())
+        self.default_threshold = default_threshold
+        self.window = pd.Timedelta(days=window_days)
+        self.now = None
+        self.heap = []
+        self.current = {}
+        self.sales = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    # ==========================================
+    # [1. 우선순위 계산 · 힙 항목 관리]
+    # ==========================================
+    def threshold(self, item):
+        return self.thresholds.get(item, self.default_threshold)
+
+    def cover(self, item):
+        monthly = self.demand.get(item, 0) / WINDOW_MONTHS
+        return self.stock.get(item, 0) / monthly if monthly > 0 else math.inf
+
+    def _push(self, item):
+        seq = next(self._seq)
+        self.current[item] = seq
+        heapq.heappush(self.heap, (self.cover(item) - self.threshold(item), item, seq))
+        if len(self.heap) > 2 * len(self.current) + 64:
+            self._rebuild()
+
+    def _rebuild(self):
+        """무효 항목을 버리고 현재 항목만으로 힙 재구성 (O(n))"""
+        self.heap = [entry for entry in self.heap if self.current.get(entry[1]) == entry[2]]
+        heapq.heapify(self.heap)
+
+    def _cutoff(self):
+        """판매량 창 시작 시각 (판매 힙은 비교가 빠른 int64 ns로 보관)"""
+        return None if self.now is None else (self.now - self.window).value
+
+    def _add_sale(self, item, date, qty):
+        stamp, cutoff = pd.Timestamp(date).value, self._cutoff()
+        if cutoff is not None and stamp < cutoff:
+            return
+        self.demand[item] = self.demand.get(item, 0) + qty
+        heapq.heappush(self.sales, (stamp, next(self._seq), item, qty))
+
+    # ==========================================
+    # [2. 갱신 (원장 반영 · 시간 경과)]
+    # ==========================================
+    def receive(self, item, qty, date=None):
+        with self._lock:
+            self.stock[item] = self.stock.get(item, 0) + qty
+            self._push(item)
+
+    def issue(self, item, qty, date):
+        """출고: 재고는 FIFO 큐처럼 0 밑으로 내려가지 않고, 판매량은 요청 수량 전체를 반영"""
+        with self._lock:
+            self.stock[item] = max(self.stock.get(item, 0) - qty, 0)
+            self._add_sale(item, date, qty)
+            self._push(item)
+
+    def apply_records(self, records):
+        """원장 레코드(dict) 목록 반영 (ledger_engine 레코드 · 레거시 레코드 공용)"""
+        with self._lock:
+            touched = set()
+            for record in records:
+                item, qty = record['품목명'], record['수량']
+                if record['구분'] == '입고':
+                    self.stock[item] = self.stock.get(item, 0) + qty
+                elif record['구분'] == '출고':
+                    self.stock[item] = max(self.stock.get(item, 0) - qty, 0)
+                    self._add_sale(item, record['날짜'], qty)
+                else:
+                    continue
+                touched.add(item)
+            for item in touched:
+                self._push(item)
+
+    def set_threshold(self, item, months):
+        with self._lock:
+            self.thresholds[item] = months
+            if item in self.current:
+                self._push(item)
+
+    def advance(self, now):
+        """기준 시각을 now로 옮기고 판매량 창을 벗어난 판매를 뺌 (시간은 앞으로만 감)"""
+        with self._lock:
+            if self.now is not None and now <= self.now:
+                return
+            self.now = pd.Timestamp(now)
+            cutoff = self._cutoff()
+            touched = set()
+            while self.sales and self.sales[0][0] < cutoff:
+                _, _, item, qty = heapq.heappop(self.sales)
+                self.demand[item] -= qty
+                touched.add(item)
+            for item in touched:
+                if self.demand[item] <= 0:
+                    del self.demand[item]
+                self._push(item)
+
+    # ==========================================
+    # [3. 조회]
+    # ==========================================
+    def top(self, n, alerts_only=False):
+        """가장 급한 n개 품목 표 (최근 판매가 있는 품목만). alerts_only면 기준 미만(발주 경고)만"""
+        rows = []
+        with self._lock:
+            heap, current = self.heap, self.current
+            frontier = [(heap[0], 0)] if heap else []
+            while frontier and len(rows) < n:
+                (slack, item, seq), index = heapq.heappop(frontier)
+                if math.isinf(slack) or (alerts_only and slack >= 0):
+                    break
+                if current.get(item) == seq:
+                    cover, threshold = slack + self.threshold(item), self.threshold(item)
+                    rows.append((item, self.stock.get(item, 0), self.demand.get(item, 0) / WINDOW_MONTHS,
+                                 cover, threshold, slack, status_label(cover, threshold)))
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+        return pd.DataFrame(rows, columns=TOP_COLUMNS)
+
+    def alert_count(self):
+        with self._lock:
+            return sum(1 for item in self.current if self.cover(item) < self.threshold(item))
+
+    # ==========================================
+    # [4. 구축 (기존 원장 · 큐)]
+    # ==========================================
+    @classmethod
+    def from_state(cls, history, queues=None, now=None, stock=None, **kwargs):
+        """
+        현재 원장으로 1회 구축. 현재고는 FIFO 큐(queues) 또는 품목명 · 현재고 표(stock, 뷰어 스냅샷)에서 가져옴
+        """
+        heap = cls(**kwargs)
+        heap.now = None if now is None else pd.Timestamp(now)
+        if queues is not None:
+            heap.stock = {item: sum(b['qty'] for b in queue) for item, queue in queues.items()}
+        elif stock is not None:
+            heap.stock = dict(zip(stock['품목명'], stock['현재고']))
+
+        sales = history[history['구분'] == '출고']
+        stamps = pd.to_datetime(sales['날짜']).to_numpy(dtype='datetime64[ns]').astype('int64')
+        cutoff = heap._cutoff()
+        if cutoff is not None:
+            sales, stamps = sales[stamps >= cutoff], stamps[stamps >= cutoff]
+        items = sales['품목명'].astype(str).tolist()
+        heap.sales = list(zip(stamps.tolist(), range(len(items)), items, sales['수량'].tolist()))
+        heapq.heapify(heap.sales)
+        heap._seq = itertools.count(len(items))
+        heap.demand = sales.groupby(sales['품목명'].astype(str))['수량'].sum().to_dict()
+
+        for item in set(heap.stock) | set(heap.demand):
+            seq = next(heap._seq)
+            heap.current[item] = seq
+            heap.heap.append((heap.cover(item) - heap.threshold(item), item, seq))
+        heapq.heapify(heap.heap)
+        return heap
+
+
+def record_movements(state, records):
+    """state에 발주 힙이 있으면 반영한 원장 레코드로 현재고 · 판매량 갱신 (원장 반영이 끝난 뒤 호출)"""
+    heap = state.get('reorder_heap')
+    if heap is not None:
+        heap.apply_records(records)
@@ -0,0 +1,21 @@
+import streamlit as st
+
+
+def render_reorder_alerts(heap, n=20):
+    """전 품목 발주 우선순위 (소진 예상 개월 - 기준 개월이 작은 순, 발주 힙 조회)"""
+    st.subheader("🚨 발주 우선순위 (전 품목)")
+    c1, c2 = st.columns([1, 3])
+    n = c1.number_input("표시 품목 수", min_value=5, max_value=500, value=n, step=5, key="reorder_top_n")
+    alerts_only = c2.toggle("발주 경고 품목만", key="reorder_alerts_only")
+
+    top = heap.top(int(n), alerts_only)
+    if top.empty:
+        st.info("발주 경고 품목이 없습니다." if alerts_only else "최근 3개월 판매 기록이 있는 품목이 없습니다.")
+        return
+    st.dataframe(top, use_container_width=True, hide_index=True, column_config={
+        '현재고': st.column_config.NumberColumn(format="%d 개"),
+        '3개월평균': st.column_config.NumberColumn("3개월 월평균", format="%.1f 개"),
+        '소진예상개월': st.column_config.NumberColumn("재고 소진 예상", format="%.1f 개월"),
+        '기준개월': st.column_config.NumberColumn("리드타임 기준", format="%.1f 개월"),
+        '여유개월': st.column_config.NumberColumn("여유", format="%.1f 개월"),
+    })
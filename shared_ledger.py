@@ -0,0 +1,242 @@
+"""
+세션 간 공유 원장 (품목 단위 동시성 제어)
+
+여러 사용자가 한 원장에 동시에 입고/출고를 반영할 때, 전역 잠금 하나로 직렬화하면
+10만 행 업로드가 끝날 때까지 모든 실무자의 수동 입력이 기다려야 합니다.
+SharedLedger는 품목별 큐 버전으로 낙관적 동시성 제어를 합니다.
+
+1) 계산: 묶음이 건드리는 품목 큐를 복사해 FIFO 루프를 돌리고, 소진 원장 기록은 LedgerRecorder에 모아 둠
+   (공유 상태는 읽기만 하므로 품목이 다른 작성자끼리 겹쳐서 진행)
+2) 커밋: 짧은 커밋 잠금 안에서 품목 버전이 계산 시작 때와 같은지 확인 →
+   같으면 소진 원장 재생 · 큐 교체 · 테이블 교체 후 버전 증가, 다르면(충돌) 처음부터 다시 계산
+   history / crm_history에 이번 묶음을 붙인 새 테이블(O(원장 크기))은 잠금 밖에서 미리 만들고,
+   그 사이 다른 커밋이 테이블을 바꿨으면 잠금을 놓고 다시 만듦 (RESTAGE_RETRIES번 뒤에는 잠금 안에서)
+3) 재시도를 다 쓰거나 큰 묶음(PESSIMISTIC_ROWS 이상)은 품목 잠금을 먼저 잡고 계산 (재계산 낭비 · 기아 방지)
+   품목 잠금은 이름순으로 잡아 교착이 생기지 않습니다.
+
+공유 상태(큐 dict · 테이블)는 커밋 때 통째로 교체하므로 읽기 쪽(대시보드)은 잠금 없이 일관된 스냅샷을 봅니다.
+
+앱(steamlit_main.py)은 환경변수 SKU_SHARED_LEDGER=1일 때 세션별 원장 대신 이 공유 원장을 씁니다.
+
+사용 예)
+    shared = SharedLedger()
+    audit_entries = shared.post(batch)      # batch: ingest.TRANSACTION_COLUMNS 컬럼, 날짜순
+"""
+import os
+import threading
+from collections import deque
+
+import ledger_engine
+import ledger_schema
+import perf_trace
+import profitability
+import reorder_heap
+from consumption_ledger import ConsumptionLedger
+from profitability import ProfitCube
+from reorder_heap import ReorderHeap
+
+ENABLED = os.environ.get('SKU_SHARED_LEDGER', '') == '1'
+MAX_RETRIES = 3
+PESSIMISTIC_ROWS = 1000
+# 미리 만든 테이블이 다른 커밋 때문에 낡았을 때 잠금 밖에서 다시 만들어 볼 횟수 (다 쓰면 잠금 안에서 다시 만듦)
+RESTAGE_RETRIES = 1
+
+
+def new_state():
+    return {'inventory_queues': {}, 'consumption': ConsumptionLedger(),
+            'history': ledger_schema.empty_history(), 'crm_history': ledger_schema.empty_crm(),
+            'profit_cube': ProfitCube(), 'reorder_heap': ReorderHeap()}
+
+
+# ==========================================
+# [1. 소진 원장 기록 지연 (계산 단계)]
+# ==========================================
+class LedgerRecorder:
+    """
+    ConsumptionLedger와 같은 쓰기 메서드를 가진 기록기. 계산 단계에서는 공유 원장을 건드리지 않고
+    호출 순서만 모아 두었다가 커밋 때 replay()로 한 번에 반영합니다.
+    새 로트 · 출고 ID는 임시로 음수를 돌려주고, replay()가 실제 ID로 바꿉니다.
+    """
+
+    def __init__(self):
+        self.ops = []
+        self.lots = 0
+        self.sales = 0
+
+    def add_lot(self, item, date, qty, unit_cost):
+        self.lots += 1
+        self.ops.append(('add_lot', -self.lots, (item, date, qty, unit_cost)))
+        return -self.lots
+
+    def extend_lot(self, lot, qty, unit_cost):
+        self.ops.append(('extend_lot', None, (lot, qty, unit_cost)))
+
+    def open_sale(self, item, date, qty, ref=None):
+        self.sales += 1
+        self.ops.append(('open_sale', -self.sales, (item, date, qty, ref)))
+        return -self.sales
+
+    def consume(self, sale, lot, qty, unit_cost):
+        self.ops.append(('consume', None, (sale, lot, qty, unit_cost)))
+
+    def replay(self, ledger):
+        """기록한 호출을 ledger에 순서대로 반영. 반환: (임시 로트 ID → 실제 ID, 임시 출고 ID → 실제 ID)"""
+        lot_ids, sale_ids = {}, {}
+        for op, temp_id, args in self.ops:
+            if op == 'add_lot':
+                lot_ids[temp_id] = ledger.add_lot(*args)
+            elif op == 'extend_lot':
+                lot, qty, unit_cost = args
+                ledger.extend_lot(lot_ids.get(lot, lot), qty, unit_cost)
+            elif op == 'open_sale':
+                sale_ids[temp_id] = ledger.open_sale(*args)
+            else:
+                sale, lot, qty, unit_cost = args
+                ledger.consume(sale_ids.get(sale, sale), lot_ids.get(lot, lot), qty, unit_cost)
+        return lot_ids, sale_ids
+
+
+# ==========================================
+# [2. 공유 원장]
+# ==========================================
+class SharedLedger:
+    """프로세스 안의 모든 세션이 함께 쓰는 원장. state는 ledger_engine과 같은 키의 dict"""
+
+    def __init__(self, state=None, journal=False):
+        self.state = state if state is not None else new_state()
+        self.versions = {}
+        self.reserved = set()
+        self.commit_lock = threading.Lock()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.stats = {'commits': 0, 'conflicts': 0, 'pessimistic': 0, 'restaged': 0, 'restaged_locked': 0}
+        # journal=True면 커밋 순서대로 묶음을 남김 (직렬 재생 검증용)
+        self.journal = [] if journal else None
+
+    def view(self):
+        """커밋 사이의 일관된 원장 참조 (테이블 · 큐 dict는 커밋 때 통째로 교체되므로 참조만 잡으면 됨)"""
+        with self.commit_lock:
+            return {key: self.state[key] for key in ('history', 'crm_history', 'inventory_queues', 'consumption')}
+
+    def _item_lock(self, item):
+        with self._locks_guard:
+            return self._locks.setdefault(item, threading.Lock())
+
+    def _copy_queues(self, items):
+        queues = self.state['inventory_queues']
+        return {item: deque(dict(batch) for batch in queues[item]) for item in items if item in queues}
+
+    def post(self, batch, crm_sub_types=ledger_engine.CRM_SUB_TYPES, compaction=None, session=None,
+             max_retries=None, store=None):
+        """
+        ledger_engine.post_transactions와 같은 반영을 공유 원장에 수행. 반환: 감사로그 [(구분, 상세), ...]
+        session: 마지막 출고의 FIFO 상세(latest_fifo_detail / latest_batch_status)를 넣을 세션 dict
+        """
+        if batch.empty:
+            return []
+        audit_entries, records = self._post(batch, crm_sub_types, compaction, session, max_retries)
+        if store is not None:
+            # 파일 기록은 커밋 잠금 밖에서
+            with perf_trace.stage("store_append", rows=len(records)):
+                store.append(ledger_schema.append_rows(ledger_schema.empty_history(), records))
+        return audit_entries
+
+    def _post(self, batch, crm_sub_types, compaction, session, max_retries):
+        items = sorted(set(batch['품목명']))
+        if max_retries is None:
+            max_retries = 0 if len(batch) >= PESSIMISTIC_ROWS else MAX_RETRIES
+
+        for _ in range(max_retries):
+            seen = {item: self.versions.get(item, 0) for item in items}
+            result = self._compute(batch, items, crm_sub_types, compaction)
+            committed = self._try_commit(batch, items, result, seen, crm_sub_types, session)
+            if committed is not None:
+                return committed
+
+        # 비관적 경로: 품목 잠금(이름순)을 잡고 예약하면 다른 작성자는 이 품목들을 커밋하지 못함
+        locks = [self._item_lock(item) for item in items]
+        for lock in locks:
+            lock.acquire()
+        try:
+            with self.commit_lock:
+                self.reserved.update(items)
+                self.stats['pessimistic'] += 1
+            result = self._compute(batch, items, crm_sub_types, compaction)
+            return self._try_commit(batch, items, result, None, crm_sub_types, session)
+        finally:
+            with self.commit_lock:
+                self.reserved.difference_update(items)
+            for lock in reversed(locks):
+                lock.release()
+
+    def _compute(self, batch, items, crm_sub_types, compaction):
+        queues = self._copy_queues(items)
+        recorder = LedgerRecorder()
+        records, crm_rows, audit_entries, last_sale = ledger_engine.fifo_pass(queues, recorder, batch, crm_sub_types,
+                                                                              compaction)
+        return queues, recorder, records, crm_rows, audit_entries, last_sale
+
+    def _stage(self, result):
+        """잠금 밖에서 현재 테이블에 이번 묶음을 붙인 (기준 테이블, (crm_history, history))"""
+        records, crm_rows = result[2], result[3]
+        base = {'history': self.state['history'], 'crm_history': self.state['crm_history']}
+        return base, ledger_engine.staged_tables(base, records, crm_rows)
+
+    def _try_commit(self, batch, items, result, seen, crm_sub_types, session):
+        """
+        잠금 밖에서 테이블을 만들고 커밋. seen(계산 시작 때 품목 버전)과 달라졌으면 충돌로 None 반환
+        (seen이 None이면 품목을 예약한 비관적 경로). 테이블만 낡았으면 잠금을 놓고 다시 만듦
+        """
+        for attempt in range(RESTAGE_RETRIES + 1):
+            staged = self._stage(result)
+            with self.commit_lock:
+                if seen is not None and not (self.reserved.isdisjoint(items)
+                                             and all(self.versions.get(i, 0) == v for i, v in seen.items())):
+                    self.stats['conflicts'] += 1
+                    return None
+                base = staged[0]
+                fresh = base['history'] is self.state['history'] and base['crm_history'] is self.state['crm_history']
+                if fresh or attempt == RESTAGE_RETRIES:
+                    return self._commit(batch, items, result, staged, crm_sub_types, session)
+                self.stats['restaged'] += 1
+
+    def _commit(self, batch, items, result, staged, crm_sub_types, session):
+        """커밋 잠금 안에서 호출. 실패하면 소진 원장을 되돌리고 공유 상태는 바꾸지 않음. 반환: (감사로그, 원장 레코드)"""
+        queues, recorder, records, crm_rows, audit_entries, last_sale = result
+        state = self.state
+        base, tables = staged
+        ledger = state['consumption']
+        mark = ledger.mark()
+        try:
+            with perf_trace.stage("shared_commit", rows=len(records)):
+                lot_ids, sale_ids = recorder.replay(ledger)
+                for queue in queues.values():
+                    for lot in queue:
+                        if lot['lot'] < 0:
+                            lot['lot'] = lot_ids[lot['lot']]
+                if base['history'] is not state['history'] or base['crm_history'] is not state['crm_history']:
+                    # 다시 만들어도 계속 다른 커밋에 밀린 경우 → 잠금 안에서 최신 테이블 기준으로
+                    self.stats['restaged_locked'] += 1
+                    tables = ledger_engine.staged_tables(state, records, crm_rows)
+                crm_history, history = tables
+        except Exception:
+            ledger.truncate(mark)
+            raise
+
+        # 큐 dict도 새로 만들어 교체 (읽는 쪽이 순회 중인 dict를 바꾸지 않음) → 큐를 먼저, 버전은 나중에
+        state['inventory_queues'] = {**state['inventory_queues'], **queues}
+        state['crm_history'], state['history'] = crm_history, history
+        profitability.record_sales(state, records, crm_sub_types)
+        reorder_heap.record_movements(state, records)
+        for item in items:
+            self.versions[item] = self.versions.get(item, 0) + 1
+        ledger_engine.bump_version(state)
+        self.stats['commits'] += 1
+        if self.journal is not None:
+            self.journal.append(batch)
+
+        if session is not None and last_sale is not None:
+            sale = sale_ids[last_sale]
+            session['latest_fifo_detail'] = ledger.breakdown(sale)
+            session['latest_batch_status'] = ledger.lot_status(sale)
+        return audit_entries, records
@@ -1,15 +1,34 @@
 import streamlit as st
 import pandas as pd
-from collections import deque
 from datetime import datetime
 import hashlib
 import os
-import tempfile
-
-# 💡 AI 기능 (Upstage & Pydantic)
-from pydantic import BaseModel, Field
-from typing import List
-from langchain_upstage import UpstageDocumentParseLoader, ChatUpstage
+import uuid
+
+import dashboard_cache
+import chunked_ingest
+import ingest
+import landed_cost
+from consumption_ledger import ConsumptionLedger
+import ledger_engine
+import ledger_schema
+import ledger_service
+import ledger_snapshot
+import ledger_store
+import pdf_batch
+import perf_trace
+import profitability
+import reorder_heap
+import shared_ledger
+from aging_panel import render_aging_report
+from ingest_panel import render_cancelled_notice, render_stale_checkpoint, run_chunked_post
+from perf_panel import render_perf_page
+from profit_panel import render_profit_ranking
+from profitability import ProfitCube
+from reorder_heap import ReorderHeap
+from rejects_panel import render_upload_rejects, store_upload_rejects
+from reorder_panel import render_reorder_alerts
+from trace_panel import render_lot_trace
 
 # ==========================================
 # [1. 환경 설정 및 API 키]
@@ -22,24 +41,22 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# ⚠️ 여기에 실제 발급받은 Upstage API 키를 입력하세요.
-os.environ["UPSTAGE_API_KEY"] = ""
+# ⚠️ 여기에 실제 발급받은 Upstage API 키를 입력하세요. (환경변수로 지정한 키가 있으면 그 값을 사용)
+os.environ.setdefault("UPSTAGE_API_KEY", "")
+# 사내 프록시 · 로컬 스텁 서버(upstage_stub.py) 사용 시: UPSTAGE_BASE_URL=http://127.0.0.1:8765/v1
 
 
 # ==========================================
-# [2. AI 데이터 구조 스키마 (Pydantic)]
+# [2. AI 파이프라인 (지연 로딩)]
 # ==========================================
-class ImportItem(BaseModel):
-    품목명: str = Field(description="수입된 물품의 정확한 이름")
-    수량: int = Field(description="수입된 물품의 총 수량 (숫자만)")
-    순수단가: float = Field(description="물품 1개당 순수 단가 (원화 환산 기준, 숫자만)")
-
-
-class ImportDocument(BaseModel):
-    수입일자: str = Field(description="YYYY-MM-DD 형식의 수입/통관 일자")
-    거래처: str = Field(description="수출자, 제조사 또는 거래처 이름")
-    총통관물류비: int = Field(description="관세, 부가세, 운송비, 하역비 등 발생한 모든 제비용의 합계 (원화, 숫자만)")
-    품목목록: List[ImportItem] = Field(description="수입된 품목들의 배열")
+def load_ai_pipeline():
+    """
+    💡 AI 기능 (Upstage & Pydantic)은 ai_pipeline.py에 분리되어 있습니다.
+    langchain_upstage import 비용(약 2초)을 로그인 화면 등 다른 화면이 내지 않도록 AI 분석 실행 시점에 로드합니다.
+    """
+    with perf_trace.stage("import_ai_pipeline"):
+        import ai_pipeline
+    return ai_pipeline
 
 
 # ==========================================
@@ -51,14 +68,35 @@ def generate_row_hash(row):
     return hashlib.md5(payload.encode()).hexdigest()
 
 
+def manual_entry_hashes(hashes):
+    """
+    수동 입력 행 해시. 적재 서비스는 원장에 이미 있는 해시를 중복으로 건너뛰므로, 같은 내용을 두 번 입력해도
+    세션 원장처럼 2건 모두 반영되도록 서비스 모드에서는 입력마다 고유 접미사를 붙임
+    """
+    if not ledger_service.SERVICE_URL:
+        return hashes
+    return hashes.map(lambda h: f"{h}-{uuid.uuid4().hex[:8]}")
+
+
 def write_audit_log(action, details):
     """위변조 불가능한 전산 감사 로그 (Paper Trail) 기록"""
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    user = st.session_state.get('current_user', 'System')
-    log_entry = {'시간': now, '작업자': user, '접속IP': "192.168.1.10", '수행작업': action, '상세내용': details}
-    if 'audit_logs' not in st.session_state:
-        st.session_state.audit_logs = pd.DataFrame(columns=['시간', '작업자', '접속IP', '수행작업', '상세내용'])
-    st.session_state.audit_logs = pd.concat([st.session_state.audit_logs, pd.DataFrame([log_entry])], ignore_index=True)
+    write_audit_logs([(action, details)])
+
+
+def write_audit_logs(entries):
+    """감사 로그 여러 건을 한 번에 기록 (일괄 적재 시 거래별 로그를 concat 1회로 추가)"""
+    if not entries:
+        # 빈 묶음(중복만 있던 덩어리 등)은 빈 DataFrame concat을 하지 않음
+        return
+    with perf_trace.stage("write_audit_log", rows=len(entries)):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        user = st.session_state.get('current_user', 'System')
+        log_entries = [{'시간': now, '작업자': user, '접속IP': "192.168.1.10", '수행작업': action, '상세내용': details}
+                       for action, details in entries]
+        if 'audit_logs' not in st.session_state:
+            st.session_state.audit_logs = pd.DataFrame(columns=['시간', '작업자', '접속IP', '수행작업', '상세내용'])
+        st.session_state.audit_logs = pd.concat([st.session_state.audit_logs, pd.DataFrame(log_entries)],
+                                                ignore_index=True)
 
 
 def initialize_state():
@@ -67,14 +105,18 @@ def initialize_state():
 
     # 융합된 메인 데이터베이스 스키마
     if 'history' not in st.session_state:
-        st.session_state.history = pd.DataFrame(columns=[
-            '날짜', '고객사', '품목명', '구분', '세부구분', '수량', '순수단가', '통관물류비', '최종매입원가', '매출원가', '상태', '비고', 'hash'
-        ])
+        st.session_state.history = ledger_schema.empty_history()
     if 'crm_history' not in st.session_state:
-        st.session_state.crm_history = pd.DataFrame(columns=['날짜', '고객사', '품목명', '판매단가', '비고'])
+        st.session_state.crm_history = ledger_schema.empty_crm()
+    # 수익성 큐브 · 발주 힙 (뷰어 세션은 스냅샷 원장에서 구축한 공유본 사용)
+    if 'profit_cube' not in st.session_state and 'snapshot_stock' not in st.session_state:
+        st.session_state.profit_cube = ProfitCube()
+    if 'reorder_heap' not in st.session_state and 'snapshot_stock' not in st.session_state:
+        st.session_state.reorder_heap = ReorderHeap()
 
     # FIFO 큐 및 뷰어
     if 'inventory_queues' not in st.session_state: st.session_state.inventory_queues = {}
+    if 'consumption' not in st.session_state: st.session_state.consumption = ConsumptionLedger()
     if 'latest_fifo_detail' not in st.session_state: st.session_state.latest_fifo_detail = pd.DataFrame()
     if 'latest_batch_status' not in st.session_state: st.session_state.latest_batch_status = pd.DataFrame()
 
@@ -84,77 +126,100 @@ def initialize_state():
 # ==========================================
 def process_secure_transaction(date, item, action, sub_type, qty, customer="본사", base_price=0, customs_logistics_fee=0,
                                sale_price=0, row_hash=None):
-    date = pd.to_datetime(date)
+    date = ingest.normalize_date(date)
 
-    if not row_hash:
+    manual = not row_hash
+    if manual:
         row_hash = generate_row_hash({'날짜': date, '고객사': customer, '품목명': item, '수량': qty, '구분': action})
 
-    if item not in st.session_state.inventory_queues:
-        st.session_state.inventory_queues[item] = deque()
-
-    new_record = {
-        '날짜': date, '고객사': customer, '품목명': item, '구분': action, '세부구분': sub_type,
-        '수량': qty, '순수단가': 0, '통관물류비': 0, '최종매입원가': 0, '매출원가': 0, '상태': '정상', '비고': '', 'hash': row_hash
-    }
-    audit_details = f"[{action}] 품목:{item} | 수량:{qty}개 | "
-
-    if action == "입고":
-        # 제비용 N빵 분배
-        unit_extra = customs_logistics_fee / qty if qty > 0 else 0
-        final_unit_cost = base_price + unit_extra
-
-        st.session_state.inventory_queues[item].append({'date': date, 'qty': qty, 'price': final_unit_cost})
-
-        new_record.update({'순수단가': base_price, '통관물류비': customs_logistics_fee, '최종매입원가': final_unit_cost,
-                           '비고': f"[{sub_type}] 제비용 분배완료"})
-        audit_details += f"최종매입원가:{final_unit_cost:,.0f}원"
-
-    elif action == "출고":
-        remaining = qty
-        total_cogs = 0
-        fifo_breakdown = []
-        batch_status = []
-        queue = st.session_state.inventory_queues[item]
-
-        while remaining > 0 and queue:
-            batch = queue[0]
-            batch_date_str = batch['date'].strftime('%Y-%m-%d')
-
-            if batch['qty'] <= remaining:
-                use_qty = batch['qty']
-                cost = use_qty * batch['price']
-                total_cogs += cost
-                remaining -= use_qty
-                fifo_breakdown.append({'입고일': batch_date_str, '차감수량': use_qty, '적용원가': batch['price'], '합계': cost})
-                batch_status.append({'입고일': batch_date_str, '잔량': 0})
-                queue.popleft()
-            else:
-                use_qty = remaining
-                cost = use_qty * batch['price']
-                total_cogs += cost
-                batch['qty'] -= use_qty
-                remaining = 0
-                fifo_breakdown.append({'입고일': batch_date_str, '차감수량': use_qty, '적용원가': batch['price'], '합계': cost})
-                batch_status.append({'입고일': batch_date_str, '잔량': batch['qty']})
+    if shared_ledger.ENABLED or ledger_service.SERVICE_URL:
+        # 공유 원장 · 적재 서비스는 1건도 묶음 반영 경로(품목 단위 동시성 제어 / 서비스 쓰기 큐)로 처리
+        batch = pd.DataFrame([{
+            '날짜': date, '고객사': customer, '품목명': item, '구분': action, '세부구분': sub_type, '수량': qty,
+            '순수단가': base_price, '통관물류비': customs_logistics_fee, '판매단가': sale_price, 'hash': row_hash}])
+        if manual:
+            batch['hash'] = manual_entry_hashes(batch['hash'])
+        audit_entries = post_batch(batch)
+        if not audit_entries:
+            # 서비스가 원장에 이미 있는 행(같은 해시)으로 보고 건너뜀
+            write_audit_log(f"트랜잭션({action}) 중복 건너뜀", f"[{action}] 품목:{item} | 수량:{qty}개 | 해시:{row_hash}")
+            return
+        write_audit_log(f"트랜잭션({action})", audit_entries[0][1])
+        return
 
-        new_record.update({'순수단가': sale_price, '매출원가': total_cogs,
-                           '비고': f"[{sub_type}] 정상출고" if remaining == 0 else f"재고부족({remaining}개)"})
+    with perf_trace.stage("fifo_loop", rows=1):
+        new_record, sale, audit_details = ledger_engine.apply_transaction(
+            st.session_state.inventory_queues, st.session_state.consumption, date, item, action, sub_type, qty, customer, base_price,
+            customs_logistics_fee, sale_price, row_hash
+        )
 
+    if action == "출고":
         # CRM 이력 적재
-        if sub_type in ["매출", "출고"]:
-            st.session_state.crm_history = pd.concat([
-                st.session_state.crm_history,
-                pd.DataFrame([{'날짜': date, '고객사': customer, '품목명': item, '판매단가': sale_price, '비고': '정상판매'}])
-            ], ignore_index=True)
+        if sub_type in ledger_engine.CRM_SUB_TYPES:
+            with perf_trace.stage("crm_concat", rows=1):
+                st.session_state.crm_history = ledger_schema.append_rows(
+                    st.session_state.crm_history,
+                    [{'날짜': date, '고객사': customer, '품목명': item, '판매단가': sale_price, '비고': '정상판매'}]
+                )
+
+        st.session_state.latest_fifo_detail = st.session_state.consumption.breakdown(sale)
+        st.session_state.latest_batch_status = st.session_state.consumption.lot_status(sale)
+
+    with perf_trace.stage("history_concat_sort", rows=1):
+        st.session_state.history = ledger_schema.append_rows(st.session_state.history, [new_record])
+        st.session_state.history = st.session_state.history.sort_values(by='날짜', kind='stable').reset_index(drop=True)
+    profitability.record_sales(st.session_state, [new_record], ledger_engine.CRM_SUB_TYPES)
+    reorder_heap.record_movements(st.session_state, [new_record])
+    ledger_engine.bump_version(st.session_state)
 
-        st.session_state.latest_fifo_detail = pd.DataFrame(fifo_breakdown)
-        st.session_state.latest_batch_status = pd.DataFrame(batch_status)
-        audit_details += f"고객사:{customer} | 매출원가:{total_cogs:,.0f}원"
+    write_audit_log(f"트랜잭션({action})", audit_details)
 
-    st.session_state.history = pd.concat([st.session_state.history, pd.DataFrame([new_record])], ignore_index=True)
-    st.session_state.history = st.session_state.history.sort_values(by='날짜').reset_index(drop=True)
 
-    write_audit_log(f"트랜잭션({action})", audit_details)
+def post_batch(batch):
+    """
+    날짜순 거래 묶음 반영. 공유 원장 모드면 SharedLedger(품목 단위 동시성 제어)를 거쳐 반영,
+    적재 서비스 모드(SKU_LEDGER_SERVICE)면 서비스로 보내 반영을 기다린 뒤 게시된 스냅샷을 다시 연결
+    """
+    if ledger_service.SERVICE_URL:
+        result = ledger_service.submit_remote(ledger_service.SERVICE_URL, batch, audit=True,
+                                              source=st.session_state.current_user)
+        attach_viewer_snapshot()
+        return [tuple(entry) for entry in result['audit']]
+    if not shared_ledger.ENABLED:
+        # 세션별 원장은 저장소(ledger_store)에 기록하지 않음 (세션마다 내용이 달라 한 저장소에 모을 수 없음)
+        return ledger_engine.post_transactions(st.session_state, batch)
+    audit_entries = get_shared_ledger().post(batch, session=st.session_state, store=ledger_store.default_store())
+    attach_shared_ledger()
+    return audit_entries
+
+
+def per_session_ledger():
+    """세션별 원장 모드 여부 (공유 원장 · 적재 서비스가 아니면 원장이 세션과 함께 사라짐)"""
+    return not (shared_ledger.ENABLED or ledger_service.SERVICE_URL)
+
+
+@st.cache_resource
+def get_shared_ledger():
+    """
+    프로세스의 모든 세션이 함께 쓰는 원장 (SKU_SHARED_LEDGER=1).
+    저장소(SKU_LEDGER_STORE)가 있으면 작은 파일을 합친 뒤 저장소 원장을 날짜순으로 다시 반영해 복원
+    """
+    shared = shared_ledger.SharedLedger()
+    store = ledger_store.default_store()
+    if store is not None and store.exists():
+        store.compact()
+        history = store.read()
+        with perf_trace.stage("shared_restore", rows=len(history)):
+            ledger_engine.post_transactions(shared.state, ledger_service.history_transactions(history))
+    return shared
+
+
+def attach_shared_ledger():
+    """세션 원장 키가 공유 원장의 현재 테이블을 가리키게 함 (커밋은 테이블을 통째로 교체하므로 잠금 없이 읽음)"""
+    shared = get_shared_ledger()
+    st.session_state.update({key: shared.state[key] for key in
+                             ('history', 'crm_history', 'inventory_queues', 'consumption', 'profit_cube', 'reorder_heap')})
+    st.session_state.update({'ledger_id': 'shared', 'ledger_version': shared.state.get('ledger_version', 0)})
 
 
 # ==========================================
@@ -162,62 +227,202 @@ def process_secure_transaction(date, item, action, sub_type, qty, customer="본
 # ==========================================
 def process_smart_sync(uploaded_files):
     """다중 엑셀 파일 병합 및 적재"""
-    combined_new_data = pd.DataFrame()
-    for uploaded_file in uploaded_files:
-        try:
-            df = pd.read_excel(uploaded_file)
-            df['날짜'] = pd.to_datetime(df['날짜'])
-            df['hash'] = df.apply(generate_row_hash, axis=1)
-            existing_hashes = set(st.session_state.history['hash'].tolist())
-            new_rows = df[~df['hash'].isin(existing_hashes)].copy()
-
-            if not new_rows.empty:
-                combined_new_data = pd.concat([combined_new_data, new_rows], ignore_index=True)
-                write_audit_log("엑셀 동기화", f"파일[{uploaded_file.name}]에서 {len(new_rows)}건 감지")
-        except Exception as e:
-            st.error(f"파일 {uploaded_file.name} 처리 중 오류: {e}")
-
-    if not combined_new_data.empty:
-        combined_new_data = combined_new_data.sort_values('날짜')
-        for _, row in combined_new_data.iterrows():
-            process_secure_transaction(
-                date=row['날짜'], item=row['품목명'], action=row['구분'], sub_type=row.get('세부구분', row['구분']),
-                qty=row['수량'], customer=row.get('고객사', '본사'), base_price=row.get('순수단가', 0),
-                customs_logistics_fee=row.get('통관물류비', 0) + row.get('통관비', 0) + row.get('물류비', 0),
-                sale_price=row.get('판매단가', 0), row_hash=row['hash']
-            )
-        st.success(f"✅ 총 {len(combined_new_data)}건 데이터 적재 완료.")
+    with perf_trace.run("엑셀 동기화"):
+        _process_smart_sync(uploaded_files)
+
+
+def _process_smart_sync(uploaded_files):
+    files = [(f.name, f.getvalue()) for f in uploaded_files]
+    # 같은 파일의 적재가 중간에 멈췄으면 저장해 둔 거래 묶음을 중단 지점부터 이어서 반영 (파싱 · 중복 제거 생략)
+    checkpoint = chunked_ingest.IngestCheckpoint.for_files(files)
+    batch, start = checkpoint.resume(st.session_state.history['hash'])
+    stale = render_stale_checkpoint(checkpoint, per_session_ledger())
+    if stale:
+        write_audit_log("엑셀 동기화 재개 불가", stale)
+        checkpoint.clear()
+    if batch is not None:
+        write_audit_log("엑셀 동기화 재개", f"총 {len(batch)}건 중 {start}건 반영 지점부터")
     else:
-        st.warning("⚠️ 새로 추가할 데이터가 없습니다.")
+        # 워크북 병렬 파싱 · 정규화 → 파일 간/기존 원장 중복을 한 번에 제거한 날짜순 거래 묶음
+        # 검증에 실패한 행은 반영 전에 걸러져 반려 시트로 모임 (적재 도중 실패 없음)
+        batch, new_counts, errors, rejects = ingest.load_new_transactions(
+            files, st.session_state.history['hash'], hash_columns=['날짜', '고객사', '품목명', '수량', '구분'])
+
+        for name, error in errors.items():
+            st.error(f"파일 {name} 처리 중 오류: {error}")
+        store_upload_rejects(rejects)
+        write_audit_logs([("엑셀 동기화", f"파일[{name}]에서 {count}건 감지") for name, count in new_counts.items() if count]
+                         + [("업로드 검증", f"파일[{name}]에서 {count}건 반려")
+                            for name, count in rejects['파일명'].value_counts(sort=False).items()])
+        if batch.empty:
+            st.warning("⚠️ 새로 추가할 데이터가 없습니다.")
+            return
+        start = 0
+        if len(batch) > chunked_ingest.CHUNK_ROWS:
+            checkpoint.stage(batch)
+        else:
+            checkpoint = None
+
+    def post_chunk(chunk):
+        audit_entries = post_batch(chunk)
+        write_audit_logs([(f"트랜잭션({action})", details) for action, details in audit_entries])
 
+    try:
+        with perf_trace.stage("post_transactions", rows=len(batch) - start):
+            run_chunked_post(post_chunk, batch, start, checkpoint, per_session=per_session_ledger())
+    except Exception as e:
+        # post_transactions(공유 원장이면 SharedLedger.post)가 실패한 덩어리만 반영 전 상태로 롤백한 뒤 예외를 전달
+        done = checkpoint.state()['offset'] if checkpoint is not None else 0
+        st.error(f"적재 중 오류로 {done:,}건까지만 반영되었습니다 (실패한 덩어리는 롤백 완료): {e}")
+        write_audit_log("엑셀 동기화 실패", f"{done}건 반영 후 롤백: {e}")
+        return
+    publish_viewer_snapshot()
+    st.success(f"✅ 총 {len(batch)}건 데이터 적재 완료.")
 
-def process_pdf_with_ai(uploaded_file):
-    """AI PDF 문서 파싱 및 JSON 정형화"""
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        tmp_file_path = tmp_file.name
 
-    try:
-        with st.status("🤖 AI가 문서를 분석 중입니다...", expanded=True) as status:
-            st.write("1️⃣ Upstage Document Parse: 문서 레이아웃 추출 중...")
-            loader = UpstageDocumentParseLoader(tmp_file_path, output_format="text")
-            docs = loader.load()
-            parsed_text = "\n".join([doc.page_content for doc in docs])
+@st.cache_resource
+def get_extraction_cache():
+    return pdf_batch.ExtractionCache()
 
-            st.write("2️⃣ Solar Pro LLM: 데이터 구조화(JSON) 진행 중...")
-            llm = ChatUpstage(model="solar-pro")
-            structured_llm = llm.with_structured_output(ImportDocument)
 
-            prompt = f"다음 파싱된 통관 문서 내용을 분석하여 스키마 형식에 맞게 데이터를 추출하세요.\n내용:\n{parsed_text}"
-            extracted_data = structured_llm.invoke(prompt)
+def process_pdf_with_ai(uploaded_files, max_workers=pdf_batch.DEFAULT_WORKERS):
+    """AI PDF 문서 파싱 및 JSON 정형화 (여러 문서 병렬 처리, 이미 분석한 문서는 캐시 재사용)"""
+    ai = load_ai_pipeline()
+    documents = [(f.name, f.getvalue()) for f in uploaded_files]
+    with st.status(f"🤖 AI가 문서 {len(documents)}건을 분석 중입니다...", expanded=True) as status:
+        st.write("1️⃣ Upstage Document Parse → 2️⃣ Solar Pro LLM 데이터 구조화(JSON) 진행 중...")
+        progress = st.progress(0.0)
 
-            status.update(label="✅ AI 문서 분석 완료!", state="complete")
-            return extracted_data
-    except Exception as e:
-        st.error(f"AI 파싱 오류: {e}")
-        return None
-    finally:
-        os.remove(tmp_file_path)
+        def on_result(done, total, result):
+            progress.progress(done / total, text=f"{done}/{total} · {result['파일명']} ({result['상태']})")
+
+        with perf_trace.run("AI 통관서류 분석", rows=len(documents)):
+            results = pdf_batch.process_documents(documents, ai.upstage_parse, ai.upstage_extract, max_workers=max_workers,
+                                                  cache=get_extraction_cache(), on_result=on_result)
+
+        failed = [r for r in results if r['상태'] == '오류']
+        for r in failed:
+            st.error(f"AI 파싱 오류 ({r['파일명']}): {r['오류내용']}")
+        cached = sum(r['상태'] == '캐시' for r in results)
+        status.update(label=f"✅ AI 문서 분석 완료! (성공 {len(results) - len(failed)}건 · 캐시 재사용 {cached}건 · 오류 {len(failed)}건)",
+                      state="error" if len(failed) == len(results) else "complete")
+    return [(r['파일명'], ai.ImportDocument(**r['data'])) for r in results if r['상태'] != '오류']
+
+
+def post_import_documents(docs, basis='qty'):
+    """
+    AI 추출 문서 묶음의 통관물류비를 원 단위로 배분(landed_cost)해 한 묶음으로 입고 반영.
+    post_batch(post_transactions · SharedLedger.post · 서비스 반영)가 묶음 단위로 원자적이라 중간 실패 시 전체 롤백
+    """
+    lines, fees, batch = landed_cost.import_batch(docs, basis)
+    audit_entries = post_batch(batch)
+    write_audit_logs([(f"트랜잭션({action})", details) for action, details in audit_entries]
+                     + [("원가 배분", f"문서 {len(docs)}건 · 품목 {len(lines)}줄 | 기준:{landed_cost.BASIS_LABELS[basis]} | "
+                                   f"제비용 {int(fees.sum()):,}원 배분")])
+
+
+# ==========================================
+# [5-1. 대시보드 패널 (패널별 부분 재실행)]
+# ==========================================
+# 각 패널은 st.fragment라 패널 안의 위젯을 바꾸면 그 패널만 다시 실행되고,
+# 정렬/집계 결과는 원장 토큰(dashboard_cache.ledger_token)이 바뀔 때만 다시 계산합니다.
+@st.fragment
+def fifo_detail_panel():
+    if not st.session_state.latest_fifo_detail.empty:
+        st.subheader("🧪 FIFO 차감 상세 내역")
+        st.table(st.session_state.latest_fifo_detail)
+
+
+@st.fragment
+def crm_panel():
+    token = dashboard_cache.ledger_token(st.session_state)
+    st.dataframe(dashboard_cache.crm_latest_first(token, st.session_state.crm_history), use_container_width=True)
+
+
+@st.fragment
+def profit_panel():
+    render_profit_ranking(st.session_state, ledger_engine.CRM_SUB_TYPES)
+
+
+@st.fragment
+def reorder_alert_panel():
+    render_reorder_alerts(dashboard_cache.reorder_heap(st.session_state))
+
+
+@st.fragment
+def aging_panel():
+    render_aging_report(dashboard_cache.aging_report(st.session_state))
+
+
+@st.fragment
+def item_analysis_panel():
+    item_list = dashboard_cache.item_list(dashboard_cache.ledger_token(st.session_state), st.session_state.history)
+    if not item_list:
+        return
+    sel_item = st.selectbox("분석 품목 선택", item_list)
+    curr_stock, avg_12m, avg_3m = dashboard_cache.item_metrics(st.session_state, sel_item)
+    stock_months = curr_stock / avg_3m if avg_3m > 0 else 0
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("현재 재고", f"{curr_stock:,} 개")
+    c2.metric("1년 평균 판매", f"{int(avg_12m)} 개/월")
+    c3.metric("최근 3개월 판매", f"{int(avg_3m)} 개/월")
+    c4.metric("재고 소진 예상", f"{stock_months:.1f} 개월")
+
+    if stock_months < 2.0:
+        st.error("⚠️ **발주 경고**: 수입 리드타임 대비 재고 부족!")
+    else:
+        st.success("✅ **안정권**: 재고 충분")
+
+    render_lot_trace(st.session_state.consumption, sel_item)
+
+
+# ==========================================
+# [5-2. 뷰어 스냅샷 (읽기 전용 세션 공유 원장)]
+# ==========================================
+@st.cache_resource
+def get_snapshot_publisher():
+    """공유 원장을 뷰어 스냅샷으로 게시하는 프로세스 공용 백그라운드 게시기 (SKU_LEDGER_SNAPSHOT 설정 시)"""
+    shared = get_shared_ledger()
+    return ledger_snapshot.SnapshotPublisher(ledger_snapshot.DEFAULT_ROOT,
+                                             lambda: ledger_snapshot.state_tables(shared.view()))
+
+
+def publish_viewer_snapshot():
+    """
+    반영 후 뷰어 스냅샷 게시 요청 (백그라운드에서 최대 PUBLISH_INTERVAL초에 1번 게시, 화면은 기다리지 않음).
+    게시 원본은 공유 원장뿐: 적재 서비스 모드는 서비스가 게시하고, 세션별 원장 모드는 게시하지 않음
+    """
+    if not ledger_snapshot.DEFAULT_ROOT or ledger_service.SERVICE_URL or not shared_ledger.ENABLED:
+        return
+    get_snapshot_publisher().request()
+
+
+def attach_viewer_snapshot():
+    """뷰어 세션은 최신 스냅샷을 세션 원장으로 연결 (모든 뷰어가 같은 프레임을 공유, 세션별 사본 없음)"""
+    root = ledger_snapshot.DEFAULT_ROOT
+    version = ledger_snapshot.current_version(root) if root else None
+    if version is None:
+        st.warning("⚠️ 게시된 원장 스냅샷이 없습니다. 공유 원장(SKU_SHARED_LEDGER=1) 또는 적재 서비스 모드에서 "
+                   "실무자/관리자가 데이터를 적재하면 조회할 수 있습니다.")
+        return
+    if st.session_state.get('ledger_version') == version:
+        return
+    snapshot = dashboard_cache.shared_snapshot(root, version)
+    # 수익성 큐브 · 발주 힙은 스냅샷 원장에서 뷰어끼리 공유하는 것을 씀 (dashboard_cache)
+    st.session_state.pop('profit_cube', None)
+    st.session_state.pop('reorder_heap', None)
+    # 원장 ID를 스냅샷 경로로 두면 대시보드 집계 캐시도 뷰어끼리 공유됨
+    st.session_state.update({'history': snapshot['history'], 'crm_history': snapshot['crm_history'],
+                             'snapshot_stock': snapshot['stock'], 'snapshot_lots': snapshot.get('lots'),
+                             'ledger_id': f"snapshot:{root}",
+                             'ledger_version': version})
+
+
+def detach_viewer_snapshot():
+    """로그아웃 시 공유 스냅샷 연결 해제 (같은 브라우저 세션에서 쓰기 계정으로 다시 로그인할 수 있으므로)"""
+    for key in ('history', 'crm_history', 'snapshot_stock', 'snapshot_lots', 'profit_cube', 'reorder_heap', 'ledger_id', 'ledger_version'):
+        st.session_state.pop(key, None)
 
 
 # ==========================================
@@ -225,12 +430,14 @@ def process_pdf_with_ai(uploaded_file):
 # ==========================================
 def main_app():
     initialize_state()
+    if shared_ledger.ENABLED and st.session_state.role != "viewer":
+        attach_shared_ledger()
 
     # --- 로그인 화면 ---
     if not st.session_state.logged_in:
         st.title("🔒 AI & Secure ERP 로그인")
         with st.form("login_form"):
-            user_id = st.text_input("아이디 (관리자: admin / 실무자: staff)")
+            user_id = st.text_input("아이디 (관리자: admin / 실무자: staff / 조회: viewer)")
             password = st.text_input("비밀번호 (공통: 1234)", type="password")
             if st.form_submit_button("로그인", type="primary"):
                 if user_id == "admin" and password == "1234":
@@ -241,10 +448,18 @@ def main_app():
                     st.session_state.update({'logged_in': True, 'current_user': "이대리(실무자)", 'role': "user"})
                     write_audit_log("로그인", "실무자 접속")
                     st.rerun()
+                elif user_id == "viewer" and password == "1234":
+                    st.session_state.update({'logged_in': True, 'current_user': "박주임(조회)", 'role': "viewer"})
+                    write_audit_log("로그인", "조회 전용 접속")
+                    st.rerun()
                 else:
                     st.error("⚠️ 인증 실패")
         return
 
+    # 적재 서비스 모드에서는 쓰기 계정도 서비스가 게시한 스냅샷을 읽기만 함 (반영은 post_batch → 서비스)
+    if st.session_state.role == "viewer" or ledger_service.SERVICE_URL:
+        attach_viewer_snapshot()
+
     # --- 사이드바 메뉴 ---
     with st.sidebar:
         st.title("⚙️ AI 통합 관리 시스템")
@@ -256,58 +471,103 @@ def main_app():
             "3. 📤 수동 매출 출고",
             "4. 🤝 CRM 및 발주 분석 대시보드"
         ]
+        if st.session_state.role == "viewer":
+            menu_options = ["4. 🤝 CRM 및 발주 분석 대시보드"]
         if st.session_state.role == "admin":
             menu_options.append("5. 🛡️ 시스템 감사 (Admin)")
+            menu_options.append("6. ⏱️ 성능 계측 (Admin)")
 
         app_mode = st.radio("메뉴 선택", menu_options)
         st.divider()
         if st.button("🚪 로그아웃", use_container_width=True):
             st.session_state.logged_in = False
+            if st.session_state.role == "viewer" or ledger_service.SERVICE_URL:
+                detach_viewer_snapshot()
             write_audit_log("로그아웃", "시스템 종료")
             st.rerun()
 
+    with perf_trace.run(f"화면 렌더링:{app_mode}"):
+        render_page(app_mode)
+
+
+def render_page(app_mode):
+    """선택한 메뉴 화면 (main_app이 화면 렌더링 계측 구간 안에서 호출)"""
     # --- 0. 엑셀 동기화 ---
     if app_mode == "0. 🔄 다중 엑셀 동기화":
         st.title("🔄 ERP 엑셀 데이터 파이프라인")
         uploaded_files = st.file_uploader("수불부, 단가표 등 엑셀 파일 다중 선택", type=['xlsx'], accept_multiple_files=True)
         if uploaded_files and st.button("🚀 데이터 통합 적재 실행", type="primary"):
             process_smart_sync(uploaded_files)
+        render_cancelled_notice(per_session_ledger())
+        render_upload_rejects()
 
     # --- 1. AI PDF 자동화 ---
     elif app_mode == "1. 📄 AI PDF 통관서류 자동화":
         st.title("📄 AI 수입 통관/인보이스 자동 적재")
-        uploaded_pdf = st.file_uploader("수입 서류 PDF 업로드", type=['pdf', 'png', 'jpg'])
+        uploaded_pdfs = st.file_uploader("수입 서류 PDF 업로드 (여러 건 동시 선택 가능)", type=['pdf', 'png', 'jpg'],
+                                         accept_multiple_files=True)
 
-        if 'ai_extracted_data' not in st.session_state: st.session_state.ai_extracted_data = None
+        if 'ai_extracted_docs' not in st.session_state: st.session_state.ai_extracted_docs = []
 
-        if uploaded_pdf and st.button("🚀 AI 분석 시작", type="primary"):
+        max_workers = pdf_batch.DEFAULT_WORKERS
+        if uploaded_pdfs and len(uploaded_pdfs) > 1:
+            max_workers = st.slider("동시 분석 문서 수", 1, 8, pdf_batch.DEFAULT_WORKERS,
+                                    help="API 호출 한도에 맞춰 조정하세요. 이미 분석한 문서는 다시 호출하지 않습니다.")
+
+        if uploaded_pdfs and st.button("🚀 AI 분석 시작", type="primary"):
             if "UPSTAGE_API_KEY를_여기에_입력하세요" in os.environ.get("UPSTAGE_API_KEY", ""):
                 st.error("⚠️ 코드 상단에 실제 Upstage API 키를 입력해 주세요.")
             else:
-                st.session_state.ai_extracted_data = process_pdf_with_ai(uploaded_pdf)
+                st.session_state.ai_extracted_docs = process_pdf_with_ai(uploaded_pdfs, max_workers)
 
-        if st.session_state.ai_extracted_data:
-            data = st.session_state.ai_extracted_data
+        if st.session_state.ai_extracted_docs:
+            docs = st.session_state.ai_extracted_docs
             st.divider()
             st.subheader("🧐 AI 추출 결과 검토 (Human-in-the-Loop)")
-            c1, c2, c3 = st.columns(3)
-            c1.text_input("수입 일자", value=data.수입일자, disabled=True)
-            c2.text_input("거래처", value=data.거래처, disabled=True)
-            c3.text_input("총 제비용", value=f"{data.총통관물류비:,} 원", disabled=True)
-
-            st.dataframe(pd.DataFrame([item.dict() for item in data.품목목록]), use_container_width=True)
-
-            if st.button("💾 위 내용으로 DB 적재 및 원가 배분 확정", type="primary"):
-                total_qty = sum([item.수량 for item in data.품목목록])
-                for item in data.품목목록:
-                    ratio = item.수량 / total_qty if total_qty > 0 else 0
-                    allocated_fee = data.총통관물류비 * ratio
-                    process_secure_transaction(
-                        date=data.수입일자, item=item.품목명, action="입고", sub_type="수입(AI자동화)",
-                        qty=item.수량, customer=data.거래처, base_price=item.순수단가, customs_logistics_fee=allocated_fee
-                    )
-                st.success("🎉 데이터베이스에 안전하게 자동 적재 및 원가 계산 완료!")
-                st.session_state.ai_extracted_data = None
+            if len(docs) == 1:
+                _, data = docs[0]
+                c1, c2, c3 = st.columns(3)
+                c1.text_input("수입 일자", value=data.수입일자, disabled=True)
+                c2.text_input("거래처", value=data.거래처, disabled=True)
+                c3.text_input("총 제비용", value=f"{data.총통관물류비:,} 원", disabled=True)
+
+                st.dataframe(pd.DataFrame([item.dict() for item in data.품목목록]), use_container_width=True)
+            else:
+                st.dataframe(pd.DataFrame([{
+                    '파일명': name, '수입일자': data.수입일자, '거래처': data.거래처,
+                    '품목수': len(data.품목목록), '총통관물류비': data.총통관물류비,
+                } for name, data in docs]), use_container_width=True, hide_index=True)
+                with st.expander("📋 문서별 품목 상세"):
+                    st.dataframe(pd.DataFrame([{'파일명': name, **item.dict()}
+                                               for name, data in docs for item in data.품목목록]),
+                                 use_container_width=True, hide_index=True)
+
+            # 제비용 배분 미리보기 (문서별 배분 합계가 총통관물류비와 원 단위까지 일치)
+            basis = st.radio("제비용 배분 기준", landed_cost.BASES, format_func=landed_cost.BASIS_LABELS.get,
+                             horizontal=True, key='landed_cost_basis')
+            lines, fees = landed_cost.document_lines(docs)
+            lines = landed_cost.allocate_lines(lines, fees, basis)
+            lines.insert(0, '파일명', [docs[doc_no][0] for doc_no in lines['문서']])
+            st.dataframe(lines.drop(columns='문서'), use_container_width=True, hide_index=True,
+                         column_config={'통관물류비': st.column_config.NumberColumn("배분 통관물류비", format="%d 원"),
+                                        '최종매입원가': st.column_config.NumberColumn(format="%.1f")})
+            unallocated = landed_cost.unallocated(lines, fees)
+            if not unallocated.empty:
+                # 배분할 품목 줄이 없는 문서의 제비용은 원장에 반영되지 않으므로 적재 전에 막음
+                unallocated.insert(0, '파일명', [docs[doc_no][0] for doc_no in unallocated['문서']])
+                st.error("⚠️ 제비용을 배분할 품목(입고 수량)이 없는 문서가 있어 적재할 수 없습니다. 문서를 확인 후 다시 분석하세요.")
+                st.dataframe(unallocated.drop(columns='문서'), use_container_width=True, hide_index=True)
+            elif st.button("💾 위 내용으로 DB 적재 및 원가 배분 확정", type="primary"):
+                try:
+                    # 여러 문서를 한 묶음으로 반영 (중간 실패 시 전체 롤백)
+                    post_import_documents(docs, basis)
+                except Exception as e:
+                    st.error(f"적재 중 오류로 반영되지 않았습니다 (롤백 완료): {e}")
+                    write_audit_log("AI 문서 적재 실패", f"롤백: {e}")
+                    st.stop()
+                publish_viewer_snapshot()
+                st.success(f"🎉 {len(docs)}건 문서를 데이터베이스에 안전하게 자동 적재 및 원가 계산 완료!")
+                st.session_state.ai_extracted_docs = []
                 st.rerun()
 
     # --- 2. 수동 입고 ---
@@ -320,8 +580,11 @@ def main_app():
                                                                                                    min_value=0.0)
             with c3: t_fees = st.number_input("총 부대비용 (통관/물류비 등)", min_value=0)
             if st.form_submit_button("입고 등록 및 원가 배분", type="primary") and t_item:
-                process_secure_transaction(t_date, t_item, "입고", "수동수입", t_qty, base_price=t_base_price,
-                                           customs_logistics_fee=t_fees)
+                batch = landed_cost.receipt_batch(t_date, t_item, t_qty, t_base_price, t_fees)
+                batch['hash'] = manual_entry_hashes(batch['hash'])
+                audit_entries = post_batch(batch)
+                write_audit_logs([(f"트랜잭션({action})", details) for action, details in audit_entries])
+                publish_viewer_snapshot()
                 st.rerun()
 
     # --- 3. 수동 출고 ---
@@ -329,7 +592,8 @@ def main_app():
         st.title("📤 수동 매출 출고 및 FIFO 원가 산출")
         with st.form("sales_form"):
             c1, c2, c3 = st.columns(3)
-            item_list = list(st.session_state.inventory_queues.keys())
+            item_list = (st.session_state.snapshot_stock['품목명'].tolist() if 'snapshot_stock' in st.session_state
+                         else list(st.session_state.inventory_queues.keys()))
             with c1: s_date = st.date_input("매출 일자"); s_customer = st.text_input("고객사명")
             with c2: s_item = st.selectbox("출고 품목", item_list if item_list else ["품목없음"]); s_qty = st.number_input(
                 "출고 수량", min_value=1)
@@ -337,11 +601,10 @@ def main_app():
             if st.form_submit_button("출고 및 선입선출 계산", type="primary") and s_item != "품목없음":
                 process_secure_transaction(s_date, s_item, "출고", "매출", s_qty, customer=s_customer,
                                            sale_price=s_sale_price)
+                publish_viewer_snapshot()
                 st.rerun()
 
-        if not st.session_state.latest_fifo_detail.empty:
-            st.subheader("🧪 FIFO 차감 상세 내역")
-            st.table(st.session_state.latest_fifo_detail)
+        fifo_detail_panel()
 
     # --- 4. 대시보드 ---
     elif app_mode == "4. 🤝 CRM 및 발주 분석 대시보드":
@@ -349,32 +612,13 @@ def main_app():
         tab1, tab2 = st.tabs(["🤝 고객사 CRM 히스토리", "💡 품목별 AI 적정재고 검토"])
 
         with tab1:
-            st.dataframe(st.session_state.crm_history.sort_values(by='날짜', ascending=False), use_container_width=True)
+            profit_panel()
+            crm_panel()
 
         with tab2:
-            item_list = sorted(st.session_state.history['품목명'].unique())
-            if item_list:
-                sel_item = st.selectbox("분석 품목 선택", item_list)
-                # 간단한 분석 로직 인라인 처리
-                sales = st.session_state.history[
-                    (st.session_state.history['품목명'] == sel_item) & (st.session_state.history['구분'] == '출고')]
-                curr_stock = sum(b['qty'] for b in st.session_state.inventory_queues.get(sel_item, []))
-
-                now = datetime.now()
-                avg_12m = sales[sales['날짜'] >= now - pd.Timedelta(days=365)]['수량'].sum() / 12
-                avg_3m = sales[sales['날짜'] >= now - pd.Timedelta(days=90)]['수량'].sum() / 3
-                stock_months = curr_stock / avg_3m if avg_3m > 0 else 0
-
-                c1, c2, c3, c4 = st.columns(4)
-                c1.metric("현재 재고", f"{curr_stock:,} 개")
-                c2.metric("1년 평균 판매", f"{int(avg_12m)} 개/월")
-                c3.metric("최근 3개월 판매", f"{int(avg_3m)} 개/월")
-                c4.metric("재고 소진 예상", f"{stock_months:.1f} 개월")
-
-                if stock_months < 2.0:
-                    st.error("⚠️ **발주 경고**: 수입 리드타임 대비 재고 부족!")
-                else:
-                    st.success("✅ **안정권**: 재고 충분")
+            reorder_alert_panel()
+            aging_panel()
+            item_analysis_panel()
 
     # --- 5. 시스템 감사 ---
     elif app_mode == "5. 🛡️ 시스템 감사 (Admin)":
@@ -382,6 +626,10 @@ def main_app():
         st.error("모든 엑셀 동기화, 수동 입력 및 AI 파이프라인의 조작 내역이 위변조 불가능한 형태로 기록됩니다.")
         st.dataframe(st.session_state.audit_logs.sort_values(by='시간', ascending=False), use_container_width=True)
 
+    # --- 6. 성능 계측 ---
+    elif app_mode == "6. ⏱️ 성능 계측 (Admin)":
+        render_perf_page()
+
 
 if __name__ == "__main__":
     main_app()
\ No newline at end of file
@@ -4,6 +4,23 @@ from collections import deque
 from datetime import datetime
 import hashlib  # 중복 방지용 해시 생성
 import os
+import time
+
+import ingest
+import ledger_engine
+import ledger_schema
+import ledger_warmup
+from aging_panel import render_aging_report
+from inventory_aging import aging_report, remaining_lots
+from reorder_heap import ReorderHeap
+from rejects_panel import render_upload_rejects, store_upload_rejects
+from reorder_panel import render_reorder_alerts
+from trace_panel import render_lot_trace
+
+# 첫 화면(TTFP) · 데이터 준비(TTD) 시간 기준점 (스크립트 실행 시작)
+RUN_START = time.perf_counter()
+# 이력 표 한 페이지 행 수 (FIFO 소진내역 문자열은 보이는 페이지 행만 생성)
+HISTORY_PAGE_ROWS = 500
 
 # --- 1. 페이지 설정 및 스타일 ---
 st.set_page_config(layout="wide", page_title="AI Tracking System 2026")
@@ -17,65 +34,81 @@ st.markdown("""
 
 # --- 2. 핵심 유틸리티 함수 ---
 
-def generate_row_hash(row):
-    """데이터 행의 고유 해시값 생성 (날짜, 품목명, 구분, 수량, 단가 기준)"""
-    payload = f"{row['날짜']}{row['품목명']}{row['구분']}{row['수량']}{row['단가']}"
-    return hashlib.md5(payload.encode()).hexdigest()
+@st.cache_resource(show_spinner=False)
+def default_ledger_warmup():
+    """프로세스 공용 기본 원장 선적재 (첫 호출에서 백그라운드 적재 시작, 파일이 없으면 None)"""
+    if not os.path.exists(ledger_warmup.DEFAULT_PATH):
+        return None
+    return ledger_warmup.LedgerWarmup(ledger_warmup.DEFAULT_PATH).start()
 
 
 def initialize_state():
-    """세션 상태 초기화 및 데이터 로드"""
+    """세션 상태 초기화. 기본 원장은 프로세스 공용 선적재 결과를 기다려 세션 사본으로 연결"""
     if 'history' not in st.session_state:
-        file_path = 'inventory_10k_data.xlsx'
-        if os.path.exists(file_path):
-            df = pd.read_excel(file_path)
-            df['날짜'] = pd.to_datetime(df['날짜'])
-            # 기존 데이터에 세부구분 컬럼이 없을 경우 기본값 할당
-            if '세부구분' not in df.columns:
-                df['세부구분'] = df['구분'].map({'입고': '매입', '출고': '매출'})
-            if 'hash' not in df.columns:
-                df['hash'] = df.apply(generate_row_hash, axis=1)
-            st.session_state.history = df.sort_values(by='날짜').reset_index(drop=True)
-        else:
-            st.session_state.history = pd.DataFrame(columns=['날짜', '품목명', '구분', '세부구분', '수량', '단가', '매출원가', '비고', 'hash'])
-
-    if 'inventory_queues' not in st.session_state:
+        warmup = default_ledger_warmup()
+        if warmup is not None:
+            attach_default_ledger(warmup)
+        if 'history' not in st.session_state:
+            st.session_state.history = ledger_schema.empty_frame(
+                ['날짜', '품목명', '구분', '세부구분', '수량', '단가', '매출원가', '비고', 'hash'])
+
+    if any(key not in st.session_state for key in ('inventory_queues', 'consumption', 'reorder_heap')):
         reconstruct_queues()
     if 'latest_fifo_detail' not in st.session_state:
         st.session_state.latest_fifo_detail = pd.DataFrame()
+    timings = st.session_state.setdefault('startup_timings', {})
+    if 'data' not in timings:
+        timings['data'] = time.perf_counter() - RUN_START
+
+
+def attach_default_ledger(warmup):
+    """선적재가 끝날 때까지 진행 단계를 보여 주며 기다린 뒤 세션 사본 연결 (실패하면 다음 세션이 다시 적재)"""
+    start = time.perf_counter()
+    if not warmup.ready:
+        with st.status("⏳ 기본 원장을 불러오는 중...") as status:
+            while not warmup.wait(0.1):
+                status.update(label=f"⏳ 기본 원장을 불러오는 중... ({warmup.current}, {warmup.seconds:.1f}s)")
+            status.update(label=warmup.summary(), state="complete" if warmup.error is None else "error")
+    st.session_state.setdefault('startup_timings', {}).update(
+        {'waited': time.perf_counter() - start, 'warmup': warmup.seconds})
+    if warmup.error is not None:
+        default_ledger_warmup.clear()
+        st.error(f"기본 원장 적재 실패 (빈 원장으로 시작합니다): {warmup.error}")
+        return
+    result = warmup.result
+    # history는 통째로 교체만 되므로 공유, 큐 · 소진 원장은 업로드가 제자리에서 바꾸므로 세션 사본
+    queues, ledger = ledger_warmup.session_copy(result['inventory_queues'], result['consumption'])
+    st.session_state.update({'history': result['history'], 'inventory_queues': queues, 'consumption': ledger,
+                             'reorder_heap': ReorderHeap.from_state(result['history'], queues, now=pd.Timestamp.now())})
+
+
+def render_startup_timings():
+    """이 세션의 첫 화면 · 데이터 준비 시간 (사이드바)"""
+    timings = st.session_state.get('startup_timings', {})
+    if 'first_paint' in timings and 'data' in timings:
+        detail = f" · 선적재 대기 {timings['waited']:.2f}s" if 'waited' in timings else ""
+        st.sidebar.caption(f"⏱️ 첫 화면 {timings['first_paint']:.2f}s · 데이터 준비 {timings['data']:.2f}s{detail}")
 
 
 def reconstruct_queues():
-    """전체 히스토리를 순회하여 FIFO 큐 복원"""
-    items = st.session_state.history['품목명'].unique()
-    queues = {item: deque() for item in items}
-    # 날짜 순서대로 다시 계산하여 무결성 보장
-    sorted_hist = st.session_state.history.sort_values('날짜')
-    for _, row in sorted_hist.iterrows():
-        item = row['품목명']
-        if row['구분'] == '입고':
-            queues[item].append({'date': row['날짜'], 'qty': row['수량'], 'price': row['단가']})
-        elif row['구분'] == '출고':
-            qty = row['수량']
-            q = queues.get(item, deque())
-            while qty > 0 and q:
-                if q[0]['qty'] <= qty:
-                    qty -= q[0]['qty']
-                    q.popleft()
-                else:
-                    q[0]['qty'] -= qty
-                    qty = 0
+    """전체 히스토리를 순회하여 FIFO 큐 및 소진 원장 복원"""
+    queues, ledger = ledger_warmup.rebuild_queues(st.session_state.history)
     st.session_state.inventory_queues = queues
+    st.session_state.consumption = ledger
+    # 전 품목 발주 우선순위 힙 (이후 업로드분은 apply_records로 증분 반영)
+    st.session_state.reorder_heap = ReorderHeap.from_state(st.session_state.history, queues, now=pd.Timestamp.now())
 
 
 # --- 3. 비즈니스 로직 ---
 
 # --- [핵심 로직] FIFO 엔진 및 비고 기록 기능 ---
-def process_transaction(date, item, action, sub_type, qty, price=0, row_hash=None):
+def process_transaction(date, item, action, sub_type, qty, price=0, row_hash=None, records=None):
     """
-    단일 트랜잭션을 처리하며, 출고 시 어떤 배치의 재고가 사용되었는지 비고에 기록함
+    단일 트랜잭션을 처리하며, 출고 시 어떤 배치의 재고가 사용되었는지 소진 원장에 기록함
+    (상세 내역 문자열은 화면 표시 시점에 소진 원장에서 생성)
+    records 리스트를 넘기면 히스토리에 바로 붙이지 않고 리스트에 모음 (일괄 업로드 시 한 번에 추가)
     """
-    date = pd.to_datetime(date)
+    date = ingest.normalize_date(date)
     if not row_hash:
         row_hash = hashlib.md5(f"{date}{item}{action}{sub_type}{qty}{price}".encode()).hexdigest()
 
@@ -89,48 +122,43 @@ def process_transaction(date, item, action, sub_type, qty, price=0, row_hash=Non
         st.session_state.inventory_queues[item] = deque()
     queue = st.session_state.inventory_queues[item]
 
+    ledger = st.session_state.consumption
+
     if action == "입고":
-        queue.append({'date': date, 'qty': qty, 'price': price})
+        lot = ledger.add_lot(item, date, qty, price)
+        queue.append({'date': date, 'qty': qty, 'price': price, 'lot': lot})
         new_record['비고'] = f"[{sub_type}] {qty}개 입고 완료"
 
     elif action == "출고":
         remaining = qty
         total_cogs = 0
-        details = []  # 비고 작성을 위한 상세 내역 리스트
+        sale = ledger.open_sale(item, date, qty, row_hash)
 
         while remaining > 0 and queue:
             batch = queue[0]
-            batch_date_str = batch['date'].strftime('%Y-%m-%d')
 
             if batch['qty'] <= remaining:
                 # 배치 완전 소진
                 use_qty = batch['qty']
-                cost = use_qty * batch['price']
-                total_cogs += cost
+                total_cogs += use_qty * batch['price']
                 remaining -= use_qty
-                details.append(f"{batch_date_str}분 {use_qty}개(@{batch['price']:,}원)")
                 queue.popleft()
             else:
                 # 배치 부분 소진
                 use_qty = remaining
-                cost = use_qty * batch['price']
-                total_cogs += cost
+                total_cogs += use_qty * batch['price']
                 batch['qty'] -= use_qty
                 remaining = 0
-                details.append(f"{batch_date_str}분 {use_qty}개(@{batch['price']:,}원)")
+            ledger.consume(sale, batch['lot'], use_qty, batch['price'])
 
         new_record['매출원가'] = total_cogs
-
-        # --- [수정 포인트] 비고란에 상세 출고 내역 작성 ---
-        if remaining == 0:
-            detail_str = ", ".join(details)
-            new_record['비고'] = f"[{sub_type}] 출고완료 ({detail_str})"
-        else:
-            detail_str = ", ".join(details) if details else "재고 없음"
-            new_record['비고'] = f"⚠️재고부족 (일부출고: {detail_str}, 미출고: {remaining}개)"
+        new_record['비고'] = f"[{sub_type}] 출고완료" if remaining == 0 else f"⚠️재고부족 (미출고: {remaining}개)"
 
     # 히스토리에 기록 추가
-    st.session_state.history = pd.concat([st.session_state.history, pd.DataFrame([new_record])], ignore_index=True)
+    if records is not None:
+        records.append(new_record)
+    else:
+        st.session_state.history = ledger_schema.append_rows(st.session_state.history, [new_record])
 
 
 # --- 4. 엑셀 업로드 처리 ---
@@ -143,8 +171,12 @@ def handle_excel_upload(uploaded_file):
             st.error(f"양식 오류! 필수 컬럼: {required}")
             return
 
-        df['날짜'] = pd.to_datetime(df['날짜'])
-        df['hash'] = df.apply(generate_row_hash, axis=1)
+        # 반영 전에 전 행 일괄 검증 → 오류 행은 반려 시트로 분리 (처리 도중 실패 방지)
+        valid, rejects = ingest.validate_rows(df, required)
+        store_upload_rejects(rejects)
+
+        df = ledger_schema.compact_frame(valid)
+        df['hash'] = ingest.row_hashes(df, ['날짜', '품목명', '구분', '수량', '단가'])
 
         existing_hashes = set(st.session_state.history['hash'].tolist())
         new_data = df[~df['hash'].isin(existing_hashes)].copy()
@@ -153,16 +185,23 @@ def handle_excel_upload(uploaded_file):
             st.warning("추가할 신규 데이터가 없습니다.")
             return
 
-        new_data = new_data.sort_values('날짜')
+        new_data = new_data.sort_values('날짜', kind='stable')
         with st.status("데이터 분석 중...") as status:
-            for _, row in new_data.iterrows():
-                process_transaction(row['날짜'], row['품목명'], row['구분'], row['세부구분'], row['수량'], row['단가'], row['hash'])
+            # 중간에 실패하면 건드린 품목 큐 · 소진 원장만 되돌리고, 히스토리는 모두 처리된 뒤 한 번에 추가
+            records = []
+            with ledger_engine.atomic(st.session_state) as snapshot:
+                for _, row in new_data.iterrows():
+                    snapshot.touch(row['품목명'])
+                    process_transaction(row['날짜'], row['품목명'], row['구분'], row['세부구분'], row['수량'], row['단가'],
+                                        row['hash'], records)
+                history = ledger_schema.append_rows(st.session_state.history, records)
+                st.session_state.history = history.sort_values('날짜', kind='stable').reset_index(drop=True)
+            st.session_state.reorder_heap.apply_records(records)
             status.update(label="반영 완료!", state="complete")
 
-        st.session_state.history = st.session_state.history.sort_values('날짜').reset_index(drop=True)
         st.rerun()
     except Exception as e:
-        st.error(f"파일 처리 오류: {e}")
+        st.error(f"파일 처리 오류 (원장은 업로드 전 상태로 유지됩니다): {e}")
 
 # --- [추가] 3-1. 판매 지표 계산 로직 ---
 def calculate_sales_metrics(item_name):
@@ -245,7 +284,9 @@ def get_next_out_schedule():
     return pd.DataFrame(schedule_data)
 
 # --- 4. 메인 UI 구성 ---
-initialize_state()
+# 세션에 원장이 없으면 기본 원장 적재를 백그라운드로 먼저 시작 (화면은 기다리지 않고 그림)
+if 'history' not in st.session_state:
+    default_ledger_warmup()
 
 # [사이드바 영역]
 with st.sidebar:
@@ -256,14 +297,18 @@ with st.sidebar:
     template = pd.DataFrame(columns=['날짜', '품목명', '구분', '세부구분', '수량', '단가'])
     st.download_button("📥 업로드 양식 다운로드", data=template.to_csv(index=False).encode('utf-8-sig'),
                        file_name="template_v2.csv")
+st.session_state.setdefault('startup_timings', {}).setdefault('first_paint', time.perf_counter() - RUN_START)
 
 if app_mode == "데이터 일괄 업로드":
     st.title("📥 대량 입출고 업로드 및 이력")
+    initialize_state()
+    render_startup_timings()
 
     with st.expander("📁 신규 데이터 업로드"):
         uploaded_file = st.file_uploader("엑셀 파일을 선택하세요", type=['xlsx'])
         if uploaded_file and st.button("🚀 데이터 반영하기", use_container_width=True):
             handle_excel_upload(uploaded_file)
+        render_upload_rejects()
 
     st.divider()
     st.subheader("🔍 데이터 필터링 (세부구분 포함)")
@@ -286,11 +331,19 @@ if app_mode == "데이터 일괄 업로드":
     if selected_items: df_display = df_display[df_display['품목명'].isin(selected_items)]
     df_display = df_display[df_display['세부구분'].isin(selected_subs)]
     if len(date_range) == 2:
-        df_display = df_display[
-            (df_display['날짜'].dt.date >= date_range[0]) & (df_display['날짜'].dt.date <= date_range[1])]
+        day = ingest.normalize_dates(df_display['날짜'], to_day=True)
+        df_display = df_display[(day >= pd.Timestamp(date_range[0])) & (day <= pd.Timestamp(date_range[1]))]
+
+    # 최신순 HISTORY_PAGE_ROWS행씩 나눠 보여주고, 출고별 입고 배치 소진 내역은 현재 페이지 행만 소진 원장에서 생성
+    df_display = df_display.sort_values('날짜', ascending=False, kind='stable')
+    n_pages = max(1, -(-len(df_display) // HISTORY_PAGE_ROWS))
+    page = st.number_input(f"페이지 (총 {len(df_display):,}건 · {n_pages:,}쪽)", min_value=1, max_value=n_pages, value=1,
+                           key="history_page") if n_pages > 1 else 1
+    df_page = df_display.iloc[(page - 1) * HISTORY_PAGE_ROWS:page * HISTORY_PAGE_ROWS]
+    df_page = df_page.assign(**{'FIFO 소진내역': st.session_state.consumption.render_notes_for_refs(df_page['hash'])})
 
     st.dataframe(
-        df_display.sort_values('날짜', ascending=False),
+        df_page,
         use_container_width=True,
         hide_index=True,
         column_config={
@@ -358,9 +411,18 @@ if app_mode == "데이터 일괄 업로드":
 
     else:
         st.info("출고 대기 중인 재고가 없습니다.")
+
+    st.divider()
+    render_aging_report(aging_report(remaining_lots(st.session_state.consumption)))
 elif app_mode == "데이터 분석/트래킹":
     st.title("🔍 수입 적정재고 검토 대시보드")
     st.info("수입 리드 타임을 고려하여 품목별 발주 필요성을 분석합니다. (기준일: 2026-01-14)")
+    initialize_state()
+    render_startup_timings()
+
+    # 0. 전 품목 발주 우선순위 (품목을 하나씩 선택하지 않아도 급한 품목부터)
+    st.session_state.reorder_heap.advance(pd.Timestamp.now())
+    render_reorder_alerts(st.session_state.reorder_heap)
 
     # 1. 품목 선택 (90여 개의 수입 품목 대응)
     item_list = sorted(st.session_state.history['품목명'].unique())
@@ -418,4 +480,7 @@ elif app_mode == "데이터 분석/트래킹":
             st.metric("전월 대비 성장률", f"{monthly_sales.iloc[-1]:,.0f} 개", delta=f"{monthly_growth.iloc[-2]:.1f}%")
             st.bar_chart(monthly_sales)
         else:
-            st.write("판매 기록이 없어 차트를 표시할 수 없습니다.")
\ No newline at end of file
+            st.write("판매 기록이 없어 차트를 표시할 수 없습니다.")
+
+        # 5. 입고 배치 ↔ 출고 추적
+        render_lot_trace(st.session_state.consumption, selected_item)
\ No newline at end of file
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 
+import ingest
+
 # 1. 페이지 설정
 st.set_page_config(page_title="재고 트래킹 시스템", layout="wide")
 
@@ -24,7 +26,7 @@ if uploaded_file:
     df = pd.read_excel(uploaded_file)
 
     # 날짜 형식 변환
-    df['날짜'] = pd.to_datetime(df['날짜'])
+    df['날짜'] = ingest.normalize_dates(df['날짜'])
 
     # 3. 필터링 UI
     st.sidebar.header("🔍 필터 설정")
@@ -40,9 +42,10 @@ if uploaded_file:
         # 수정 포인트:
         # - target_item이 단일값이므로 == 를 사용하거나 [target_item] 리스트화 필요
         # - 날짜 비교 시 dt.date와 date_range 요소를 비교
+        day = ingest.normalize_dates(df['날짜'], to_day=True)
         mask = (df['품목명'] == target_item) & \
-               (df['날짜'].dt.date >= start_date) & \
-               (df['날짜'].dt.date <= end_date)
+               (day >= pd.Timestamp(start_date)) & \
+               (day <= pd.Timestamp(end_date))
 
         filtered_df = df.loc[mask].sort_values(by='날짜')
     else:
@@ -0,0 +1,31 @@
+import streamlit as st
+
+
+def render_lot_trace(ledger, item):
+    """품목별 입고 배치(로트) ↔ 출고 추적 화면 (소진 원장 조회)"""
+    st.subheader("🔗 입고 배치 ↔ 출고 추적")
+    lots = ledger.lots_frame(item)
+    if lots.empty:
+        st.info("추적할 입고 배치가 없습니다.")
+        return
+
+    st.dataframe(lots.drop(columns=['품목명']), use_container_width=True, hide_index=True, column_config={
+        '입고일': st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm"),
+        '단가': st.column_config.NumberColumn(format="₩ %.0f"),
+    })
+
+    sales = ledger.sales_frame(item)
+    c1, c2 = st.columns(2)
+    with c1:
+        lot_dates = dict(zip(lots['로트ID'], lots['입고일'].dt.strftime('%Y-%m-%d')))
+        lot = st.selectbox("입고 배치 선택 → 이 배치를 소진한 출고", lots['로트ID'],
+                           format_func=lambda i: f"#{i} ({lot_dates[i]} 입고)", key=f"trace_lot_{item}")
+        st.dataframe(ledger.sales_for_lot(lot), use_container_width=True, hide_index=True)
+    with c2:
+        if sales.empty:
+            st.info("출고 기록이 없습니다.")
+        else:
+            sale_dates = dict(zip(sales['출고ID'], sales['출고일'].dt.strftime('%Y-%m-%d')))
+            sale = st.selectbox("출고 선택 → 이 출고에 사용된 입고 배치", sales['출고ID'][::-1],
+                                format_func=lambda i: f"#{i} ({sale_dates[i]} 출고)", key=f"trace_sale_{item}")
+            st.dataframe(ledger.lots_for_sale(sale), use_container_width=True, hide_index=True)
@@ -0,0 +1,168 @@
+"""
+Upstage API 로컬 스텁 서버 (Document Parse + Solar Chat)
+
+실제 API 키/과금 없이 AI PDF 일괄 처리 파이프라인을 검증하기 위한 테스트용 서버입니다.
+- POST /v1/document-digitization : 업로드 파일을 텍스트로 돌려줌 (텍스트 파일이면 내용 그대로)
+- POST /v1/chat/completions      : 프롬프트의 '수입일자: / 거래처: / 총통관물류비: / 품목: 이름 | 수량 | 단가'
+                                   줄을 읽어 ImportDocument 구조화 결과(tool call)를 돌려줌
+- GET  /stats                     : 엔드포인트별 호출 횟수 (캐시 적중 검증용)
+
+사용 예)
+    python upstage_stub.py --port 8765 --latency 0.5
+    UPSTAGE_BASE_URL=http://127.0.0.1:8765/v1 UPSTAGE_API_KEY=stub streamlit run steamlit_main.py
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import default as email_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_LINE_PATTERNS = {
+    '수입일자': re.compile(r"수입일자\s*[:：]\s*(\S+)"),
+    '거래처': re.compile(r"거래처\s*[:：]\s*(.+)"),
+    '총통관물류비': re.compile(r"총통관물류비\s*[:：]\s*([\d,]+)"),
+}
+_ITEM_PATTERN = re.compile(r"품목\s*[:：]\s*(.+?)\s*\|\s*([\d,]+)\s*\|\s*([\d,.]+)")
+
+
+def _fallback_text(content):
+    """텍스트가 아닌 파일(PDF 등)은 내용 해시로 결정적인 가상 통관서류 텍스트 생성"""
+    seed = int(hashlib.sha256(content).hexdigest()[:8], 16)
+    return (f"수입일자: 2025-{seed % 12 + 1:02d}-{seed % 28 + 1:02d}\n"
+            f"거래처: 스텁무역_{seed % 97:02d}\n"
+            f"총통관물류비: {(seed % 50 + 1) * 10_000}\n"
+            f"품목: 수입물품_{seed % 26:02d} | {seed % 90 + 10} | {(seed % 100 + 50) * 100}\n")
+
+
+def extract_document(text):
+    """스텁 구조화: 텍스트의 약속된 줄 형식을 ImportDocument 딕셔너리로 변환"""
+    values = {key: (m.group(1).strip() if (m := pattern.search(text)) else '') for key, pattern in _LINE_PATTERNS.items()}
+    items = [{'품목명': name.strip(), '수량': int(qty.replace(',', '')), '순수단가': float(price.replace(',', ''))}
+             for name, qty, price in _ITEM_PATTERN.findall(text)]
+    return {
+        '수입일자': values['수입일자'] or '2025-01-01',
+        '거래처': values['거래처'] or '미상',
+        '총통관물류비': int(values['총통관물류비'].replace(',', '') or 0),
+        '품목목록': items,
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server_version = "UpstageStub/1.0"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/stats'):
+            self._send_json(dict(self.server.calls))
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.calls[self.path] += 1
+        if self.path.endswith('/document-digitization'):
+            self._document_parse()
+        elif self.path.endswith('/chat/completions'):
+            self._chat_completion()
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def _document_parse(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self.rfile.read(length)
+        message = BytesParser(policy=email_policy).parsebytes(raw)
+        content = next((part.get_payload(decode=True) for part in message.iter_parts()
+                        if part.get_param('name', header='content-disposition') == 'document'), b'')
+        try:
+            text = content.decode('utf-8')
+            if '품목' not in text:
+                text = _fallback_text(content)
+        except UnicodeDecodeError:
+            text = _fallback_text(content)
+        element = {'id': 0, 'page': 1, 'category': 'paragraph',
+                   'content': {'text': text, 'html': f"<p>{text}</p>", 'markdown': text}}
+        self._send_json({'api': '2.0', 'model': 'document-parse-stub', 'elements': [element], 'usage': {'pages': 1}})
+
+    def _chat_completion(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        prompt = "\n".join(str(m.get('content') or '') for m in request.get('messages', []))
+        arguments = json.dumps(extract_document(prompt), ensure_ascii=False)
+
+        message = {'role': 'assistant', 'content': None}
+        if request.get('tools'):
+            name = request['tools'][0]['function']['name']
+            message['tool_calls'] = [{'id': 'call_stub', 'type': 'function',
+                                      'function': {'name': name, 'arguments': arguments}}]
+            finish_reason = 'tool_calls'
+        else:
+            message['content'] = arguments
+            finish_reason = 'stop'
+
+        self._send_json({
+            'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': request.get('model', 'solar-pro'),
+            'choices': [{'index': 0, 'message': message, 'finish_reason': finish_reason}],
+            'usage': {'prompt_tokens': len(prompt), 'completion_tokens': len(arguments), 'total_tokens': 0},
+        })
+
+
+class StubServer:
+    """백그라운드 스레드에서 도는 스텁 서버. with 문으로 사용하면 종료까지 관리합니다."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self.httpd.latency = latency
+        self.httpd.calls = Counter()
+        self.httpd.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def calls(self):
+        return dict(self.httpd.calls)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        return False
+
+
+# --- 실행부 ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upstage API 로컬 스텁 서버")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="요청당 인위적 지연(초)")
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, args.latency)
+    print(f"🧪 Upstage 스텁 서버 실행 중: {server.base_url}  (Ctrl+C 종료)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()